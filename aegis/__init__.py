@@ -0,0 +1 @@
+"""Data and compute layer behind the Aegis Sovereign Logistics dashboard."""
@@ -0,0 +1,376 @@
+"""Background alerting on the live fleet.
+
+Rules watch for restricted-zone proximity, foreign-flagged vessels, overdue
+ETAs and custody steps stuck in 'active'. Store notifications only queue the
+affected rows, so the writing thread (the position feed, an import, a page)
+never evaluates anything. An :class:`AlertEngine` worker thread drains the
+queue and evaluates just the rules watching the changed columns, for just
+those rows, with vectorized checks. Conditions that come true with time
+alone, such as an ETA passing or a step staying active, wait in deadline
+queues sorted by time. Each tick only pops what has come due.
+
+Raised and cleared alerts go to ``recent``, newest first, and open alerts
+stay in ``open``. The Dashboard banner and the sidebar live feed read both.
+Rule evaluations are counted, and timed as ``alerts.*`` telemetry spans.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aegis.scoring import track_contacts
+from aegis.store import TIME_ACTUAL
+from aegis.telemetry import TELEMETRY, Span
+
+log = logging.getLogger(__name__)
+
+# Ships closer than this to a restricted zone raise a proximity alert.
+PROXIMITY_ALERT_NM = float(os.environ.get('AEGIS_ALERT_PROXIMITY_NM', 60))
+# Vessels not flying this flag raise a flag alert.
+HOME_FLAG = os.environ.get('AEGIS_HOME_FLAG', 'US')
+# Custody steps active longer than this raise a stuck alert. Steps named
+# with one of LONG_STEPS last the voyage and are watched through the ETA.
+STUCK_HOURS = float(os.environ.get('AEGIS_STUCK_HOURS', 48))
+LONG_STEPS = ('Transit',)
+# How often time-driven rules are checked when no updates arrive.
+TICK_SECONDS = 1.0
+# Queued updates evaluated together at most.
+MAX_BATCH = 256
+RECENT_ALERTS = 100
+RATE_WINDOW_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class Alert:
+    """One rule breach of one shipment, or the all-clear that ends it."""
+    rule: str
+    title: str
+    shipment_id: str
+    detail: str
+    time: datetime
+    cleared: bool = False
+
+    @property
+    def message(self):
+        return f"{self.title}: {self.detail}" + (" (cleared)" if self.cleared else "")
+
+
+class _Deadlines:
+    """Rows to re-check at given times, popped in time order."""
+
+    def __init__(self):
+        self.times = np.empty(0, dtype='datetime64[s]')
+        self.rows = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, times, rows):
+        times = np.asarray(times, dtype='datetime64[s]')
+        keep = ~np.isnat(times)
+        if not keep.any():
+            return
+        times, rows = times[keep], np.asarray(rows, dtype=np.int64)[keep]
+        order = np.argsort(times, kind='stable')
+        at = np.searchsorted(self.times, times[order], side='right')
+        self.times = np.insert(self.times, at, times[order])
+        self.rows = np.insert(self.rows, at, rows[order])
+
+    def pop(self, now):
+        """Rows whose time is at or before ``now``."""
+        due = np.searchsorted(self.times, np.datetime64(now, 's'), side='right')
+        rows, self.times, self.rows = self.rows[:due], self.times[due:], self.rows[due:]
+        return np.unique(rows)
+
+
+# ============ RULES ============
+
+class ProximityRule:
+    """A ship closer than ``threshold_nm`` to a restricted zone."""
+    name = 'proximity'
+    title = "Restricted-zone proximity"
+    watches = ('lat', 'lng')
+
+    def __init__(self, threshold_nm=PROXIMITY_ALERT_NM):
+        self.threshold_nm = threshold_nm
+
+    def check(self, engine, rows, now):
+        store, codes = engine.store, engine.geofence.codes
+        lat, lng = store.column('lat')[rows], store.column('lng')[rows]
+        closest, _ = track_contacts(engine.geofence, lat, lng, lat, lng)
+        if not codes:
+            return np.zeros(len(rows), dtype=bool), []
+        nearest = closest.argmin(axis=1)
+        distance = closest[np.arange(len(rows)), nearest]
+        breached = distance < self.threshold_nm
+        return breached, [f"{nm:,.0f} nm from {codes[z]}" if nm > 0 else f"inside {codes[z]}"
+                          for nm, z in zip(distance[breached].tolist(), nearest[breached].tolist())]
+
+
+class FlagRule:
+    """A vessel flying another flag than ``home``; blank flags are unknown, not foreign."""
+    name = 'flag'
+    title = "Foreign-flagged vessel"
+    watches = ('vessel_flag',)
+
+    def __init__(self, home=HOME_FLAG):
+        self.home = home
+
+    def check(self, engine, rows, now):
+        store = engine.store
+        dictionary = store.dictionaries['vessel_flag']
+        codes = store.column('vessel_flag')[rows]
+        breached = (codes != dictionary.code(self.home)) & (codes != dictionary.code(''))
+        return breached, [f"{vessel} flagged {flag}" for vessel, flag in
+                          zip(store.decode('vessel', rows[breached]), store.decode('vessel_flag', rows[breached]))]
+
+
+class OverdueRule:
+    """An undelivered shipment whose ETA has passed."""
+    name = 'overdue'
+    title = "ETA passed"
+    watches = ('eta', 'status')
+
+    def check(self, engine, rows, now):
+        store = engine.store
+        eta = store.column('eta')[rows]
+        open_ = ~np.isnat(eta) & (store.column('status')[rows] != store.dictionaries['status'].code('Delivered'))
+        breached = open_ & (eta <= np.datetime64(now, 's'))
+        engine.schedule(self, eta[open_ & ~breached], rows[open_ & ~breached])
+        return breached, [f"due {pd.Timestamp(stamp):%Y-%m-%d %H:%M}" for stamp in eta[breached]]
+
+
+class StuckCustodyRule:
+    """A custody step active for longer than ``hours``."""
+    name = 'stuck'
+    title = "Custody step stuck"
+    watches = ('custody',)
+
+    def __init__(self, hours=STUCK_HOURS, long_steps=LONG_STEPS):
+        self.limit = np.timedelta64(int(hours * 3600), 's')
+        self.long_steps = long_steps
+
+    def _active_steps(self, store, rows):
+        """The oldest active step per row, as ``(rows with one, step codes, active since)``."""
+        custody = store.custody
+        n = len(custody)
+        if len(rows) <= 64:
+            events = np.concatenate([custody.shipment_events(row) for row in rows.tolist()] or [np.arange(0)])
+            events = np.sort(events)
+        else:
+            events = np.flatnonzero(np.isin(custody.shipment[:n], rows))
+        # Each step's latest event; events are in append order
+        steps = pd.DataFrame({'shipment': custody.shipment[events], 'step': custody.codes['step'][events],
+                              'event': events})
+        latest = steps.groupby(['shipment', 'step'], sort=False)['event'].last().to_numpy()
+        step_names = custody.dictionaries['step'].values
+        long_step = np.array([name.startswith(self.long_steps) for name in step_names], dtype=bool)
+        active = ((custody.codes['status'][latest] == custody.dictionaries['status'].code('active'))
+                  & (custody.kind[latest] == TIME_ACTUAL) & ~long_step[custody.codes['step'][latest]])
+        latest = latest[active]
+        latest = latest[np.argsort(custody.time[latest], kind='stable')]
+        shipments, first = np.unique(custody.shipment[latest], return_index=True)
+        return shipments.astype(np.int64), custody.codes['step'][latest[first]], custody.time[latest[first]]
+
+    def check(self, engine, rows, now):
+        store = engine.store
+        with_active, steps, since = self._active_steps(store, rows)
+        due = since + self.limit
+        stuck = due <= np.datetime64(now, 's')
+        engine.schedule(self, due[~stuck], with_active[~stuck])
+        breached = np.isin(rows, with_active[stuck])
+        names = store.custody.dictionaries['step'].values
+        # rows and with_active are both sorted, so the stuck ones line up
+        return breached, [f"{names[step]} active since {pd.Timestamp(stamp):%Y-%m-%d %H:%M}"
+                          for step, stamp in zip(steps[stuck].tolist(), since[stuck])]
+
+
+def default_rules():
+    return [ProximityRule(), FlagRule(), OverdueRule(), StuckCustodyRule()]
+
+
+# ============ ENGINE ============
+
+class AlertEngine:
+    """Background thread evaluating alert rules over store updates and deadlines."""
+
+    def __init__(self, store, geofence, rules=None, tick_seconds=TICK_SECONDS):
+        self.store = store
+        self.geofence = geofence
+        self.rules = rules if rules is not None else default_rules()
+        self.tick_seconds = tick_seconds
+        self._watchers = {}
+        for rule in self.rules:
+            for name in rule.watches:
+                self._watchers.setdefault(name, []).append(rule)
+        self.recent = deque(maxlen=RECENT_ALERTS)
+        self.open = {rule.name: {} for rule in self.rules}    # rule -> row -> Alert
+        self._breached = {rule.name: np.zeros(0, dtype=bool) for rule in self.rules}
+        self._deadlines = {rule.name: _Deadlines() for rule in self.rules}
+        self.evaluated = Counter()
+        self.raised = Counter()
+        self.cleared = Counter()
+        self.last_batch_ms = 0.0
+        self.failures = 0          # evaluations that raised; the thread keeps going
+        self.last_error = None
+        self._window = deque()     # (time, rows evaluated); appended and pruned by the alert thread
+        self._work = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='aegis-alerts', daemon=True)
+        with store.lock:
+            store.subscribe(self)
+            self._queue(None, store.rows())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self.store.unsubscribe(self)
+        self._stop.set()
+        self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def use(self, geofence):
+        """Check proximity against ``geofence`` from now on; a new restricted list re-checks the fleet."""
+        if geofence.version != self.geofence.version:
+            self.geofence = geofence
+            self._queue(('lat',), self.store.rows())
+
+    def schedule(self, rule, times, rows):
+        """Re-check ``rows`` under ``rule`` once each of ``times`` has passed."""
+        self._deadlines[rule.name].add(times, rows)
+
+    # ---- store notifications: queue the rows, evaluate later ----
+
+    def _queue(self, names, rows):
+        self._work.put((time.monotonic(), names, np.array(rows, dtype=np.int64, ndmin=1)))
+
+    def on_append(self, rows):
+        self._queue(None, rows)
+
+    def on_update(self, row, changes):
+        if any(name in self._watchers for name in changes):
+            self._queue(tuple(changes), [row])
+
+    def on_update_many(self, rows, names):
+        if any(name in self._watchers for name in names):
+            self._queue(tuple(names), rows)
+
+    def on_custody(self, row):
+        self._queue(('custody',), [row])
+
+    # ---- evaluation ----
+
+    def _run(self):
+        while not self._stop.is_set():
+            items = []
+            try:
+                items.append(self._work.get(timeout=self.tick_seconds))
+                while len(items) < MAX_BATCH:
+                    items.append(self._work.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self.evaluate(items)
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = repr(exc)
+                log.exception("Alert evaluation failed (%d so far)", self.failures)
+
+    def evaluate(self, items, now=None):
+        """Evaluate queued ``(queued at, columns, rows)`` updates and whatever deadlines are due."""
+        started = time.perf_counter()
+        now = now or datetime.now()
+        pending = {}
+        for _, names, rows in items:
+            rules = self.rules if names is None else [rule for rule in self.rules
+                                                      if any(name in rule.watches for name in names)]
+            for rule in rules:
+                pending.setdefault(rule.name, []).append(rows)
+        count = 0
+        for rule in self.rules:
+            due = self._deadlines[rule.name].pop(now)
+            batches = pending.get(rule.name, []) + ([due] if len(due) else [])
+            if not batches:
+                continue
+            rows = np.unique(np.concatenate(batches))
+            with Span(f"alerts.{rule.name}"):
+                self._apply(rule, rows, now)
+            self.evaluated[rule.name] += len(rows)
+            count += len(rows)
+        if items:
+            TELEMETRY.record("alerts.lag", time.monotonic() - min(queued for queued, _, _ in items))
+        if count:
+            stamp = time.monotonic()
+            self._window.append((stamp, count))
+            while stamp - self._window[0][0] > RATE_WINDOW_SECONDS:
+                self._window.popleft()
+            self.last_batch_ms = (time.perf_counter() - started) * 1e3
+
+    def _apply(self, rule, rows, now):
+        breached, details = rule.check(self, rows, now)
+        flags = self._breached[rule.name]
+        if len(flags) < len(self.store):
+            flags = self._breached[rule.name] = np.concatenate(
+                [flags, np.zeros(max(len(self.store), 2 * len(flags)) - len(flags), dtype=bool)])
+        was = flags[rows]
+        raised = rows[breached & ~was]
+        cleared = rows[~breached & was]
+        flags[rows] = breached
+        open_ = self.open[rule.name]
+        with self._lock:
+            for row, detail in zip(raised.tolist(), [d for d, new in zip(details, (~was[breached]).tolist()) if new]):
+                alert = Alert(rule.name, rule.title, self.store.id_of(row), detail, now)
+                open_[row] = alert
+                self.recent.appendleft(alert)
+            for row in cleared.tolist():
+                alert = open_.pop(row)
+                self.recent.appendleft(Alert(rule.name, rule.title, alert.shipment_id, alert.detail, now, True))
+        self.raised[rule.name] += len(raised)
+        self.cleared[rule.name] += len(cleared)
+
+    # ---- reads ----
+
+    def open_counts(self):
+        """Open alerts per rule name."""
+        return {name: len(alerts) for name, alerts in self.open.items()}
+
+    def latest(self, count, cleared=False):
+        """The ``count`` newest alerts, all-clears included only if ``cleared``."""
+        with self._lock:
+            alerts = list(self.recent)
+        return [alert for alert in alerts if cleared or not alert.cleared][:count]
+
+    def rate(self):
+        """Rule evaluations (rows checked) per second over the recent window."""
+        now = time.monotonic()
+        window = list(self._window)   # a snapshot: the alert thread appends meanwhile
+        return sum(n for t, n in window if now - t <= RATE_WINDOW_SECONDS) / RATE_WINDOW_SECONDS
+
+    def metrics(self):
+        """One row per rule: rows evaluated, alerts raised, cleared and open, deadlines waiting."""
+        return pd.DataFrame([{
+            'rule': rule.name,
+            'evaluated': self.evaluated[rule.name],
+            'raised': self.raised[rule.name],
+            'cleared': self.cleared[rule.name],
+            'open': len(self.open[rule.name]),
+            'scheduled': len(self._deadlines[rule.name]),
+        } for rule in self.rules], columns=['rule', 'evaluated', 'raised', 'cleared', 'open', 'scheduled'])
+
+    def backlog(self):
+        """Queued updates not yet evaluated."""
+        return self._work.qsize()
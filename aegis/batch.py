@@ -0,0 +1,191 @@
+"""Batch route evaluation.
+
+Re-plans many ``(origin, waypoint, destination, exclude_126)`` requests at
+once, for example after a sanctions update. Identical requests are planned
+only once. Small batches run in-process, where a single query costs about a
+millisecond. Larger ones are split into chunks and spread over a process
+pool. Each worker receives the already-built :class:`RoutePlanner` once, at
+start-up, so the graph and the per-lane geofence checks are never rebuilt
+per request, and the pool is kept for later batches with the same planner.
+Workers are spawned rather than forked: the Streamlit server
+that calls this is threaded, and a forked child can inherit a held lock.
+
+Usable without Streamlit::
+
+    from aegis.batch import evaluate_routes, read_requests
+    results = evaluate_routes(read_requests('reroute.csv'))
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from aegis.geofence import Geofence
+from aegis.planner import RoutePlanner
+from aegis.repository import DATABASE_URL, stored_jurisdictions
+from aegis.routing import RouteGraph
+from aegis.seed import RESTRICTED_JURISDICTIONS
+
+REQUEST_COLUMNS = ('origin', 'waypoint', 'destination', 'exclude_126')
+RESULT_COLUMNS = ('origin', 'waypoint', 'destination', 'exclude_126', 'route', 'distance_nm',
+                  'transit_days', 'cost_k', 'sovereignty_score', 'contact', 'error')
+
+# A request takes about 1 ms in-process. A running pool adds about 0.2 ms
+# per request (1,024 requests: 1.2 s through a warm 2-worker pool on one
+# core, 1.0 s in-process), so with a spare core it pays from a few hundred.
+IN_PROCESS_LIMIT = 256
+# Starting the pool costs about 1.5 s (spawning, imports, shipping the
+# planner), so a batch starts one only if it is at least this big.
+COLD_POOL_LIMIT = 2048
+CHUNK_SIZE = 64
+
+_TRUE = {'1', 'true', 'yes', 'y', 't'}
+
+# The planner handed to each pool worker by ``_init_worker``.
+_worker_planner = None
+
+# The worker pool, kept between batches for as long as the planner stays the same.
+_pool = None
+_pool_key = None   # (planner, processes) the pool was started for
+_pool_lock = threading.Lock()
+
+
+def default_planner(url=DATABASE_URL):
+    """Build a planner for the database's restricted list, outside any Streamlit cache.
+
+    The database is only read; one the app has not set up yet falls back to
+    the seed list.
+    """
+    jurisdictions = stored_jurisdictions(url)
+    return RoutePlanner(RouteGraph(), Geofence(RESTRICTED_JURISDICTIONS if jurisdictions is None else jurisdictions))
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE
+    return bool(value) and not pd.isna(value)
+
+
+def _stop(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    value = str(value).strip()
+    return None if value in ('', 'None') else value
+
+
+def normalize(request):
+    """Coerce a request tuple or mapping into ``(origin, waypoint, destination, exclude_126)``."""
+    if isinstance(request, dict):
+        request = tuple(request.get(name) for name in REQUEST_COLUMNS)
+    origin, waypoint, destination, *rest = request
+    exclude = _flag(rest[0]) if rest and rest[0] is not None else True
+    return _stop(origin), _stop(waypoint), _stop(destination), exclude
+
+
+def read_requests(source):
+    """Read requests from a CSV path or file-like object.
+
+    Expects ``origin``, ``destination`` and optionally ``waypoint`` and
+    ``exclude_126`` columns (missing exclusion defaults to on).
+    """
+    df = pd.read_csv(source, dtype=str, keep_default_na=False)
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = {'origin', 'destination'} - set(df.columns)
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(sorted(missing))}")
+    for name, default in (('waypoint', ''), ('exclude_126', 'true')):
+        if name not in df.columns:
+            df[name] = default
+    return [normalize(r) for r in df[list(REQUEST_COLUMNS)].itertuples(index=False, name=None)]
+
+
+def evaluate(planner, request):
+    """Plan one normalized request and return its result row."""
+    origin, waypoint, destination, exclude = request
+    row = dict(zip(REQUEST_COLUMNS, request), route=None, distance_nm=None, transit_days=None,
+               cost_k=None, sovereignty_score=None, contact='', error='')
+    unknown = [name for name in (origin, waypoint, destination) if name and name not in planner.graph]
+    if not origin or not destination:
+        row['error'] = 'Origin and destination are required'
+    elif unknown:
+        row['error'] = f"Unknown port: {', '.join(unknown)}"
+    else:
+        plan = planner.plan(origin, destination, waypoint, exclude_restricted=exclude)
+        if plan is None:
+            row['error'] = 'No compliant sea route' if exclude else 'No sea route'
+        else:
+            row.update(route=plan.route.summary,
+                       distance_nm=round(plan.route.distance_nm, 1),
+                       transit_days=round(plan.route.transit_days, 2),
+                       cost_k=round(plan.route.cost_k, 1),
+                       sovereignty_score=plan.sovereignty_score,
+                       contact=', '.join(plan.assessment.contact))
+    return row
+
+
+def _init_worker(planner):
+    global _worker_planner
+    _worker_planner = planner
+
+
+def _evaluate_chunk(requests):
+    return [evaluate(_worker_planner, request) for request in requests]
+
+
+def _shutdown_pool():
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool = _pool_key = None
+
+
+atexit.register(_shutdown_pool)
+
+
+def _worker_pool(planner, processes):
+    """The running pool for ``planner``, started (and the previous one shut down) if need be.
+
+    Spawning workers and shipping them the planner costs over a second, so
+    the pool outlives a single batch.
+    """
+    global _pool, _pool_key
+    if not _pool_ready(planner, processes):
+        _shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=_init_worker, initargs=(planner,))
+        _pool_key = (planner, processes)
+    return _pool
+
+
+def _pool_ready(planner, processes):
+    return _pool_key is not None and _pool_key[0] is planner and _pool_key[1] == processes
+
+
+def evaluate_routes(requests, planner=None, processes=None, chunk_size=CHUNK_SIZE):
+    """Evaluate many route requests and return one result row per request.
+
+    ``requests`` holds tuples or mappings of ``origin``, ``waypoint``,
+    ``destination`` and ``exclude_126``. ``processes`` caps the pool size
+    (default: CPU count). Pass ``processes=1`` to stay in-process.
+    """
+    planner = planner or default_planner()
+    requests = [normalize(r) for r in requests]
+    unique = list(dict.fromkeys(requests))
+    processes = processes or os.cpu_count() or 1
+
+    with _pool_lock:
+        limit = IN_PROCESS_LIMIT if _pool_ready(planner, processes) else COLD_POOL_LIMIT
+        use_pool = processes > 1 and len(unique) > limit
+        if use_pool:
+            chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+            pool = _worker_pool(planner, processes)
+            results = [row for chunk in pool.map(_evaluate_chunk, chunks) for row in chunk]
+    if not use_pool:
+        results = [evaluate(planner, request) for request in unique]
+
+    by_request = dict(zip(unique, results))
+    return pd.DataFrame([by_request[r] for r in requests], columns=list(RESULT_COLUMNS))
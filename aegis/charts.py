@@ -0,0 +1,62 @@
+"""Compliance page charts.
+
+Building a plotly figure validates every property it is given, which costs
+more than the rest of a Compliance rerun. The inputs here are a handful of
+numbers that rarely change between reruns, so each figure is built once per
+distinct input and reused; ``st.plotly_chart`` only reads the figure.
+"""
+
+import functools
+
+import plotly.graph_objects as go
+
+CLEAN_COLOR = '#10b981'
+WARN_COLOR = '#f59e0b'
+RISK_COLOR = '#f43f5e'
+
+
+@functools.lru_cache(maxsize=8)
+def clean_pie(clean, total):
+    """Clean versus at-risk shipments, with the clean count in the middle."""
+    at_risk = total - clean
+    fig = go.Figure(go.Pie(
+        values=[clean, at_risk],
+        labels=['Clean', 'At Risk'],
+        hole=0.7,
+        marker_colors=[CLEAN_COLOR, RISK_COLOR],
+        textinfo='none',
+    ))
+    fig.update_layout(
+        height=200,
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+        showlegend=False,
+        annotations=[dict(text=f'{clean:,}/{total:,}<br>CLEAN', x=0.5, y=0.5, font_size=16,
+                          font_color=CLEAN_COLOR if not at_risk else RISK_COLOR, showarrow=False)]
+    )
+    return fig
+
+
+@functools.lru_cache(maxsize=16)
+def trend_bars(labels, scores, observations):
+    """Compliance score per rollup bucket; ``labels``, ``scores`` and ``observations`` are aligned tuples."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=list(labels),
+        y=list(scores),
+        marker_color=[CLEAN_COLOR if score == 100 else WARN_COLOR for score in scores],
+        text=list(scores),
+        textposition='outside',
+        customdata=list(observations),
+        hovertemplate="%{x}: %{y}% over %{customdata} observations<extra></extra>",
+    ))
+    fig.update_layout(
+        height=300,
+        margin=dict(l=0, r=0, t=20, b=0),
+        paper_bgcolor='#0a0f1a',
+        plot_bgcolor='#0a0f1a',
+        yaxis=dict(range=[min([90, *scores]) - 2, 102], gridcolor='#1e293b', tickfont=dict(color='#64748b')),
+        xaxis=dict(tickfont=dict(color='#64748b')),
+        font=dict(color='#cbd5e1'),
+    )
+    return fig
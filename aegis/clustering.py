@@ -0,0 +1,104 @@
+"""Grid clustering and level of detail for the God View.
+
+Ship positions are bucketed into a regular lat/lng grid at every zoom level
+up front, halving the cell size per level. A map request names a viewport
+and a zoom. If the ships inside the viewport fit the marker budget they are
+returned individually, otherwise their grid clusters are, stepping to coarser
+levels until the clusters fit too. The payload sent to the browser is
+therefore bounded by ``max_markers`` whatever the fleet size.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+ZOOM_LEVELS = 7
+# Cell edge in degrees at zoom 0; each further level halves it.
+BASE_CELL_DEGREES = 45.0
+MAX_MARKERS = 500
+
+
+def cell_degrees(zoom):
+    return BASE_CELL_DEGREES / (2 ** zoom)
+
+
+@dataclass
+class Clusters:
+    """Occupied grid cells at one zoom level."""
+    lat: np.ndarray
+    lng: np.ndarray
+    count: np.ndarray
+    in_transit: np.ndarray
+
+    def __len__(self):
+        return len(self.count)
+
+
+@dataclass
+class MapView:
+    """What to draw for a viewport: individual rows (at ``lat``/``lng``) or clusters, never both."""
+    rows: np.ndarray = None
+    clusters: Clusters = None
+    zoom: int = 0
+    lat: np.ndarray = None
+    lng: np.ndarray = None
+
+    @property
+    def size(self):
+        return len(self.rows) if self.rows is not None else len(self.clusters)
+
+
+def _in_bounds(lat, lng, bounds):
+    """``bounds`` is ``(south, north, west, east)``; west > east wraps the antimeridian."""
+    south, north, west, east = bounds
+    inside = (lat >= south) & (lat <= north)
+    if west <= east:
+        return inside & (lng >= west) & (lng <= east)
+    return inside & ((lng >= west) | (lng <= east))
+
+
+class ClusterIndex:
+    """Per-zoom grid clusters over a snapshot of shipment positions.
+
+    Positions are the store's current ones unless ``lat`` and ``lng`` are
+    given for ``rows``, as when replaying archived tracks.
+    """
+
+    def __init__(self, store, rows=None, lat=None, lng=None):
+        if rows is None:
+            rows = store.rows(~store.mask('status', 'Delivered'))
+        self.rows = rows
+        self.lat = np.asarray(store.column('lat')[rows] if lat is None else lat, dtype=np.float64)
+        self.lng = np.asarray(store.column('lng')[rows] if lng is None else lng, dtype=np.float64)
+        self.in_transit = store.mask('status', 'In Transit')[rows]
+        self.levels = [self._build_level(zoom) for zoom in range(ZOOM_LEVELS)]
+
+    def _build_level(self, zoom):
+        cell = cell_degrees(zoom)
+        cols = int(np.ceil(360 / cell))
+        rows_ = int(np.ceil(180 / cell))
+        y = np.clip(((self.lat + 90) // cell).astype(np.int64), 0, rows_ - 1)
+        x = np.clip(((self.lng + 180) // cell).astype(np.int64), 0, cols - 1)
+        keys = y * cols + x
+        count = np.bincount(keys, minlength=rows_ * cols)
+        occupied = np.flatnonzero(count)
+        count = count[occupied]
+        lat = np.bincount(keys, weights=self.lat, minlength=rows_ * cols)[occupied] / count
+        lng = np.bincount(keys, weights=self.lng, minlength=rows_ * cols)[occupied] / count
+        transit = np.bincount(keys, weights=self.in_transit, minlength=rows_ * cols)[occupied]
+        return Clusters(lat=lat, lng=lng, count=count, in_transit=transit.astype(np.int64))
+
+    def view(self, bounds, zoom, max_markers=MAX_MARKERS):
+        """Markers for the viewport ``bounds`` at ``zoom``, at most ``max_markers``."""
+        inside = _in_bounds(self.lat, self.lng, bounds)
+        if np.count_nonzero(inside) <= max_markers:
+            return MapView(rows=self.rows[inside], zoom=zoom, lat=self.lat[inside], lng=self.lng[inside])
+
+        for level in range(min(zoom, ZOOM_LEVELS - 1), -1, -1):
+            clusters = self.levels[level]
+            visible = _in_bounds(clusters.lat, clusters.lng, bounds)
+            if np.count_nonzero(visible) <= max_markers or level == 0:
+                return MapView(clusters=Clusters(lat=clusters.lat[visible], lng=clusters.lng[visible],
+                                                 count=clusters.count[visible],
+                                                 in_transit=clusters.in_transit[visible]),
+                               zoom=level)
@@ -0,0 +1,444 @@
+"""Shared data-loading layer.
+
+Streamlit re-executes the app script on every interaction, so anything built
+here is cached per process: ``st.cache_resource`` holds the single shipment
+store, its indexes and the filtered row sets that all sessions share, and
+``st.cache_data`` memoizes the page frames handed to the browser. Both caches
+have an explicit TTL and entry limit and are keyed on the data source, so
+pointing the app at another source produces a fresh load on the next rerun.
+The public getters are recorded as ``data.*`` telemetry spans.
+
+Shipments, custody, audits, jurisdictions and saved routes persist in the
+database at ``AEGIS_DATABASE_URL`` (see :mod:`aegis.repository`), which is
+filled from the seed data the first time it is opened.
+"""
+
+import atexit
+import os
+import time
+
+import streamlit as st
+
+from aegis import seed, synthetic
+from aegis.alerts import AlertEngine
+from aegis.clustering import ClusterIndex
+from aegis.eta import EtaPredictor
+from aegis.facets import FACETS, FacetIndex
+from aegis.geofence import Geofence, jurisdictions_version
+from aegis.ingest import PositionIngestor, feed_from_spec
+from aegis.kpis import KpiAggregator
+from aegis.paging import sort_rows
+from aegis.planner import RoutePlanner
+from aegis.repository import DATABASE_URL, Repository, StoreWriter, open_pool
+from aegis.rollups import ComplianceRollup
+from aegis.route_cache import RouteCache
+from aegis.routing import RouteGraph
+from aegis.scoring import SovereigntyScorer
+from aegis.search import SEARCH_FIELDS, SearchIndex
+from aegis.store import ShipmentStore
+from aegis.tracks import TrackArchive
+from aegis.telemetry import timed
+
+# Reload the shared store at least this often, even if nothing changed.
+DATA_TTL_SECONDS = int(os.environ.get('AEGIS_DATA_TTL', 3600))
+# Derived row sets and frames are cheap to rebuild, keep them for a shorter time.
+FRAME_TTL_SECONDS = int(os.environ.get('AEGIS_FRAME_TTL', 300))
+# Size-based eviction: at most this many stores (one per data fingerprint)
+# and derived row sets / frames stay resident.
+MAX_STORES = 2
+MAX_FRAMES = 128
+# Position feed: "sim" (default stand-in), "file:/path", "udp:host:port" or "off".
+FEED = os.environ.get('AEGIS_FEED', 'sim')
+# Serve a seeded synthetic fleet of this many shipments instead of the
+# database's, for load testing; 0 uses the database.
+SYNTHETIC_SHIPMENTS = int(os.environ.get('AEGIS_SYNTHETIC_SHIPMENTS', 0))
+SYNTHETIC_SEED = int(os.environ.get('AEGIS_SYNTHETIC_SEED', 0))
+# How often live fragments (map, asset cards, feed) refresh, in seconds.
+LIVE_REFRESH_SECONDS = float(os.environ.get('AEGIS_LIVE_REFRESH', 2))
+# The God View's clusters follow the feed's positions at most this often, in seconds.
+CLUSTER_REFRESH_SECONDS = float(os.environ.get('AEGIS_CLUSTER_REFRESH', 10))
+# Predicted ETAs of changed shipments are re-inferred at most this often, in seconds.
+ETA_REFRESH_SECONDS = float(os.environ.get('AEGIS_ETA_REFRESH', 5))
+# Where position history is archived, one directory per day, and how far back
+# the God View draws each ship's track, in hours.
+TRACKS_DIR = os.environ.get('AEGIS_TRACKS_DIR', 'tracks')
+TRACK_HOURS = float(os.environ.get('AEGIS_TRACK_HOURS', 24))
+
+TABLE_COLUMNS = {
+    'id': 'Container ID',
+    'cargo': 'Cargo',
+    'origin': 'Origin',
+    'destination': 'Destination',
+    'status': 'Status',
+    'progress': 'Progress',
+    'sovereignty_score': 'Sovereignty',
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_repository(url=DATABASE_URL):
+    """The pooled database connection shared by all sessions, seeded when empty."""
+    repository = Repository(open_pool(url))
+    if repository.is_empty():
+        repository.seed(seed.shipment_records(), seed.audit_records(), seed.RESTRICTED_JURISDICTIONS)
+    return repository
+
+
+def data_fingerprint():
+    """Identify the current version of the backing data.
+
+    For the database this includes :meth:`Repository.shipments_marker`, so
+    shipments loaded by another writer bring in a fresh store on the next rerun.
+    """
+    if SYNTHETIC_SHIPMENTS:
+        return f"synthetic:{SYNTHETIC_SHIPMENTS}:{SYNTHETIC_SEED}"
+    return f"db:{DATABASE_URL}:{get_repository().shipments_marker()}"
+
+
+# Writer threads persist a store's writes; only the newest store's runs, and
+# whatever they hold is written before the process exits.
+_store_writers = []
+
+
+def _close_store_writers():
+    while _store_writers:
+        _store_writers.pop().close()
+
+
+atexit.register(_close_store_writers)
+
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=MAX_STORES, show_spinner=False)
+def _load_store(fingerprint):
+    if SYNTHETIC_SHIPMENTS:
+        store = synthetic.synthetic_store(SYNTHETIC_SHIPMENTS, SYNTHETIC_SEED, source=fingerprint)
+    else:
+        repository = get_repository()
+        store = ShipmentStore(fingerprint)
+        for chunk in repository.shipment_chunks():
+            store.append(chunk)
+        _close_store_writers()
+        _store_writers.append(StoreWriter(repository, store))   # persists the store's writes from here on
+    _load_scorer(store, store.instance)   # scores the fleet and keeps the scores current
+    return store
+
+
+@timed('data.store')
+def get_store():
+    """Return the process-wide shipment store, loading it on first use."""
+    return _load_store(data_fingerprint())
+
+
+# Keyed on the store instance and kept as long as it: a second scorer would
+# write every score twice.
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_scorer(_store, instance):
+    return SovereigntyScorer(_store, get_geofence())
+
+
+@timed('data.scorer')
+def get_scorer(store):
+    """The fleet's sovereignty scorer; a changed restricted list rescores every shipment in the background."""
+    scorer = _load_scorer(store, store.instance)
+    scorer.use(get_geofence())
+    return scorer
+
+
+# Indexes, KPIs and rollups are kept current by store notifications, so like
+# the workers below they are keyed on the store instance, with no ttl, and
+# only the newest store's stay subscribed.
+_search_indexes = []
+_facet_indexes = []
+_kpi_aggregators = []
+_rollups = []
+
+
+def _close(followers):
+    while followers:
+        followers.pop().close()
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_search_index(_store, instance):
+    _close(_search_indexes)
+    _search_indexes.append(SearchIndex(_store))
+    return _search_indexes[-1]
+
+
+@timed('data.search_index')
+def get_search_index(store):
+    """Return the shared search index, kept current by store notifications."""
+    return _load_search_index(store, store.instance)
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_facet_index(_store, instance):
+    _close(_facet_indexes)
+    _facet_indexes.append(FacetIndex(_store))
+    return _facet_indexes[-1]
+
+
+@timed('data.facet_index')
+def get_facet_index(store):
+    """Return the shared facet bitmaps and counters for ``store``."""
+    return _load_facet_index(store, store.instance)
+
+
+# Feed threads outlive cache eviction, so track them: only the newest store is fed.
+_ingestors = []
+
+
+def _stop_ingestors():
+    while _ingestors:
+        _ingestors.pop().stop()
+
+
+# Keyed on the store instance: a reload from the same source gets its own feed.
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_ingestor(_store, instance, feed):
+    _stop_ingestors()
+    feed = feed_from_spec(feed, _store)
+    if feed is None:
+        return None
+    _ingestors.append(PositionIngestor(_store, feed).start())
+    return _ingestors[-1]
+
+
+@timed('data.ingestor')
+def get_ingestor(store):
+    """The background position feed for ``store``; ``None`` when the feed is off."""
+    return _load_ingestor(store, store.instance, FEED)
+
+
+# Alert workers, like feed threads, outlive cache eviction and are keyed on the
+# store instance; only the newest store's runs.
+_alert_engines = []
+
+
+def _stop_alert_engines():
+    while _alert_engines:
+        _alert_engines.pop().stop()
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_alert_engine(_store, instance):
+    _stop_alert_engines()
+    _alert_engines.append(AlertEngine(_store, get_geofence()).start())
+    return _alert_engines[-1]
+
+
+@timed('data.alerts')
+def get_alert_engine(store):
+    """The background alert rules for ``store``, checking proximity against the current restricted list."""
+    engine = _load_alert_engine(store, store.instance)
+    engine.use(get_geofence())
+    return engine
+
+
+# Archives follow their store's writes and are keyed on the store instance;
+# only the newest store's is kept open.
+_track_archives = []
+
+
+def _close_track_archives():
+    while _track_archives:
+        _track_archives.pop().close()
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_track_archive(_store, instance):
+    _close_track_archives()
+    _track_archives.append(TrackArchive(_store, TRACKS_DIR))
+    return _track_archives[-1]
+
+
+@timed('data.tracks')
+def get_track_archive(store):
+    """The day-partitioned position history of ``store``'s ships."""
+    return _load_track_archive(store, store.instance)
+
+
+# Predictors follow their store's writes and are keyed on the store instance;
+# only the newest store's stays subscribed. No ttl: they rebuild their lane
+# statistics themselves.
+_eta_predictors = []
+
+
+def _close_eta_predictors():
+    while _eta_predictors:
+        _eta_predictors.pop().close()
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_eta_predictor(_store, instance):
+    _close_eta_predictors()
+    _eta_predictors.append(EtaPredictor(_store, get_route_graph(), stats_seconds=DATA_TTL_SECONDS))
+    return _eta_predictors[-1]
+
+
+@timed('data.eta')
+def get_eta_predictor(store):
+    """Predicted ETAs for ``store``; shipments changed since the last refresh are re-inferred in one batch."""
+    predictor = _load_eta_predictor(store, store.instance)
+    predictor.refresh(max_age=ETA_REFRESH_SECONDS)
+    return predictor
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_kpis(_store, instance):
+    _close(_kpi_aggregators)
+    _kpi_aggregators.append(KpiAggregator(_store, get_repository().audits(), seed.last_incident(),
+                                          scorer=get_scorer(_store)))
+    return _kpi_aggregators[-1]
+
+
+@timed('data.kpis')
+def get_kpis(store):
+    """The running KPI aggregates for ``store``."""
+    return _load_kpis(store, store.instance)
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_rollups(_store, instance):
+    _close(_rollups)
+    _rollups.append(ComplianceRollup(_store))
+    return _rollups[-1]
+
+
+@timed('data.rollups')
+def get_rollups(store):
+    """The materialized compliance buckets for ``store``."""
+    return _load_rollups(store, store.instance)
+
+
+def cluster_key(store):
+    """Cache key for :func:`get_cluster_index`.
+
+    Appends and status changes move it at once, positions only every
+    ``CLUSTER_REFRESH_SECONDS``: feed batches alone do not rebuild the clusters.
+    """
+    return store.columns_key(('status',)), int(time.time() // CLUSTER_REFRESH_SECONDS)
+
+
+@st.cache_resource(ttl=FRAME_TTL_SECONDS, max_entries=MAX_STORES, show_spinner=False)
+def get_cluster_index(_store, key):
+    """Map clusters for one :func:`cluster_key`, shared by every session."""
+    return ClusterIndex(_store)
+
+
+@st.cache_resource(show_spinner=False)
+def get_route_graph():
+    """The maritime route graph, built once per process."""
+    return RouteGraph()
+
+
+@st.cache_resource(ttl=FRAME_TTL_SECONDS, show_spinner=False)
+def _load_jurisdictions(url):
+    jurisdictions = get_repository(url).jurisdictions()
+    return jurisdictions, jurisdictions_version(jurisdictions)
+
+
+def get_jurisdictions():
+    """The restricted jurisdictions, re-read from the database every few minutes."""
+    return _load_jurisdictions(DATABASE_URL)[0]
+
+
+def get_audits(limit=None):
+    """The latest ``limit`` audits (all by default), newest first; one indexed query."""
+    return get_repository().audits(limit)
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_geofence(version):
+    return Geofence(get_jurisdictions())
+
+
+def get_geofence():
+    """Restricted-zone polygons for the current restricted list."""
+    return _load_geofence(_load_jurisdictions(DATABASE_URL)[1])
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_route_planner(version):
+    return RoutePlanner(get_route_graph(), get_geofence())
+
+
+@timed('data.route_planner')
+def get_route_planner():
+    """The sovereignty-aware planner for the current restricted list."""
+    return _load_route_planner(_load_jurisdictions(DATABASE_URL)[1])
+
+
+@st.cache_resource(max_entries=MAX_STORES, show_spinner=False)
+def _load_route_cache(version):
+    return RouteCache(get_route_planner())
+
+
+@timed('data.route_cache')
+def get_route_cache():
+    """Route plans memoized across sessions for the current restricted list."""
+    return _load_route_cache(_load_jurisdictions(DATABASE_URL)[1])
+
+
+def invalidate():
+    """Drop every cached store and frame so the next access reloads."""
+    _stop_ingestors()
+    _load_ingestor.clear()
+    _stop_alert_engines()
+    _load_alert_engine.clear()
+    _close_track_archives()
+    _load_track_archive.clear()
+    _close_store_writers()
+    _load_store.clear()
+    _load_scorer.clear()
+    _close_eta_predictors()
+    _load_eta_predictor.clear()
+    for followers in (_search_indexes, _facet_indexes, _kpi_aggregators, _rollups):
+        _close(followers)
+    _load_search_index.clear()
+    _load_facet_index.clear()
+    _load_kpis.clear()
+    _load_rollups.clear()
+    get_cluster_index.clear()
+    _load_jurisdictions.clear()
+    _load_geofence.clear()
+    _load_route_planner.clear()
+    _load_route_cache.clear()
+    shipment_rows.clear()
+    shipment_page.clear()
+
+
+def shipment_rows_key(store, sort_by='id'):
+    """Cache key for :func:`shipment_rows`: moves only with the searched, filtered and sorted columns.
+
+    Position feed batches and rescoring leave it alone unless the table is
+    sorted by a column they write.
+    """
+    return store.columns_key((*SEARCH_FIELDS, *FACETS, 'eta', sort_by))
+
+
+@st.cache_resource(ttl=FRAME_TTL_SECONDS, max_entries=MAX_FRAMES, show_spinner=False)
+def shipment_rows(_store, rows_key, search, filters=None, eta_window=None,
+                  sort_by='id', descending=False):
+    """Sorted rows for the Active Shipments view, shared across sessions.
+
+    ``rows_key`` comes from :func:`shipment_rows_key`. ``filters`` maps facet
+    names to accepted values, see :meth:`FacetIndex.select`. The returned
+    array is read-only.
+    """
+    hits = get_search_index(_store).search(search) if search else None
+    rows = get_facet_index(_store).select(filters, eta_window, rows=hits)
+    rows = sort_rows(_store, rows, sort_by, descending)
+    rows.flags.writeable = False
+    return rows
+
+
+@st.cache_data(ttl=FRAME_TTL_SECONDS, max_entries=MAX_FRAMES, show_spinner=False)
+def shipment_page(_store, snapshot_key, rows):
+    """Display frame for one page of rows; only these rows are decoded."""
+    df = _store.frame(rows, list(TABLE_COLUMNS))
+    df['origin'] = df['origin'].astype(str).str.split(',').str[0]
+    df['destination'] = df['destination'].astype(str).str.split(',').str[0]
+    df['progress'] = df['progress'].astype(str) + '%'
+    df['sovereignty_score'] = df['sovereignty_score'].astype(str) + '%'
+    return df.rename(columns=TABLE_COLUMNS)
@@ -0,0 +1,287 @@
+"""ETA prediction from custody history.
+
+Custody chains move through five stages: Pickup → Customs → Loaded →
+Transit → Arrival. A stage lasts from its first actual event until the next
+stage's. Past shipments give, per lane (origin and destination), how long
+each stage took and, for the voyage, the speed made good over the lane's
+sea route. :class:`LaneStats` reduces these to 10th, 50th and 90th
+percentiles once, with a fleet-wide fallback for lanes with few samples.
+Lanes the route graph cannot place (inland depots, say) fall back to the
+voyage's duration instead of its speed.
+
+:class:`EtaPredictor` combines them with where each shipment is now: what
+is left of its current stage, the stages still to come and, once under way,
+the sea-route distance to go from its current position at the lane's speed.
+Stage percentiles are added as if the stages were fully correlated, which
+makes the band wide rather than optimistic. The whole fleet is inferred in
+one vectorized pass. After that, only shipments whose position, status or
+custody changed are re-inferred, in one batch per refresh.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aegis.routing import SERVICE_SPEED_KNOTS
+from aegis.store import TIME_ACTUAL
+
+STAGES = ('Pickup', 'Customs', 'Loaded', 'Transit', 'Arrival')
+VOYAGE = STAGES.index('Transit')
+ARRIVAL = STAGES.index('Arrival')
+# Column of ``LaneStats.quantiles`` after the stage durations: the voyage's speed made good.
+SPEED = ARRIVAL
+QUANTILES = (0.1, 0.5, 0.9)
+# Lanes with fewer completed samples of a stage use the fleet-wide figures.
+MIN_SAMPLES = 5
+# Voyage speed quantiles when no voyage has been completed yet.
+DEFAULT_SPEEDS = (0.85 * SERVICE_SPEED_KNOTS, SERVICE_SPEED_KNOTS, 1.15 * SERVICE_SPEED_KNOTS)
+# Columns whose change moves a prediction.
+WATCHED = frozenset({'lat', 'lng', 'progress', 'status', 'origin', 'destination'})
+
+
+def stage_codes(dictionary):
+    """Stage index per custody step code, -1 for steps outside ``STAGES``."""
+    return np.array([next((i for i, stage in enumerate(STAGES) if str(name).startswith(stage)), -1)
+                     for name in dictionary.values], dtype=np.int64)
+
+
+def stage_times(store, rows):
+    """When each stage started per row, in epoch seconds (NaN if not yet reached)."""
+    custody = store.custody
+    n = len(custody)
+    rows = np.asarray(rows, dtype=np.int64)
+    everything = len(rows) == len(store) and np.array_equal(rows, np.arange(len(rows)))
+    actual = custody.kind[:n] == TIME_ACTUAL
+    if not everything:
+        actual &= np.isin(custody.shipment[:n], rows)
+    events = np.flatnonzero(actual)
+    stage = stage_codes(custody.dictionaries['step'])[custody.codes['step'][events]]
+    events, stage = events[stage >= 0], stage[stage >= 0]
+    if everything:
+        at = custody.shipment[events]
+    else:
+        order = np.argsort(rows)
+        at = order[np.searchsorted(rows, custody.shipment[events], sorter=order)]
+    times = np.full((len(rows), len(STAGES)), np.inf)
+    np.minimum.at(times, (at, stage), custody.time[events].astype(np.int64).astype(np.float64))
+    times[np.isinf(times)] = np.nan
+    return times
+
+
+class LaneStats:
+    """Stage duration (hours) and voyage speed (knots) percentiles per lane.
+
+    ``quantiles[lane, stage]`` holds the ``QUANTILES`` of each stage's
+    duration up to arrival, ``quantiles[lane, SPEED]`` those of the voyage's
+    speed made good. The last lane is the fleet-wide fallback.
+    """
+
+    def __init__(self, store, graph, min_samples=MIN_SAMPLES):
+        self.built = time.monotonic()
+        rows = store.rows()
+        hours = np.diff(stage_times(store, rows), axis=1) / 3600.0   # stage k lasts until k + 1 starts
+        hours[hours <= 0] = np.nan
+
+        self.keys, lane = np.unique(self._keys(store.column('origin')[rows], store.column('destination')[rows]),
+                                    return_inverse=True)
+        origins, destinations = store.dictionaries['origin'].values, store.dictionaries['destination'].values
+        self.route_nm = np.array([
+            graph.distances_to(destinations[key & 0xFFFFFFFF])[graph.index[origins[key >> 32]]]
+            if origins[key >> 32] in graph and destinations[key & 0xFFFFFFFF] in graph else np.nan
+            for key in self.keys.tolist()] + [np.nan])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speed = self.route_nm[lane] / hours[:, VOYAGE]
+        samples = pd.DataFrame(np.column_stack([hours, speed]))
+        samples[~np.isfinite(samples)] = np.nan
+
+        fleet = samples.quantile(list(QUANTILES)).to_numpy().T.copy()    # (columns, quantiles)
+        fleet_count = samples.count().to_numpy()
+        fleet[:VOYAGE][fleet_count[:VOYAGE] == 0] = 0.0
+        if not fleet_count[SPEED]:
+            fleet[SPEED] = DEFAULT_SPEEDS
+        grouped = samples.groupby(lane)
+        by_lane = grouped.quantile(list(QUANTILES)).to_numpy().reshape(len(self.keys), len(QUANTILES), -1)
+        self.quantiles = np.concatenate([by_lane.transpose(0, 2, 1), fleet[None]])
+        self.counts = np.concatenate([grouped.count().to_numpy(), fleet_count[None]])
+        few = self.counts < min_samples
+        self.quantiles[few] = np.broadcast_to(fleet, self.quantiles.shape)[few]
+        self.counts[few] = np.broadcast_to(fleet_count, self.counts.shape)[few]
+
+    @staticmethod
+    def _keys(origin, destination):
+        return (origin.astype(np.int64) << 32) | destination.astype(np.int64)
+
+    def lanes(self, origin, destination):
+        """Lane index per shipment from its origin and destination codes; unknown lanes get the fallback."""
+        keys = self._keys(origin, destination)
+        at = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        known = (self.keys[at] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        return np.where(known, at, len(self.keys))
+
+
+class EtaPredictor:
+    """Predicted arrival percentiles for every shipment, kept current from store notifications.
+
+    ``eta[0]``, ``eta[1]`` and ``eta[2]`` hold the 10th, 50th and 90th
+    percentile per row, ``NaT`` where no prediction can be made.
+    Notifications only mark rows; :meth:`refresh` re-infers them.
+    """
+
+    def __init__(self, store, graph, stats_seconds=3600.0):
+        self.store = store
+        self.graph = graph
+        self.stats_seconds = stats_seconds
+        self.stats = None
+        self.eta = np.full((len(QUANTILES), 0), np.datetime64('NaT'), dtype='datetime64[s]')
+        self.refreshed = 0.0
+        self.last_refresh_ms = 0.0
+        self._dirty = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        with store.lock:
+            store.subscribe(self)
+            self._grow()
+        self.refresh()
+
+    def _grow(self):
+        size = len(self.store)
+        if self.eta.shape[1] < size:
+            capacity = max(size, 2 * self.eta.shape[1])
+            eta = np.full((len(QUANTILES), capacity), np.datetime64('NaT'), dtype='datetime64[s]')
+            eta[:, :self.eta.shape[1]] = self.eta
+            dirty = np.zeros(capacity, dtype=bool)
+            dirty[:len(self._dirty)] = self._dirty
+            self.eta, self._dirty = eta, dirty
+
+    def close(self):
+        """Stop following the store."""
+        self.store.unsubscribe(self)
+
+    # ---- store notifications: mark rows, infer on refresh ----
+
+    def _mark(self, rows):
+        with self._lock:
+            self._grow()
+            self._dirty[rows] = True
+
+    def on_append(self, rows):
+        self._mark(rows)
+
+    def on_update(self, row, changes):
+        if WATCHED.intersection(changes):
+            self._mark([row])
+
+    def on_update_many(self, rows, names):
+        if WATCHED.intersection(names):
+            self._mark(rows)
+
+    def on_custody(self, row):
+        self._mark([row])
+
+    # ---- inference ----
+
+    def refresh(self, max_age=0.0, now=None):
+        """Re-infer marked shipments, or all of them when the lane statistics are due a rebuild.
+
+        Skipped if the last refresh is under ``max_age`` seconds old or
+        another thread is refreshing; returns how many shipments were inferred.
+        """
+        if time.monotonic() - self.refreshed < max_age or not self._refreshing.acquire(blocking=False):
+            return 0
+        try:
+            started = time.perf_counter()
+            rebuild = self.stats is None or time.monotonic() - self.stats.built >= self.stats_seconds
+            with self._lock:
+                self._grow()
+                dirty = self._dirty
+                rows = np.arange(len(self.store)) if rebuild else np.flatnonzero(dirty[:len(self.store)])
+                dirty[rows] = False
+            if rebuild:
+                self.stats = LaneStats(self.store, self.graph)
+            if len(rows):
+                self.eta[:, rows] = self.predict(rows, now)
+            self.refreshed = time.monotonic()
+            self.last_refresh_ms = (time.perf_counter() - started) * 1e3
+            return len(rows)
+        finally:
+            self._refreshing.release()
+
+    def predict(self, rows, now=None):
+        """Infer ``(p10, p50, p90)`` arrival times for ``rows`` as a ``(3, len(rows))`` datetime64 array."""
+        store, stats = self.store, self.stats
+        rows = np.asarray(rows, dtype=np.int64)
+        now = float(np.datetime64(now or datetime.now(), 's').astype(np.int64))
+        times = stage_times(store, rows)
+        reached = np.where(np.isnan(times).all(axis=1), -1,
+                           len(STAGES) - 1 - np.argmax(~np.isnan(times[:, ::-1]), axis=1))
+        started = times[np.arange(len(rows)), np.maximum(reached, 0)]
+        elapsed = np.where(reached >= 0, np.maximum(now - started, 0.0) / 3600.0, 0.0)
+
+        lane = stats.lanes(store.column('origin')[rows], store.column('destination')[rows])
+        quantiles = stats.quantiles[lane]
+
+        # What is left of the current stage, and all of those still to come
+        hours = np.zeros((len(rows), len(QUANTILES)))
+        for stage in range(ARRIVAL):
+            full = quantiles[:, stage, :]
+            left = np.where((stage > reached)[:, None], full,
+                            np.where((stage == reached)[:, None], np.maximum(full - elapsed[:, None], 0.0), 0.0))
+            if stage == VOYAGE:
+                left = self._voyage(rows, reached, stats.route_nm[lane], quantiles[:, SPEED, :], left)
+            hours += left
+
+        seconds = now + hours * 3600.0
+        arrived = reached == ARRIVAL
+        seconds[arrived] = started[arrived, None]
+        eta = np.full(seconds.shape, np.datetime64('NaT'), dtype='datetime64[s]')
+        known = np.isfinite(seconds)
+        eta[known] = seconds[known].astype(np.int64).astype('datetime64[s]')
+        return eta.T
+
+    def _voyage(self, rows, reached, route_nm, speed, left):
+        """Voyage hours still to sail: the lane's sea route before departure, the distance to go once under way.
+
+        Lanes without a sea route keep ``left``, from the voyage's duration.
+        """
+        distance = route_nm.copy()
+        underway = np.flatnonzero(reached == VOYAGE)
+        if len(underway):
+            distance[underway] = self._distance_to_go(rows[underway], distance[underway])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sailing = distance[:, None] / speed[:, ::-1]   # the fastest speed gives the earliest arrival
+        return np.where(np.isfinite(sailing) & (reached <= VOYAGE)[:, None], sailing, left)
+
+    def _distance_to_go(self, rows, route_nm):
+        """Sea distance to destination from the current position; the route's unsailed share without one."""
+        store = self.store
+        lat, lng = store.column('lat')[rows], store.column('lng')[rows]
+        progress = store.column('progress')[rows].astype(np.float64)
+        distance = route_nm * (1.0 - progress / 100.0)
+        placed = ~np.isnan(lat) & ~np.isnan(lng)
+        destinations = store.column('destination')[rows]
+        names = store.dictionaries['destination'].values
+        for code in np.unique(destinations[placed]).tolist():
+            if names[code] in self.graph:
+                group = placed & (destinations == code)
+                distance[group] = self.graph.distance_to_go(lat[group], lng[group], names[code])
+        return distance
+
+    # ---- reads ----
+
+    def bands(self, row):
+        """``(p10, p50, p90)`` predicted arrival of one shipment as timestamps, ``None`` if unknown."""
+        stamps = self.eta[:, row] if row < self.eta.shape[1] else [np.datetime64('NaT')] * len(QUANTILES)
+        return tuple(None if np.isnat(stamp) else pd.Timestamp(stamp) for stamp in stamps)
+
+
+def format_band(bands, fmt='%b %d'):
+    """``"Oct 29 (Oct 23 – Nov 04)"`` for a ``(p10, p50, p90)`` band, ``"—"`` when unknown."""
+    low, median, high = bands
+    if median is None:
+        return "—"
+    if low == high:
+        return f"{median:{fmt}}"
+    return f"{median:{fmt}} ({low:{fmt}} – {high:{fmt}})"
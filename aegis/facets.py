@@ -0,0 +1,213 @@
+"""Facet index for the Active Shipments filters.
+
+Every value of a faceted category column owns a bitmap of the rows holding
+it, stored as packed 64-bit words, plus a running count. A combined filter
+ORs the bitmaps of the values picked within a facet and ANDs across facets.
+That is one pass over packed words per facet, never over shipment rows. The
+ETA window uses a sorted index and ``searchsorted``. Facet counts come from
+the counters, so the UI can label options without touching the data.
+
+Like the search index, this subscribes to the store and stays current
+through appends and updates.
+"""
+
+import threading
+
+import numpy as np
+
+FACETS = ('status', 'classification', 'vessel_flag', 'alliance')
+# Packed words decoded at a time when only the first few matching rows are needed.
+SCAN_WORDS = 1024
+
+
+class Bitmap:
+    """Growable bitset over shipment rows, packed into uint64 words."""
+
+    def __init__(self, size=0):
+        self.words = np.zeros(max(1, (size + 63) // 64), dtype=np.uint64)
+
+    def _reserve(self, row):
+        needed = (int(row) >> 6) + 1
+        if needed > len(self.words):
+            grown = np.zeros(max(needed, 2 * len(self.words)), dtype=np.uint64)
+            grown[:len(self.words)] = self.words
+            self.words = grown
+
+    def add_many(self, rows):
+        if not len(rows):
+            return
+        rows = np.asarray(rows, dtype=np.uint64)
+        self._reserve(rows.max())
+        np.bitwise_or.at(self.words, rows >> np.uint64(6),
+                         np.left_shift(np.uint64(1), rows & np.uint64(63)))
+
+    def add(self, row):
+        self._reserve(row)
+        self.words[row >> 6] |= np.uint64(1) << np.uint64(row & 63)
+
+    def discard(self, row):
+        if (row >> 6) < len(self.words):
+            self.words[row >> 6] &= ~(np.uint64(1) << np.uint64(row & 63))
+
+    @classmethod
+    def from_rows(cls, rows, size):
+        bitmap = cls(size)
+        bitmap.add_many(rows)
+        return bitmap
+
+
+def _fit(words, size):
+    """Pad or trim packed words to cover ``size`` rows."""
+    n = (size + 63) // 64
+    if len(words) >= n:
+        return words[:n]
+    out = np.zeros(n, dtype=np.uint64)
+    out[:len(words)] = words
+    return out
+
+
+def bitmap_rows(words, size):
+    """Decode packed words into the sorted rows whose bit is set."""
+    bits = np.unpackbits(words.view(np.uint8), bitorder='little')[:size]
+    return np.flatnonzero(bits)
+
+
+def matching_rows(words, rows):
+    """Return the subset of ``rows`` whose bit is set in ``words``."""
+    rows = np.asarray(rows, dtype=np.int64)
+    hit = (words[rows >> 6] >> (rows & 63).astype(np.uint64)) & np.uint64(1)
+    return rows[hit.astype(bool)]
+
+
+class FacetIndex:
+    """Per-value row bitmaps and counts for the faceted shipment columns."""
+
+    def __init__(self, store, facets=FACETS):
+        self.store = store
+        self.facets = facets
+        self._lock = threading.RLock()
+        self._bitmaps = {facet: {} for facet in facets}
+        self._counts = {facet: {} for facet in facets}
+        self._eta_order = None
+        with store.lock:
+            self.on_append(store.rows())
+            store.subscribe(self)
+
+    def close(self):
+        """Stop following the store."""
+        self.store.unsubscribe(self)
+
+    # ---- store listener ----
+
+    def on_append(self, rows):
+        if not len(rows):
+            return
+        with self._lock:
+            for facet in self.facets:
+                codes = self.store.codes[facet][rows]
+                order = np.argsort(codes, kind='stable')
+                uniques, starts = np.unique(codes[order], return_index=True)
+                for code, group in zip(uniques.tolist(), np.split(rows[order], starts[1:])):
+                    self._bitmap(facet, code).add_many(group)
+                    self._counts[facet][code] = self._counts[facet].get(code, 0) + len(group)
+            self._eta_order = None
+
+    def on_update(self, row, changes):
+        with self._lock:
+            for facet in self.facets:
+                if facet in changes:
+                    old, new = (int(code) for code in changes[facet])
+                    self._bitmap(facet, old).discard(row)
+                    self._bitmap(facet, new).add(row)
+                    self._counts[facet][old] -= 1
+                    self._counts[facet][new] = self._counts[facet].get(new, 0) + 1
+            if 'eta' in changes:
+                self._eta_order = None
+
+    def _bitmap(self, facet, code):
+        bitmap = self._bitmaps[facet].get(code)
+        if bitmap is None:
+            bitmap = self._bitmaps[facet][code] = Bitmap(len(self.store))
+        return bitmap
+
+    # ---- queries ----
+
+    def counts(self, facet):
+        """``{value: count}`` for one facet, read from the running counters."""
+        values = self.store.dictionaries[facet].values
+        with self._lock:
+            return {values[code]: count for code, count in self._counts[facet].items() if count}
+
+    def options(self, facet):
+        """Facet values ordered by descending count."""
+        counts = self.counts(facet)
+        return sorted(counts, key=counts.get, reverse=True)
+
+    def first_rows_without(self, facet, value, limit):
+        """The first ``limit`` rows whose ``facet`` is not ``value``.
+
+        Decodes the complement of the value's bitmap a block of words at a
+        time and stops as soon as enough rows are found.
+        """
+        size = len(self.store)
+        with self._lock:
+            bitmap = self._bitmaps[facet].get(self.store.dictionaries[facet].code(value))
+            words = _fit(bitmap.words if bitmap is not None else np.zeros(0, dtype=np.uint64), size)
+        found, total = [], 0
+        for start in range(0, len(words), SCAN_WORDS):
+            rows = bitmap_rows(~words[start:start + SCAN_WORDS], size - start * 64) + start * 64
+            found.append(rows[:limit - total])
+            total += len(found[-1])
+            if total >= limit:
+                break
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def eta_rows(self, start=None, end=None):
+        """Rows with ``start <= eta < end``, via the sorted ETA index."""
+        with self._lock:
+            if self._eta_order is None or len(self._eta_order) != len(self.store):
+                self._eta_order = np.argsort(self.store.column('eta'), kind='stable')
+            order = self._eta_order
+        etas = self.store.column('eta')[order]
+        lo = 0 if start is None else np.searchsorted(etas, np.datetime64(start, 's'), side='left')
+        hi = len(etas) if end is None else np.searchsorted(etas, np.datetime64(end, 's'), side='left')
+        return np.sort(order[lo:hi])
+
+    def select_words(self, filters=None, eta_window=None):
+        """Packed bitmap of rows matching every facet filter.
+
+        ``filters`` maps a facet to the values accepted for it (an empty
+        selection leaves the facet unconstrained). ``eta_window`` is an
+        optional ``(start, end)`` pair. Returns ``None`` when nothing is
+        constrained.
+        """
+        size = len(self.store)
+        result = None
+        with self._lock:
+            for facet, values in (filters or {}).items():
+                if not values:
+                    continue
+                union = np.zeros((size + 63) // 64, dtype=np.uint64)
+                for value in values:
+                    code = self.store.dictionaries[facet].code(value)
+                    bitmap = self._bitmaps[facet].get(code)
+                    if bitmap is not None:
+                        union |= _fit(bitmap.words, size)
+                result = union if result is None else result & union
+        if eta_window is not None:
+            window = _fit(Bitmap.from_rows(self.eta_rows(*eta_window), size).words, size)
+            result = window if result is None else result & window
+        return result
+
+    def select(self, filters=None, eta_window=None, rows=None):
+        """Sorted rows matching the filters, optionally restricted to ``rows``.
+
+        When ``rows`` is given (e.g. search hits) only those rows are probed
+        against the combined bitmap.
+        """
+        words = self.select_words(filters, eta_window)
+        if words is None:
+            return self.store.rows() if rows is None else rows
+        if rows is not None:
+            return matching_rows(words, rows)
+        return bitmap_rows(words, len(self.store))
@@ -0,0 +1,46 @@
+"""Spherical geometry helpers shared by routing, geofencing and scoring.
+
+All functions accept scalars or NumPy arrays in degrees and broadcast.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def haversine_nm(lat1, lng1, lat2, lng2):
+    """Great-circle distance in nautical miles."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64))
+                              for v in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _to_xyz(lat, lng):
+    lat, lng = np.radians(lat), np.radians(lng)
+    return np.stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+def great_circle_points(lat1, lng1, lat2, lng2, step_nm=100.0):
+    """Points along the great circle between two positions, ends included.
+
+    Returns ``(lat, lng)`` arrays spaced at most ``step_nm`` apart, with
+    longitudes normalized to [-180, 180).
+    """
+    distance = float(haversine_nm(lat1, lng1, lat2, lng2))
+    count = max(2, int(np.ceil(distance / step_nm)) + 1)
+    a, b = _to_xyz(lat1, lng1), _to_xyz(lat2, lng2)
+    omega = distance / EARTH_RADIUS_NM
+    t = np.linspace(0.0, 1.0, count)[:, None]
+    if omega < 1e-9:
+        points = np.repeat(a[None, :], count, axis=0)
+    else:
+        points = (np.sin((1 - t) * omega) * a + np.sin(t * omega) * b) / np.sin(omega)
+    lat = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+    lng = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    return lat, normalize_lng(lng)
+
+
+def normalize_lng(lng):
+    return (np.asarray(lng) + 180.0) % 360.0 - 180.0
@@ -0,0 +1,251 @@
+"""Restricted-jurisdiction geofences.
+
+Each restricted country code maps to one or more coarse outline rings
+(``(lng, lat)`` vertices). All polygon edges are packed into flat NumPy
+arrays grouped by zone. A uniform grid maps each cell to the zones whose
+buffered bounding box overlaps it. A polyline check therefore first picks
+candidate zones from the cells it touches, then runs vectorized
+point-in-polygon, segment-intersection and point-to-edge distance tests
+against only those zones' edges.
+
+Distances use a local equirectangular approximation, accurate to a few
+percent at the ranges that matter here (tens to hundreds of miles).
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Coarse outlines, good to roughly 20-50 nm. Rings are (lng, lat) and do not
+# cross the antimeridian; Russia is cut at 180°E.
+ZONE_POLYGONS = {
+    'CN': [[
+        (73.5, 39.5), (80.0, 42.0), (87.0, 49.0), (97.0, 42.5), (105.0, 41.5), (111.5, 45.0),
+        (116.0, 46.0), (119.5, 47.5), (117.5, 49.5), (122.0, 53.5), (127.0, 50.0), (131.0, 47.5),
+        (134.5, 48.0), (131.0, 44.9), (130.6, 42.4), (128.0, 42.0), (124.3, 39.9), (121.5, 39.0),
+        (122.5, 37.3), (120.0, 35.0), (121.9, 31.0), (122.0, 30.0), (120.5, 27.5), (119.5, 25.5),
+        (117.0, 23.5), (114.0, 22.3), (111.0, 21.5), (110.5, 20.0), (110.0, 18.1), (108.6, 18.5),
+        (108.0, 21.5), (106.5, 22.5), (103.0, 22.5), (101.5, 21.2), (98.5, 24.5), (97.5, 28.0),
+        (92.0, 28.0), (88.0, 27.9), (86.0, 28.0), (81.0, 30.0), (79.0, 32.5), (78.0, 35.5),
+        (75.0, 37.0),
+    ]],
+    'RU': [
+        [
+            (28.0, 69.5), (40.0, 67.5), (44.0, 68.5), (60.0, 69.8), (70.0, 73.0), (80.0, 73.5),
+            (100.0, 77.5), (113.0, 73.5), (130.0, 71.0), (150.0, 71.5), (160.0, 69.5), (170.0, 70.0),
+            (180.0, 69.0), (180.0, 65.0), (178.0, 64.5), (174.5, 61.8), (170.0, 60.0), (163.0, 59.8),
+            (163.5, 56.0), (162.0, 54.5), (158.5, 52.0), (156.5, 51.0), (155.5, 55.0), (155.5, 57.7),
+            (151.5, 59.1), (143.0, 59.3), (140.5, 57.5), (137.0, 54.0), (141.0, 52.0), (141.5, 48.5),
+            (140.0, 48.0), (135.0, 43.5), (131.8, 43.0), (130.6, 42.4), (131.0, 44.9), (134.5, 48.0),
+            (131.0, 47.5), (127.0, 50.0), (122.0, 53.5), (117.5, 49.5), (108.0, 50.0), (98.0, 50.0),
+            (87.8, 49.2), (80.0, 50.8), (70.0, 55.0), (61.0, 54.0), (53.0, 51.5), (47.0, 49.5),
+            (48.0, 46.5), (47.5, 45.5), (47.0, 42.5), (46.5, 41.8), (40.0, 43.5), (37.5, 44.7),
+            (38.5, 47.0), (40.0, 48.0), (37.5, 50.0), (34.0, 52.2), (31.8, 52.1), (32.7, 53.4),
+            (31.8, 54.3), (30.9, 55.6), (28.2, 56.1), (27.7, 57.5), (28.0, 59.5), (30.5, 60.5),
+            (29.0, 61.5), (30.0, 63.5), (29.5, 66.0), (30.0, 67.8),
+        ],
+        # Sakhalin
+        [(141.8, 46.0), (143.5, 46.5), (143.3, 49.2), (144.5, 49.0), (143.0, 53.5), (142.5, 54.4),
+         (141.7, 53.3), (142.0, 51.0), (141.8, 48.5)],
+        # Kuril Islands
+        [(145.4, 43.3), (148.5, 44.8), (152.0, 47.0), (156.7, 50.7), (156.2, 51.0), (151.5, 47.5),
+         (147.8, 45.3), (145.3, 43.7)],
+        # Kaliningrad
+        [(19.6, 54.4), (22.8, 54.4), (22.8, 55.1), (21.0, 55.3), (19.8, 54.9)],
+    ],
+    'IR': [[
+        (44.0, 39.4), (48.0, 38.5), (49.0, 37.6), (53.9, 37.3), (60.0, 37.5), (61.2, 36.6),
+        (61.5, 34.0), (60.6, 33.0), (61.9, 31.0), (61.6, 29.8), (63.3, 27.2), (61.6, 25.2),
+        (57.3, 25.6), (56.5, 27.1), (54.0, 26.6), (51.5, 27.9), (50.0, 30.0), (48.5, 30.0),
+        (47.7, 31.0), (46.0, 33.0), (45.4, 34.0), (44.8, 35.5), (44.3, 37.3),
+    ]],
+    'KP': [[
+        (124.3, 39.9), (125.3, 40.3), (126.9, 41.8), (128.1, 42.0), (129.7, 42.4), (130.6, 42.4),
+        (129.7, 41.0), (128.3, 39.8), (127.5, 39.5), (128.4, 38.6), (127.1, 38.3), (126.7, 37.8),
+        (125.3, 37.7), (124.7, 38.1), (125.2, 38.8), (124.7, 39.6),
+    ]],
+    'SY': [[
+        (35.7, 36.8), (36.8, 36.8), (38.2, 36.9), (40.7, 37.1), (42.4, 37.1), (41.3, 36.4),
+        (41.0, 34.4), (38.8, 33.4), (36.8, 32.3), (35.8, 32.7), (35.9, 33.3), (36.6, 34.2),
+        (35.9, 34.6), (35.9, 35.4),
+    ]],
+    'CU': [[
+        (-84.9, 21.9), (-84.0, 22.9), (-82.0, 23.2), (-80.5, 23.1), (-77.5, 21.8), (-75.6, 21.0),
+        (-74.1, 20.2), (-74.3, 20.0), (-77.7, 19.9), (-77.1, 20.6), (-78.5, 21.5), (-80.5, 22.0),
+        (-82.2, 22.2), (-83.5, 21.8),
+    ]],
+    'BY': [[
+        (23.5, 53.9), (25.5, 54.3), (26.6, 55.7), (28.2, 56.1), (30.9, 55.6), (31.8, 54.3),
+        (32.7, 53.4), (31.3, 52.0), (30.6, 51.3), (26.3, 51.8), (23.6, 51.6), (23.2, 52.5),
+    ]],
+    'VE': [[
+        (-71.9, 12.2), (-70.0, 12.2), (-68.9, 11.4), (-66.0, 10.6), (-63.0, 10.7), (-61.9, 10.7),
+        (-60.7, 8.6), (-59.8, 8.4), (-60.6, 6.8), (-61.4, 5.9), (-60.7, 5.2), (-62.8, 4.0),
+        (-64.6, 4.1), (-64.0, 2.5), (-66.9, 1.2), (-67.8, 2.8), (-67.3, 6.1), (-69.4, 6.1),
+        (-72.0, 7.0), (-72.4, 8.4), (-73.3, 9.2), (-72.6, 10.5), (-71.9, 11.5),
+    ]],
+}
+
+NM_PER_DEGREE = 60.0
+# Approaches closer than this count as contact with the zone.
+CONTACT_BUFFER_NM = 60.0
+# Zones within this range lower the sovereignty score.
+PROXIMITY_NM = 150.0
+CROSSING_PENALTY = 40
+PROXIMITY_PENALTY = 20
+
+GRID_DEGREES = 5.0
+
+
+@dataclass
+class Assessment:
+    """Result of checking a track against every restricted zone."""
+    crossed: tuple = ()
+    distances: dict = field(default_factory=dict)   # code -> closest approach (nm), within range only
+
+    @property
+    def contact(self):
+        """Codes the track enters or passes within the contact buffer of."""
+        near = [code for code, nm in self.distances.items() if nm < CONTACT_BUFFER_NM]
+        return tuple(sorted(set(self.crossed) | set(near)))
+
+    @property
+    def clean(self):
+        return not self.contact
+
+    @property
+    def score(self):
+        penalty = CROSSING_PENALTY * len(self.crossed)
+        for code, nm in self.distances.items():
+            if code not in self.crossed:
+                penalty += PROXIMITY_PENALTY * max(0.0, 1.0 - nm / PROXIMITY_NM)
+        return int(round(min(100.0, max(0.0, 100.0 - penalty))))
+
+
+def jurisdictions_version(jurisdictions, polygons=ZONE_POLYGONS):
+    """Stable digest of the restricted list and its geometry."""
+    payload = [(j['code'], j.get('category', ''), polygons.get(j['code']))
+               for j in sorted(jurisdictions, key=lambda j: j['code'])]
+    return hashlib.sha1(json.dumps(payload).encode()).hexdigest()[:12]
+
+
+class Geofence:
+    """Grid-indexed restricted-zone polygons for one jurisdiction list."""
+
+    def __init__(self, jurisdictions, polygons=ZONE_POLYGONS, grid_degrees=GRID_DEGREES):
+        self.codes = [j['code'] for j in jurisdictions if j['code'] in polygons]
+        # Every restricted code and its country name, outlined or not
+        self.restricted = {j['code']: j.get('name', j['code']) for j in jurisdictions}
+        self.version = jurisdictions_version(jurisdictions, polygons)
+        self.rings = {code: polygons[code] for code in self.codes}
+        self.grid_degrees = grid_degrees
+
+        # Empty leading arrays keep the concatenations valid with no outlined zone
+        ax, ay, bx, by = ([np.empty(0)] for _ in range(4))
+        zone = [np.empty(0, dtype=np.int64)]
+        for z, code in enumerate(self.codes):
+            for ring in polygons[code]:
+                ring = np.asarray(ring, dtype=np.float64)
+                ax.append(ring[:, 0])
+                ay.append(ring[:, 1])
+                closed = np.roll(ring, -1, axis=0)
+                bx.append(closed[:, 0])
+                by.append(closed[:, 1])
+                zone.append(np.full(len(ring), z, dtype=np.int64))
+        self.ax, self.ay = np.concatenate(ax), np.concatenate(ay)
+        self.bx, self.by = np.concatenate(bx), np.concatenate(by)
+        self.edge_zone = np.concatenate(zone)
+        # Edges are grouped by zone; zone z owns edges offsets[z]:offsets[z + 1].
+        self.offsets = np.searchsorted(self.edge_zone, np.arange(len(self.codes) + 1))
+
+        pad = PROXIMITY_NM / NM_PER_DEGREE
+        self.bbox = np.array([
+            [self.ax[s:e].min() - pad, self.ay[s:e].min() - pad, self.ax[s:e].max() + pad, self.ay[s:e].max() + pad]
+            for s, e in zip(self.offsets[:-1], self.offsets[1:])
+        ]).reshape(-1, 4)
+        self.grid = {}
+        for z, (x0, y0, x1, y1) in enumerate(self.bbox):
+            for cx in range(int(x0 // grid_degrees), int(x1 // grid_degrees) + 1):
+                for cy in range(int(y0 // grid_degrees), int(y1 // grid_degrees) + 1):
+                    self.grid.setdefault((cx, cy), []).append(z)
+
+    def candidates(self, lat, lng):
+        """Zone ids whose buffered extent shares a grid cell with any point."""
+        cells = set(zip((np.asarray(lng) // self.grid_degrees).astype(int).tolist(),
+                        (np.asarray(lat) // self.grid_degrees).astype(int).tolist()))
+        zones = set()
+        for cell in cells:
+            zones.update(self.grid.get(cell, ()))
+        if not zones:
+            return []
+        zones = np.array(sorted(zones))
+        x0, y0, x1, y1 = self.bbox[zones].T
+        lng, lat = np.asarray(lng)[:, None], np.asarray(lat)[:, None]
+        near = ((lng >= x0) & (lng <= x1) & (lat >= y0) & (lat <= y1)).any(axis=0)
+        return zones[near].tolist()
+
+    def _edges(self, zones):
+        idx = np.concatenate([np.arange(self.offsets[z], self.offsets[z + 1]) for z in zones])
+        owner = np.repeat(np.arange(len(zones)), [self.offsets[z + 1] - self.offsets[z] for z in zones])
+        return idx, owner
+
+    def assess(self, lat, lng):
+        """Check a polyline (or a single point) against the candidate zones."""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lng = np.atleast_1d(np.asarray(lng, dtype=np.float64))
+        zones = self.candidates(lat, lng)
+        if not zones:
+            return Assessment()
+        idx, owner = self._edges(zones)
+        ax, ay, bx, by = self.ax[idx], self.ay[idx], self.bx[idx], self.by[idx]
+        starts = np.searchsorted(owner, np.arange(len(zones)))
+
+        px, py = lng[:, None], lat[:, None]
+        # Points inside a zone (even-odd ray casting over that zone's rings).
+        straddles = (ay > py) != (by > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (bx - ax) * (py - ay) / (by - ay) + ax
+        crossings = (straddles & (px < x_cross)).astype(np.int64)
+        inside = (np.add.reduceat(crossings, starts, axis=1) % 2).astype(bool).any(axis=0)
+
+        # Track segments crossing a zone boundary. Segments that jump the
+        # antimeridian are skipped; no zone straddles it.
+        if len(lat) > 1:
+            keep = np.abs(np.diff(lng)) < 180
+            sx0, sy0 = lng[:-1][keep, None], lat[:-1][keep, None]
+            sx1, sy1 = lng[1:][keep, None], lat[1:][keep, None]
+
+            def orient(x0, y0, x1, y1, x2, y2):
+                return np.sign((x1 - x0) * (y2 - y0) - (y1 - y0) * (x2 - x0))
+
+            hits = ((orient(sx0, sy0, sx1, sy1, ax, ay) != orient(sx0, sy0, sx1, sy1, bx, by))
+                    & (orient(ax, ay, bx, by, sx0, sy0) != orient(ax, ay, bx, by, sx1, sy1)))
+            if hits.size:
+                inside |= np.logical_or.reduceat(hits.astype(np.int8), starts, axis=1).any(axis=0)
+
+        # Closest approach of any track point to each zone's edges.
+        scale = np.cos(np.radians(py))
+        ex, ey = (bx - ax) * scale, by - ay
+        qx, qy = (px - ax) * scale, py - ay
+        length2 = ex * ex + ey * ey
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(np.where(length2 > 0, (qx * ex + qy * ey) / length2, 0.0), 0.0, 1.0)
+        dist = np.hypot(qx - t * ex, qy - t * ey) * NM_PER_DEGREE
+        closest = np.minimum.reduceat(dist, starts, axis=1).min(axis=0)
+        closest[inside] = 0.0
+
+        crossed = tuple(self.codes[zones[i]] for i in np.flatnonzero(inside))
+        distances = {self.codes[zones[i]]: float(closest[i])
+                     for i in np.flatnonzero(closest < PROXIMITY_NM)}
+        return Assessment(crossed=crossed, distances=distances)
+
+    def outline(self):
+        """All zone rings as one closed ``(lat, lng)`` polyline with ``None`` breaks, for plotting."""
+        lats, lngs = [], []
+        for code in self.codes:
+            for ring in self.rings[code]:
+                lngs.extend([p[0] for p in ring] + [ring[0][0], None])
+                lats.extend([p[1] for p in ring] + [ring[0][1], None])
+        return lats, lngs
@@ -0,0 +1,309 @@
+"""Live position ingestion.
+
+AIS-style position reports arrive from a feed: a tailed file, a UDP socket,
+an in-process queue, or the simulated stand-in used when nothing else is
+configured. A :class:`PositionIngestor` thread drains the feed in short
+batches. Each batch is parsed into arrays, mapped to store rows, reduced to
+the last report per ship, and written with one vectorized
+``ShipmentStore.update_many`` call. The UI thread never waits on the feed;
+it reads the store and the ingestor's counters on its own refresh schedule.
+
+Line format, one report per line, either CSV ``id,lat,lng[,progress]`` or
+JSON ``{"id": ..., "lat": ..., "lng": ..., "progress": ...}``.
+"""
+
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from aegis.geo import haversine_nm
+from aegis.routing import PORTS, SEA_NODES
+
+# How long a feed may block waiting for reports before a batch is applied.
+BATCH_SECONDS = 0.25
+# Reports drained per batch at most; the rest wait for the next batch.
+MAX_BATCH = 50_000
+RECENT_REPORTS = 8
+RATE_WINDOW_SECONDS = 10.0
+
+log = logging.getLogger(__name__)
+
+_PLACE_NAMES = list(PORTS) + list(SEA_NODES)
+_PLACE_COORDS = np.array([*PORTS.values(), *SEA_NODES.values()], dtype=np.float64)
+
+
+@dataclass
+class PositionBatch:
+    """Parallel arrays of position reports; ``progress`` is -1 where not reported."""
+    ids: list = field(default_factory=list)
+    lat: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    lng: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    progress: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def nearest_place(lat, lng):
+    """Name of the closest port or sea node, for feed captions."""
+    return _PLACE_NAMES[int(np.argmin(haversine_nm(lat, lng, _PLACE_COORDS[:, 0], _PLACE_COORDS[:, 1])))]
+
+
+def parse_lines(lines):
+    """Parse CSV or JSON report lines, skipping malformed ones."""
+    ids, lat, lng, progress = [], [], [], []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            if line[0] == '{':
+                report = json.loads(line)
+                values = (report['id'], report['lat'], report.get('lng', report.get('lon')),
+                          report.get('progress', -1))
+            else:
+                parts = line.split(',')
+                values = (parts[0], parts[1], parts[2], parts[3] if len(parts) > 3 and parts[3] else -1)
+            shipment_id, y, x, p = values[0].strip(), float(values[1]), float(values[2]), int(values[3])
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        ids.append(shipment_id)
+        lat.append(y)
+        lng.append(x)
+        progress.append(p)
+    return PositionBatch(ids, np.array(lat, dtype=np.float32), np.array(lng, dtype=np.float32),
+                         np.array(progress, dtype=np.int16))
+
+
+# ============ FEEDS ============
+
+class FileTailFeed:
+    """Follow a file of report lines, like ``tail -F``, starting at its end."""
+
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self._handle = None
+        self._from_start = from_start
+        self._partial = ''
+
+    def _open(self):
+        try:
+            self._handle = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return False
+        if not self._from_start:
+            self._handle.seek(0, os.SEEK_END)
+        self._from_start = True   # files replaced later are read from the top
+        return True
+
+    def poll(self, timeout, limit=MAX_BATCH):
+        if self._handle is None and not self._open():
+            time.sleep(timeout)
+            return PositionBatch()
+        if os.path.getsize(self.path) < self._handle.tell():
+            self._handle.close()   # truncated or rotated
+            self._handle, self._partial = None, ''
+            return PositionBatch()
+        lines = self._handle.readlines(limit * 64)
+        if not lines:
+            time.sleep(timeout)
+            return PositionBatch()
+        lines[0] = self._partial + lines[0]
+        self._partial = '' if lines[-1].endswith('\n') else lines.pop()
+        return parse_lines(lines)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+
+
+class UdpFeed:
+    """Receive report lines as UDP datagrams (one or more lines each)."""
+
+    def __init__(self, host='127.0.0.1', port=10110):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+
+    def poll(self, timeout, limit=MAX_BATCH):
+        lines = []
+        self.sock.settimeout(timeout)
+        try:
+            while len(lines) < limit:
+                lines.extend(self.sock.recv(65536).decode('utf-8', 'replace').splitlines())
+                self.sock.settimeout(0)   # drain what is already queued, then apply
+        except (socket.timeout, BlockingIOError):
+            pass
+        return parse_lines(lines)
+
+    def close(self):
+        self.sock.close()
+
+
+class QueueFeed:
+    """Drain report lines or ``(id, lat, lng[, progress])`` tuples from a queue."""
+
+    def __init__(self, source=None):
+        self.queue = source if source is not None else queue.Queue()
+
+    def poll(self, timeout, limit=MAX_BATCH):
+        items = []
+        try:
+            items.append(self.queue.get(timeout=timeout))
+            while len(items) < limit:
+                items.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        lines = [item if isinstance(item, str) else ','.join(map(str, item)) for item in items]
+        return parse_lines(lines)
+
+    def close(self):
+        pass
+
+
+class SimulatedFeed:
+    """Local stand-in feed: in-transit ships creep toward their destination port."""
+
+    def __init__(self, store, rate=50.0, seed=None):
+        self.store = store
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+
+    def poll(self, timeout, limit=MAX_BATCH):
+        time.sleep(timeout)
+        store = self.store
+        rows = store.rows(store.mask('status', 'In Transit'))
+        if not len(rows):
+            return PositionBatch()
+        count = min(limit, max(1, int(self.rate * timeout)))
+        rows = self.rng.choice(rows, size=count)
+        destinations = store.decode('destination', rows)
+        target = np.array([PORTS.get(d, (np.nan, np.nan)) for d in destinations], dtype=np.float64)
+        lat = store.column('lat')[rows].astype(np.float64)
+        lng = store.column('lng')[rows].astype(np.float64)
+        known = ~np.isnan(target[:, 0])
+        step = np.where(known, 0.002, 0.0)
+        dlng = (np.nan_to_num(target[:, 1]) - lng + 180.0) % 360.0 - 180.0
+        lat = lat + step * (np.nan_to_num(target[:, 0]) - lat) + self.rng.normal(0, 0.01, count)
+        lng = (lng + step * dlng + self.rng.normal(0, 0.01, count) + 180.0) % 360.0 - 180.0
+        progress = store.column('progress')[rows].astype(np.int16)
+        progress = np.minimum(99, progress + (self.rng.random(count) < 0.02))
+        return PositionBatch(store.ids_of(rows).tolist(), lat.astype(np.float32),
+                             lng.astype(np.float32), progress.astype(np.int16))
+
+    def close(self):
+        pass
+
+
+def feed_from_spec(spec, store):
+    """Build a feed from ``AEGIS_FEED``-style specs.
+
+    ``sim`` (default), ``file:/path/to/reports.log``, ``udp:host:port`` or
+    ``off`` (returns ``None``).
+    """
+    spec = (spec or 'sim').strip()
+    if spec == 'off':
+        return None
+    if spec == 'sim':
+        return SimulatedFeed(store, rate=float(os.environ.get('AEGIS_SIM_RATE', 50)))
+    kind, _, target = spec.partition(':')
+    if kind == 'file':
+        return FileTailFeed(target)
+    if kind == 'udp':
+        host, _, port = target.rpartition(':')
+        return UdpFeed(host or '127.0.0.1', int(port))
+    raise ValueError(f"Unknown feed: {spec}")
+
+
+# ============ INGESTOR ============
+
+class PositionIngestor:
+    """Background thread applying feed batches to a :class:`ShipmentStore`."""
+
+    def __init__(self, store, feed, batch_seconds=BATCH_SECONDS):
+        self.store = store
+        self.feed = feed
+        self.batch_seconds = batch_seconds
+        self.received = 0
+        self.applied = 0
+        self.unknown = 0
+        self.batches = 0
+        self.failures = 0          # batches that raised; the feed keeps going
+        self.last_error = None
+        self.last_apply_ms = 0.0
+        self.recent = deque(maxlen=RECENT_REPORTS)
+        self._window = deque()     # (time, reports applied); appended and pruned by the feed thread
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='aegis-ingest', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        self.feed.close()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def rate(self):
+        """Reports applied per second over the recent window."""
+        now = time.monotonic()
+        window = list(self._window)   # a snapshot: the feed thread appends meanwhile
+        return sum(n for t, n in window if now - t <= RATE_WINDOW_SECONDS) / RATE_WINDOW_SECONDS
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self.feed.poll(self.batch_seconds)
+                if len(batch):
+                    self.apply(batch)
+            except Exception as exc:
+                # A failing batch (a listener, the database) must not end the feed
+                self.failures += 1
+                self.last_error = repr(exc)
+                log.exception("Position batch failed (%d so far)", self.failures)
+                self._stop.wait(self.batch_seconds)
+
+    def apply(self, batch):
+        """Apply one batch: last report per ship wins, unknown IDs are counted and dropped."""
+        started = time.perf_counter()
+        row_of = self.store.row_of
+        rows = np.array([row_of(i, -1) for i in batch.ids], dtype=np.int64)
+        known = rows >= 0
+        self.received += len(rows)
+        self.unknown += int((~known).sum())
+        if known.any():
+            rows, lat, lng, progress = rows[known], batch.lat[known], batch.lng[known], batch.progress[known]
+            # np.unique keeps the first occurrence, so search the reversed batch
+            _, first = np.unique(rows[::-1], return_index=True)
+            keep = len(rows) - 1 - first
+            rows, lat, lng, progress = rows[keep], lat[keep], lng[keep], progress[keep]
+            reported = progress >= 0
+            if reported.all():
+                self.store.update_many(rows, lat=lat, lng=lng, progress=np.clip(progress, 0, 100))
+            else:
+                with self.store.lock:
+                    self.store.update_many(rows, lat=lat, lng=lng)
+                    if reported.any():
+                        self.store.update_many(rows[reported], progress=np.clip(progress[reported], 0, 100))
+            self.applied += len(rows)
+            now = time.monotonic()
+            self._window.append((now, len(rows)))
+            while now - self._window[0][0] > RATE_WINDOW_SECONDS:
+                self._window.popleft()
+            last = keep.argmax()
+            self.recent.appendleft((self.store.id_of(int(rows[last])),
+                                    nearest_place(float(lat[last]), float(lng[last]))))
+        self.batches += 1
+        self.last_apply_ms = (time.perf_counter() - started) * 1e3
@@ -0,0 +1,312 @@
+"""Incrementally maintained KPIs for the Command Center and Compliance pages.
+
+A :class:`KpiAggregator` subscribes to the shipment store and keeps running
+counters (active, clean, per-license, the compliance checklist's exposure
+counts) and sums bucketed by month (cargo
+value by ETA month, transit days by arrival month) or by day (pickups). Each
+write adjusts only the buckets it touches. Reading a KPI is a handful of
+dictionary lookups, whatever the fleet size.
+"""
+
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from aegis.alerts import HOME_FLAG
+
+SECONDS_PER_DAY = 86400.0
+UNALIGNED = 'Unaligned'
+
+
+def month_key(day):
+    """``year * 12 + month - 1`` for a date, datetime or datetime64."""
+    if isinstance(day, np.datetime64):
+        return int(day.astype('datetime64[M]').astype(np.int64)) + 1970 * 12
+    return day.year * 12 + day.month - 1
+
+
+def _month_keys(stamps):
+    keys = stamps.astype('datetime64[M]').astype(np.int64) + 1970 * 12
+    return np.where(np.isnat(stamps), -1, keys)
+
+
+@dataclass
+class Kpis:
+    """The KPI values shown on the Dashboard and Compliance pages."""
+    total: int
+    active: int
+    new_this_week: int
+    clean: int
+    at_risk: int
+    compliance_score: float
+    avg_transit_days: float
+    transit_change: float
+    cargo_value_mtd: float
+    cargo_value_yoy: float
+    active_licenses: int
+    audits_ytd: int
+    audits_passed_ytd: int
+    contact: int = 0          # shipments that came within range of a restricted zone
+    restricted_flag: int = 0  # vessels flying a restricted jurisdiction's flag
+    foreign_flag: int = 0     # vessels not flying HOME_FLAG
+    unaligned: int = 0        # shipments bound for unaligned destinations
+    days_since_incident: int = None   # None when no incident is on record
+
+
+class KpiAggregator:
+    """Running KPI counters over a :class:`ShipmentStore`, updated from store notifications.
+
+    Zone contact and restricted flags come from ``scorer`` (a
+    :class:`~aegis.scoring.SovereigntyScorer` subscribed before this), which
+    rewrites ``sovereignty_score`` whenever either changes.
+    """
+
+    def __init__(self, store, audits=(), last_incident=None, scorer=None):
+        self.store = store
+        self.scorer = scorer
+        self._lock = threading.RLock()
+        self._delivered = store.dictionaries['status'].encode('Delivered')
+        self.total = 0
+        self.active = 0
+        self.clean = 0
+        self._is_clean = np.zeros(0, dtype=bool)
+        # Per row flags behind the compliance checklist, and their counts
+        self._flags = {name: np.zeros(0, dtype=bool) for name in ('contact', 'restricted', 'foreign', 'unaligned')}
+        self.exposed = Counter()
+        self._value = np.zeros(0, dtype=np.float64)
+        self._licenses = Counter()                  # license code -> active shipments
+        self._value_by_month = defaultdict(float)   # ETA month -> cargo value
+        self._transit_by_month = defaultdict(lambda: [0.0, 0])   # arrival month -> [days, count]
+        self._transit = {}                          # delivered row -> (month, days)
+        self._pickups_by_day = Counter()            # date -> shipments picked up
+        self._pickup = {}                           # row -> pickup date
+        self._audits_by_month = defaultdict(lambda: [0, 0])      # month -> [audits, passed]
+        for audit in audits:
+            bucket = self._audits_by_month[month_key(audit['date'])]
+            bucket[0] += 1
+            bucket[1] += audit['status'] == 'Passed'
+        self.last_incident = last_incident
+        with store.lock:
+            store.subscribe(self)
+            self.on_append(store.rows())
+
+    def close(self):
+        """Stop following the store."""
+        self.store.unsubscribe(self)
+
+    # ---- store notifications ----
+
+    def on_append(self, rows):
+        store = self.store
+        with self._lock:
+            size = len(store)
+            self._is_clean = np.resize(self._is_clean, size)
+            self._value = np.resize(self._value, size)
+            for name, flags in self._flags.items():
+                self._flags[name] = np.resize(flags, size)
+                self._flags[name][rows] = False
+            self._set_flag('foreign', rows, store.column('vessel_flag')[rows] != self._home_flag())
+            self._set_flag('unaligned', rows, store.column('alliance')[rows] == self._unaligned())
+            self._refresh_exposure(rows)
+            status = store.column('status')[rows]
+            active = status != self._delivered
+            clean = store.column('sovereignty_score')[rows] == 100
+            value = store.column('value_usd')[rows].astype(np.float64)
+            self._is_clean[rows] = clean
+            self._value[rows] = value
+            self.total += len(rows)
+            self.active += int(active.sum())
+            self.clean += int(clean.sum())
+
+            codes, counts = np.unique(store.column('license')[rows][active], return_counts=True)
+            self._licenses.update(dict(zip(codes.tolist(), counts.tolist())))
+
+            months = _month_keys(store.column('eta')[rows])
+            keys, inverse = np.unique(months, return_inverse=True)
+            for key, total in zip(keys.tolist(), np.bincount(inverse, weights=value).tolist()):
+                if key >= 0:
+                    self._value_by_month[key] += total
+
+            first, last = store.custody.actual_span(rows)
+            for row, day in zip(rows[~np.isnat(first)].tolist(),
+                                first[~np.isnat(first)].astype('datetime64[D]').tolist()):
+                self._pickup[row] = day
+                self._pickups_by_day[day] += 1
+            delivered = ~active & ~np.isnat(first)
+            days = (last[delivered] - first[delivered]).astype(np.int64) / SECONDS_PER_DAY
+            for row, month, d in zip(rows[delivered].tolist(), _month_keys(last[delivered]).tolist(),
+                                     days.tolist()):
+                self._add_transit(row, month, d)
+
+    def on_update(self, row, changes):
+        store = self.store
+        with self._lock:
+            if 'status' in changes:
+                old, new = (int(code) for code in changes['status'])
+                was, now = old != self._delivered, new != self._delivered
+                if was != now:
+                    self.active += 1 if now else -1
+                    license_code = int(store.column('license')[row])
+                    self._licenses[license_code] += 1 if now else -1
+                    if now:
+                        self._remove_transit(row)
+                    else:
+                        self._refresh_transit(row)
+            if 'license' in changes and store.column('status')[row] != self._delivered:
+                old, new = (int(code) for code in changes['license'])
+                self._licenses[old] -= 1
+                self._licenses[new] += 1
+            if 'vessel_flag' in changes:
+                self._set_flag('foreign', [row], [int(changes['vessel_flag'][1]) != self._home_flag()])
+            if 'alliance' in changes:
+                self._set_flag('unaligned', [row], [int(changes['alliance'][1]) == self._unaligned()])
+            if 'eta' in changes:
+                old, new = changes['eta']
+                value = self._value[row]
+                if not np.isnat(old):
+                    self._value_by_month[month_key(old)] -= value
+                if not np.isnat(new):
+                    self._value_by_month[month_key(new)] += value
+            self._refresh_rows(np.array([row]), tuple(changes))
+
+    def on_update_many(self, rows, names):
+        with self._lock:
+            # The scorer rescores appended rows before on_append reaches this
+            self._refresh_rows(rows[rows < len(self._is_clean)], names)
+
+    def on_custody(self, row):
+        store = self.store
+        with self._lock:
+            first, _ = store.custody.actual_span([row])
+            old = self._pickup.pop(row, None)
+            if old is not None:
+                self._pickups_by_day[old] -= 1
+            if not np.isnat(first[0]):
+                day = first[0].astype('datetime64[D]').item()
+                self._pickup[row] = day
+                self._pickups_by_day[day] += 1
+            if store.column('status')[row] == self._delivered:
+                self._refresh_transit(row)
+
+    def _refresh_rows(self, rows, names):
+        """Re-derive clean flags and cargo value for rows whose numeric columns were overwritten."""
+        store = self.store
+        if 'sovereignty_score' in names:
+            clean = store.column('sovereignty_score')[rows] == 100
+            lost = self._is_clean[rows] & ~clean
+            self.clean += int(clean.sum()) - int(self._is_clean[rows].sum())
+            self._is_clean[rows] = clean
+            if lost.any():
+                self.last_incident = date.today()
+            self._refresh_exposure(rows)
+        if 'value_usd' in names:
+            value = store.column('value_usd')[rows].astype(np.float64)
+            change = value - self._value[rows]
+            self._value[rows] = value
+            months = _month_keys(store.column('eta')[rows])
+            for month, delta in zip(months[change != 0].tolist(), change[change != 0].tolist()):
+                if month >= 0:
+                    self._value_by_month[month] += delta
+
+    def _home_flag(self):
+        return self.store.dictionaries['vessel_flag'].code(HOME_FLAG)
+
+    def _unaligned(self):
+        return self.store.dictionaries['alliance'].code(UNALIGNED)
+
+    def _set_flag(self, name, rows, values):
+        flags = self._flags[name]
+        values = np.asarray(values, dtype=bool)
+        self.exposed[name] += int(values.sum()) - int(flags[rows].sum())
+        flags[rows] = values
+
+    def _refresh_exposure(self, rows):
+        if self.scorer is not None:
+            contact, restricted = self.scorer.exposure(rows)
+            self._set_flag('contact', rows, contact)
+            self._set_flag('restricted', rows, restricted)
+
+    def _add_transit(self, row, month, days):
+        self._transit[row] = (month, days)
+        bucket = self._transit_by_month[month]
+        bucket[0] += days
+        bucket[1] += 1
+
+    def _remove_transit(self, row):
+        entry = self._transit.pop(row, None)
+        if entry is not None:
+            bucket = self._transit_by_month[entry[0]]
+            bucket[0] -= entry[1]
+            bucket[1] -= 1
+
+    def _refresh_transit(self, row):
+        self._remove_transit(row)
+        first, last = self.store.custody.actual_span([row])
+        if not np.isnat(first[0]):
+            days = (last[0] - first[0]).astype(np.int64) / SECONDS_PER_DAY
+            self._add_transit(row, month_key(last[0]), float(days))
+
+    # ---- reads ----
+
+    @property
+    def active_licenses(self):
+        return sum(1 for count in self._licenses.values() if count > 0)
+
+    def new_this_week(self, today=None):
+        today = today or date.today()
+        return sum(self._pickups_by_day.get(today - timedelta(days=d), 0) for d in range(7))
+
+    def avg_transit_days(self, month):
+        days, count = self._transit_by_month.get(month, (0.0, 0))
+        return days / count if count else float('nan')
+
+    def overall_transit_days(self):
+        days = sum(bucket[0] for bucket in self._transit_by_month.values())
+        count = sum(bucket[1] for bucket in self._transit_by_month.values())
+        return days / count if count else float('nan')
+
+    def cargo_value(self, month):
+        return self._value_by_month.get(month, 0.0)
+
+    def audits(self, months):
+        audits = passed = 0
+        for month in months:
+            bucket = self._audits_by_month.get(month, (0, 0))
+            audits += bucket[0]
+            passed += bucket[1]
+        return audits, passed
+
+    def snapshot(self, now=None):
+        """All displayed KPIs as of ``now``."""
+        now = now or datetime.now()
+        today = now.date()
+        month = month_key(today)
+        with self._lock:
+            transit = self.avg_transit_days(month)
+            previous = self.avg_transit_days(month - 1)
+            if np.isnan(transit):
+                transit = self.overall_transit_days()
+            audits, passed = self.audits(range(today.year * 12, month + 1))
+            return Kpis(
+                total=self.total,
+                active=self.active,
+                new_this_week=self.new_this_week(today),
+                clean=self.clean,
+                at_risk=self.total - self.clean,
+                compliance_score=100.0 * self.clean / self.total if self.total else 100.0,
+                avg_transit_days=transit,
+                transit_change=transit - previous,
+                cargo_value_mtd=self.cargo_value(month),
+                cargo_value_yoy=self.cargo_value(month - 12),
+                active_licenses=self.active_licenses,
+                days_since_incident=(today - self.last_incident).days if self.last_incident else None,
+                audits_ytd=audits,
+                audits_passed_ytd=passed,
+                contact=self.exposed['contact'],
+                restricted_flag=self.exposed['restricted'],
+                foreign_flag=self.exposed['foreign'],
+                unaligned=self.exposed['unaligned'],
+            )
@@ -0,0 +1,355 @@
+"""Bulk shipment manifests: streaming CSV/Parquet import and export.
+
+A manifest has one shipment per row, in the columns of ``MANIFEST_COLUMNS``.
+Custody steps nest in an optional ``custody_chain`` column (a JSON list of
+``{step, status, location, time}`` objects) and are flattened into the
+store's custody event log. Files are read ``CHUNK_SIZE`` rows at a time.
+Each chunk is validated and coerced with vectorized pandas operations, for
+example weights such as ``'2,400 kg'`` become kilograms, and appended to the
+store column by column, or inserted straight into the database. Peak memory
+follows the chunk size, not the file size. Rows that fail validation are
+skipped and reported. Exports write the same format chunk by chunk.
+
+Parquet needs pyarrow. Usable without Streamlit; imports go to the database
+without loading the fleet::
+
+    python -m aegis.manifest import fleet.parquet
+    python -m aegis.manifest export shipments.csv
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from aegis.seed import alliance_for
+from aegis.store import CATEGORY_COLUMNS, NUMERIC_COLUMNS, WEIGHT_UNITS, event_columns
+
+CHUNK_SIZE = 50_000
+# Exports larger than this are written to a temporary file rather than held in memory.
+SPOOL_BYTES = 64 * 2**20
+# Rejected rows listed in an import report; the rest are only counted.
+MAX_ERRORS = 100
+
+MANIFEST_COLUMNS = ['id', 'cargo', 'classification', 'origin', 'destination', 'status', 'progress',
+                    'vessel', 'vessel_flag', 'eta', 'weight', 'value_usd', 'license', 'sovereignty_score',
+                    'lat', 'lng', 'alliance']
+REQUIRED_COLUMNS = ('id', 'origin', 'destination', 'status')
+STATUSES = ('In Transit', 'Loading', 'Delivered')
+FORMATS = ('csv', 'parquet')
+MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+_NUMBER = r'^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([A-Za-z]*)$'
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    errors: list = field(default_factory=list)   # (line, id, reason) of the first MAX_ERRORS rejects
+
+    def frame(self):
+        return pd.DataFrame(self.errors, columns=['line', 'id', 'reason'])
+
+
+def manifest_format(name):
+    """``'parquet'`` for ``.parquet``/``.pq`` names, otherwise ``'csv'``."""
+    return 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def _parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ValueError("Parquet manifests need pyarrow installed") from exc
+    return pa, pq
+
+
+# ============ IMPORT ============
+
+def read_chunks(source, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Yield a manifest as DataFrames of at most ``chunk_size`` rows."""
+    if fmt == 'parquet':
+        _, pq = _parquet()
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+
+def parse_weights(values):
+    """Vectorized ``parse_weight``: '2,400 kg', '5.2 t', '800 lbs' or plain numbers, in kg.
+
+    A number without a unit is in kg. Blank and unparseable values, and units
+    not in ``WEIGHT_UNITS``, become NaN.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    parts = values.astype(str).str.replace(',', '', regex=False).str.strip().str.extract(_NUMBER)
+    factor = parts[1].str.lower().replace('', 'kg').map(WEIGHT_UNITS)
+    return (pd.to_numeric(parts[0], errors='coerce') * factor).to_numpy(dtype=np.float64)
+
+
+def _text(frame, name, default=''):
+    if name not in frame:
+        return pd.Series(default, index=frame.index, dtype=object)
+    return frame[name].fillna(default).astype(str).str.strip()
+
+
+def _blank(values):
+    return values.isna() | values.astype(str).str.strip().eq('')
+
+
+def _chain(value):
+    """A row's custody steps as a list; ``None`` when the value cannot be read."""
+    if isinstance(value, str):
+        if not value.strip():
+            return []
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return []
+    if isinstance(value, (list, tuple, np.ndarray)) and all(isinstance(step, dict) for step in value):
+        return list(value)
+    return None
+
+
+class _Rejects:
+    """First failed check per row."""
+
+    def __init__(self, index):
+        self.reason = pd.Series('', index=index, dtype=object)
+
+    def add(self, mask, reason):
+        mask = np.asarray(mask, dtype=bool)
+        self.reason[mask & (self.reason == '').to_numpy()] = reason
+
+    @property
+    def mask(self):
+        return (self.reason != '').to_numpy()
+
+
+def _number(frame, name, rejects, default, low=None, high=None):
+    raw = frame[name] if name in frame else pd.Series(np.nan, index=frame.index)
+    values = pd.to_numeric(raw, errors='coerce')
+    rejects.add(values.isna() & ~_blank(raw), f"{name} is not a number")
+    if low is not None:
+        rejects.add((values < low) | (values > high), f"{name} outside {low}..{high}")
+    return values.fillna(default).to_numpy()
+
+
+def coerce_chunk(frame, stored):
+    """Validate one manifest chunk.
+
+    Returns ``(columns, custody_offsets, custody_columns, rejected)``: the
+    accepted rows in the shape :meth:`ShipmentStore.append_columns` takes,
+    and ``(offset in chunk, id, reason)`` for every rejected row.
+    ``stored(ids)`` returns those of ``ids`` already imported; they are
+    rejected as duplicates.
+    """
+    frame = frame.rename(columns=lambda name: str(name).strip().lower())
+    missing = [name for name in REQUIRED_COLUMNS if name not in frame]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    rejects = _Rejects(frame.index)
+
+    ids = _text(frame, 'id')
+    rejects.add(ids.eq(''), "missing id")
+    rejects.add(ids.duplicated() | ids.isin(stored(ids.tolist())), "duplicate id")
+    text = {name: _text(frame, name) for name in CATEGORY_COLUMNS}
+    rejects.add(text['origin'].eq('') | text['destination'].eq(''), "missing origin or destination")
+    rejects.add(~text['status'].isin(STATUSES), f"status not one of {', '.join(STATUSES)}")
+
+    columns = {
+        'progress': _number(frame, 'progress', rejects, 0, 0, 100),
+        'sovereignty_score': _number(frame, 'sovereignty_score', rejects, 100, 0, 100),
+        'value_usd': _number(frame, 'value_usd', rejects, 0.0),
+        'lat': _number(frame, 'lat', rejects, np.nan, -90, 90),
+        'lng': _number(frame, 'lng', rejects, np.nan, -180, 180),
+    }
+    raw_eta = frame['eta'] if 'eta' in frame else pd.Series(pd.NaT, index=frame.index)
+    eta = pd.to_datetime(raw_eta, errors='coerce', format='mixed')
+    rejects.add(eta.isna() & ~_blank(raw_eta), "eta is not a date")
+    columns['eta'] = eta.to_numpy(dtype='datetime64[s]')
+    if 'weight' in frame:
+        columns['weight_kg'] = parse_weights(frame['weight'])
+        rejects.add(np.isnan(columns['weight_kg']) & ~_blank(frame['weight']).to_numpy(),
+                    f"weight is not a number in {', '.join(WEIGHT_UNITS)}")
+
+    if 'custody_chain' in frame:
+        chains = frame['custody_chain'].map(_chain)
+    else:
+        chains = pd.Series([[]] * len(frame), index=frame.index, dtype=object)
+    rejects.add(chains.isna(), "custody_chain is not a list of steps")
+
+    # Alliances follow from the destination unless the manifest names one
+    unknown = text['alliance'].eq('')
+    alliances = {name: alliance_for(name) for name in text['destination'][unknown].unique()}
+    text['alliance'] = text['alliance'].mask(unknown, text['destination'].map(alliances))
+
+    keep = ~rejects.mask
+    columns = {name: values[keep] for name, values in columns.items()}
+    columns['id'] = ids[keep].tolist()
+    for name, values in text.items():
+        columns[name] = values[keep].tolist()
+    chains = chains[keep].tolist()
+    offsets = np.repeat(np.arange(len(chains), dtype=np.int32), [len(chain) for chain in chains])
+    custody = event_columns([step for chain in chains for step in chain])
+    failed = np.flatnonzero(~keep)
+    rejected = list(zip(failed.tolist(), ids.iloc[failed], rejects.reason.iloc[failed]))
+    return columns, offsets, custody, rejected
+
+
+def import_manifest(store, source, fmt=None, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """Stream a CSV or Parquet manifest into ``store`` and return an :class:`ImportReport`.
+
+    ``fmt`` defaults to what the name of ``source`` suggests. ``on_chunk``
+    is called with the report after every chunk, e.g. to show progress.
+    Raises ``ValueError`` if the file is not a readable manifest.
+    """
+    def stored(ids):
+        return {shipment_id for shipment_id in ids if store.row_of(shipment_id) is not None}
+    return _import(source, fmt, chunk_size, on_chunk, stored, store.append_columns)
+
+
+def import_to_repository(repository, source, fmt=None, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """:func:`import_manifest` straight into a :class:`~aegis.repository.Repository`, one transaction per chunk.
+
+    IDs already in the database are rejected as duplicates. Running apps
+    load the new shipments with their next store.
+    """
+    def append(columns, offsets, custody):
+        repository.append_frames(*repository_frames(columns, offsets, custody))
+    return _import(source, fmt, chunk_size, on_chunk, repository.stored_ids, append)
+
+
+def repository_frames(columns, offsets, custody):
+    """A :func:`coerce_chunk` result as the shipment and custody event frames ``Repository.append_frames`` takes."""
+    shipments = pd.DataFrame({'id': columns['id'], **{name: columns[name] for name in CATEGORY_COLUMNS}})
+    for name, dtype in NUMERIC_COLUMNS.items():
+        if name == 'eta':
+            eta = columns['eta']
+            shipments['eta'] = np.where(np.isnat(eta), None, np.datetime_as_string(eta, unit='s'))
+        elif name in columns:
+            shipments[name] = np.asarray(columns[name]).astype(dtype)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    events = pd.DataFrame({'shipment_id': np.asarray(columns['id'], dtype=object)[offsets],
+                           'seq': np.arange(len(offsets)) - np.searchsorted(offsets, offsets),
+                           **custody})
+    return shipments, events
+
+
+def _import(source, fmt, chunk_size, on_chunk, stored, append):
+    fmt = fmt or manifest_format(getattr(source, 'name', source))
+    report = ImportReport()
+    line = 2 if fmt == 'csv' else 1   # file line of the first row, after a CSV header
+    try:
+        for frame in read_chunks(source, fmt, chunk_size):
+            columns, offsets, custody, rejected = coerce_chunk(frame, stored)
+            append(columns, offsets, custody)
+            report.chunks += 1
+            report.imported += len(columns['id'])
+            report.rejected += len(rejected)
+            room = MAX_ERRORS - len(report.errors)
+            report.errors.extend((line + offset, shipment_id, reason)
+                                 for offset, shipment_id, reason in rejected[:max(room, 0)])
+            line += len(frame)
+            if on_chunk is not None:
+                on_chunk(report)
+    except (pd.errors.ParserError, UnicodeDecodeError) as exc:
+        raise ValueError(f"not a readable {fmt} manifest: {exc}") from exc
+    return report
+
+
+# ============ EXPORT ============
+
+def manifest_frame(store, rows, custody=True):
+    """Shipments at ``rows`` in manifest columns; weights in kg, custody chains as JSON."""
+    frame = store.frame(rows, ['id', *CATEGORY_COLUMNS, 'progress', 'eta', 'weight_kg', 'value_usd',
+                               'sovereignty_score', 'lat', 'lng'])
+    for name in CATEGORY_COLUMNS:
+        frame[name] = frame[name].astype(str)
+    frame = frame.rename(columns={'weight_kg': 'weight'})[MANIFEST_COLUMNS]
+    if custody:
+        frame['custody_chain'] = [json.dumps(chain) for chain in store.custody.timelines(rows)]
+    return frame
+
+
+def write_manifest(store, rows, target, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Write the shipments at ``rows`` to the path or binary file ``target``, chunk by chunk."""
+    rows = np.asarray(rows)
+    chunks = (manifest_frame(store, rows[start:start + chunk_size])
+              for start in range(0, max(len(rows), 1), chunk_size))
+    if fmt == 'parquet':
+        pa, pq = _parquet()
+        writer = None
+        try:
+            for frame in chunks:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with contextlib.ExitStack() as stack:
+            if isinstance(target, str):
+                write = stack.enter_context(open(target, 'w', encoding='utf-8', newline='')).write
+            else:
+                def write(data):
+                    target.write(data.encode('utf-8'))
+            for number, frame in enumerate(chunks):
+                write(frame.to_csv(index=False, header=number == 0, date_format='%Y-%m-%dT%H:%M:%S'))
+    return target
+
+
+def manifest_file(store, rows, fmt='csv', spool_bytes=SPOOL_BYTES):
+    """The manifest for ``rows`` in a rewound temporary file that spills to disk past ``spool_bytes``."""
+    target = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    write_manifest(store, rows, target, fmt)
+    target.seek(0)
+    return target
+
+
+# ============ COMMAND LINE ============
+
+def main(argv=None):
+    from aegis.repository import DATABASE_URL, Repository, open_pool
+    from aegis.store import ShipmentStore
+
+    parser = argparse.ArgumentParser(description="Import or export shipment manifests.")
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('path', help="CSV or Parquet manifest")
+    parser.add_argument('--database', default=DATABASE_URL, help="database URL (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    repository = Repository(open_pool(args.database))
+    if args.action == 'export':
+        store = ShipmentStore(args.database)
+        for chunk in repository.shipment_chunks():
+            store.append(chunk)
+        write_manifest(store, store.rows(), args.path, manifest_format(args.path), args.chunk_size)
+        print(f"Exported {len(store):,} shipments to {args.path}")
+        return 0
+    report = import_to_repository(repository, args.path, chunk_size=args.chunk_size,
+                                  on_chunk=lambda r: print(f"  {r.imported:,} imported, {r.rejected:,} rejected",
+                                                           file=sys.stderr))
+    for line, shipment_id, reason in report.errors:
+        print(f"line {line}: {shipment_id or '(no id)'}: {reason}", file=sys.stderr)
+    print(f"Imported {report.imported:,} shipments, rejected {report.rejected:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""God View map construction.
+
+Markers are batched into one ``Scattergeo`` trace per status layer with
+array-valued coordinates, colors and hover data. Plotly's cost then grows
+with the number of layers, not the number of ships. The static layers
+(restricted-zone outlines, clean route, ports) and the geo layout are built
+once per geofence and reused on every rerun. At fleet scale the markers come from a
+:class:`aegis.clustering.MapView`, so only clusters or the ships inside the
+viewport are drawn. Archived tracks of those ships are one more line trace,
+broken between ships. The live view is memoized per cluster index, viewport
+and archive version, so reruns between cluster refreshes reuse the figure.
+"""
+
+import functools
+
+import numpy as np
+import plotly.graph_objects as go
+
+from aegis.tracks import tolerance
+
+STATUS_COLORS = {
+    'In Transit': '#10b981',
+    'Loading': '#f59e0b',
+}
+DEFAULT_COLOR = '#f59e0b'
+
+PORTS = [
+    {'name': 'LAX', 'lat': 33.9, 'lon': -118.4},
+    {'name': 'PRL', 'lat': 21.4, 'lon': -157.9},
+    {'name': 'GUA', 'lat': 13.4, 'lon': 144.8},
+    {'name': 'TOK', 'lat': 35.7, 'lon': 139.7},
+]
+
+# Viewport presets: bounds are (south, north, west, east) in degrees.
+REGIONS = {
+    'Pacific': {'bounds': (-15, 65, 100, -100), 'center': dict(lat=25, lon=-160), 'scale': 2.5},
+    'Western Pacific': {'bounds': (-20, 50, 100, 180), 'center': dict(lat=20, lon=140), 'scale': 3.5},
+    'Atlantic': {'bounds': (-10, 70, -90, 30), 'center': dict(lat=35, lon=-35), 'scale': 2.5},
+    'Indian Ocean': {'bounds': (-45, 30, 30, 120), 'center': dict(lat=-5, lon=75), 'scale': 2.5},
+    'Global': {'bounds': (-90, 90, -180, 180), 'center': dict(lat=20, lon=0), 'scale': 1},
+}
+DEFAULT_REGION = 'Pacific'
+
+# Per-ship text labels are only drawn while the map stays readable.
+LABEL_LIMIT = 50
+
+HOVER_TEMPLATE = "<b>%{customdata[0]}</b><br>%{customdata[1]}<br>Progress: %{customdata[2]}%<extra></extra>"
+
+
+def zone_layer(zones):
+    """Restricted-jurisdiction outlines from a :class:`aegis.geofence.Geofence`."""
+    lats, lngs = zones.outline()
+    return go.Scattergeo(
+        lon=lngs,
+        lat=lats,
+        mode='lines',
+        fill='toself',
+        fillcolor='rgba(239, 68, 68, 0.15)',
+        line=dict(color='rgba(239, 68, 68, 0.4)', width=1, dash='dash'),
+        name='Restricted Zone',
+        hoverinfo='name'
+    )
+
+
+@functools.lru_cache(maxsize=2)
+def static_layers(zones):
+    """Restricted zones, clean route and port traces, built once per geofence."""
+    restricted = zone_layer(zones)
+
+    # Route line (LA -> Pearl Harbor -> Japan)
+    route = go.Scattergeo(
+        lon=[-118.4, -157.9, 139.7],
+        lat=[33.9, 21.4, 35.7],
+        mode='lines',
+        line=dict(color='#10b981', width=3),
+        name='Clean Route',
+        hoverinfo='name'
+    )
+
+    ports = go.Scattergeo(
+        lon=[p['lon'] for p in PORTS],
+        lat=[p['lat'] for p in PORTS],
+        mode='markers+text',
+        marker=dict(size=8, color='#1e293b', line=dict(color='#10b981', width=2)),
+        text=[p['name'] for p in PORTS],
+        textposition='top center',
+        textfont=dict(size=9, color='#64748b'),
+        showlegend=False,
+        hoverinfo='text'
+    )
+    return (restricted, route, ports)
+
+
+@functools.lru_cache(maxsize=1)
+def base_layout():
+    layout = go.Layout(
+        height=400,
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='#0a0f1a',
+        showlegend=False,
+    )
+    layout.geo.update(
+        projection_type="natural earth",
+        showland=True,
+        landcolor='#1e293b',
+        showocean=True,
+        oceancolor='#0a0f1a',
+        showcoastlines=True,
+        coastlinecolor='#334155',
+        showframe=False,
+        bgcolor='#0a0f1a',
+        center=dict(lat=25, lon=-160),
+        projection_scale=2.5,
+    )
+    return layout
+
+
+def marker_layers(store, rows, lat=None, lng=None):
+    """One batched marker trace per shipment status among ``rows``, at ``lat``/``lng`` if given."""
+    codes = store.column('status')[rows]
+    lat = store.column('lat')[rows] if lat is None else lat
+    lng = store.column('lng')[rows] if lng is None else lng
+    traces = []
+    for code in np.unique(codes).tolist():
+        status = store.dictionaries['status'].decode(code)
+        match = codes == code
+        layer = rows[match]
+        ids = store.ids_of(layer)
+        labelled = len(rows) <= LABEL_LIMIT
+        traces.append(go.Scattergeo(
+            lon=lng[match],
+            lat=lat[match],
+            mode='markers+text' if labelled else 'markers',
+            marker=dict(size=12 if labelled else 6, color=STATUS_COLORS.get(status, DEFAULT_COLOR),
+                        symbol='circle'),
+            text=[i[-5:] for i in ids] if labelled else None,
+            textposition='bottom center',
+            textfont=dict(size=10, color='#94a3b8'),
+            name=status,
+            customdata=np.column_stack([ids, store.decode('cargo', layer),
+                                        store.column('progress')[layer]]),
+            hovertemplate=HOVER_TEMPLATE,
+        ))
+    return traces
+
+
+def cluster_layer(clusters):
+    """One trace of aggregated markers sized by ship count."""
+    mostly_transit = clusters.in_transit * 2 >= clusters.count
+    return go.Scattergeo(
+        lon=clusters.lng,
+        lat=clusters.lat,
+        mode='markers+text',
+        marker=dict(size=10 + 4 * np.log2(clusters.count),
+                    color=np.where(mostly_transit, STATUS_COLORS['In Transit'], DEFAULT_COLOR),
+                    opacity=0.8, line=dict(color='#0a0f1a', width=1)),
+        text=clusters.count,
+        textposition='middle center',
+        textfont=dict(size=9, color='#0a0f1a'),
+        name='Clusters',
+        customdata=np.column_stack([clusters.count, clusters.in_transit]),
+        hovertemplate="<b>%{customdata[0]} ships</b><br>%{customdata[1]} in transit<extra></extra>",
+    )
+
+
+def track_layer(tracks):
+    """Archived :class:`aegis.tracks.TrackPoints` as one line trace, broken between ships."""
+    breaks = tracks.starts()[1:]
+    return go.Scattergeo(
+        lon=np.insert(tracks.lng.astype(np.float64), breaks, np.nan),
+        lat=np.insert(tracks.lat.astype(np.float64), breaks, np.nan),
+        mode='lines',
+        line=dict(color='rgba(16, 185, 129, 0.45)', width=1.5),
+        connectgaps=False,
+        name='Tracks',
+        hoverinfo='skip'
+    )
+
+
+def god_view_figure(store, view=None, region=DEFAULT_REGION, zones=None, tracks=None):
+    """Assemble the God View for a :class:`MapView` (all undelivered ships by default).
+
+    ``zones`` is the restricted-zone geofence to outline; the static layers
+    are skipped when it is omitted. ``tracks`` are drawn under the markers.
+    """
+    if view is None:
+        markers = marker_layers(store, store.rows(~store.mask('status', 'Delivered')))
+    elif view.clusters is not None:
+        markers = [cluster_layer(view.clusters)]
+    else:
+        markers = marker_layers(store, view.rows, view.lat, view.lng)
+    static = static_layers(zones) if zones is not None else ()
+    trails = [track_layer(tracks)] if tracks is not None and len(tracks) else []
+    fig = go.Figure(data=[*static, *trails, *markers], layout=base_layout())
+    if region != DEFAULT_REGION:
+        preset = REGIONS[region]
+        fig.update_geos(center=preset['center'], projection_scale=preset['scale'])
+    return fig
+
+
+def live_figure(store, index, region, zoom, zones, archive, start, end):
+    """The God View of a :class:`ClusterIndex` of current positions, with ``archive`` tracks over ``[start, end)``."""
+    return _live_figure(store, index, region, zoom, zones, archive, start, end, archive.version)
+
+
+@functools.lru_cache(maxsize=8)
+def _live_figure(store, index, region, zoom, zones, archive, start, end, version):
+    view = index.view(REGIONS[region]['bounds'], zoom)
+    tracks = archive.tracks(view.rows, start, end, tolerance(view.zoom)) if view.rows is not None else None
+    return god_view_figure(store, view, region, zones=zones, tracks=tracks)
+
+
+def route_figure(route, zones, clean=True):
+    """A planned route over the restricted-zone outlines, framed on the route."""
+    lat, lng = route.geometry
+    line = go.Scattergeo(
+        lon=lng,
+        lat=lat,
+        mode='lines',
+        line=dict(color='#10b981' if clean else '#f43f5e', width=3),
+        name='Route',
+        hoverinfo='name'
+    )
+    stops = go.Scattergeo(
+        lon=[lng[0], lng[-1]],
+        lat=[lat[0], lat[-1]],
+        mode='markers+text',
+        marker=dict(size=8, color='#1e293b', line=dict(color='#10b981', width=2)),
+        text=[route.nodes[0].split(',')[0], route.nodes[-1].split(',')[0]],
+        textposition='top center',
+        textfont=dict(size=9, color='#64748b'),
+        hoverinfo='text'
+    )
+    fig = go.Figure(data=[zone_layer(zones), line, stops], layout=base_layout())
+    fig.update_layout(height=300)
+    fig.update_geos(projection_type='natural earth', fitbounds='locations', center=None)
+    return fig
@@ -0,0 +1,55 @@
+"""Server-side sorting and pagination of shipment rows.
+
+Filtering yields row numbers; sorting orders those rows by one store column,
+and only the requested page is ever decoded into a DataFrame for the browser.
+"""
+
+import math
+
+import numpy as np
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+# Table heading -> store column used as the sort key.
+SORT_COLUMNS = {
+    'Container ID': 'id',
+    'ETA': 'eta',
+    'Progress': 'progress',
+    'Sovereignty': 'sovereignty_score',
+    'Status': 'status',
+    'Cargo': 'cargo',
+    'Destination': 'destination',
+}
+
+
+def category_ranks(dictionary):
+    """Alphabetical rank of every code in a store dictionary."""
+    values = np.array(dictionary.values, dtype=object)
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[np.argsort(values, kind='stable')] = np.arange(len(values))
+    return ranks
+
+
+def sort_rows(store, rows, column, descending=False):
+    """Order ``rows`` by ``column``; ties keep their row order."""
+    if column in store.codes:
+        keys = category_ranks(store.dictionaries[column])[store.codes[column][rows]]
+    else:
+        keys = store.column(column)[rows]
+    if descending:
+        # Sort the reversed keys and reverse back, so ties stay in row order
+        order = (len(keys) - 1 - np.argsort(keys[::-1], kind='stable'))[::-1]
+    else:
+        order = np.argsort(keys, kind='stable')
+    return rows[order]
+
+
+def page_count(total, page_size):
+    return max(1, math.ceil(total / page_size))
+
+
+def page_rows(rows, page, page_size):
+    """Rows of 1-based ``page``; out-of-range pages are clamped."""
+    page = min(max(1, page), page_count(len(rows), page_size))
+    start = (page - 1) * page_size
+    return rows[start:start + page_size]
@@ -0,0 +1,91 @@
+"""Sovereignty-aware route planning.
+
+Joins the sea-lane graph with the restricted-zone geofence. Every lane's
+great-circle geometry is checked against the zones once, when the planner is
+built. That gives per-edge crossing flags and closest-approach distances, so
+a query only combines precomputed rows. With restricted jurisdictions
+excluded, lanes in contact with a zone are closed to the router. Otherwise
+the shortest route is taken and scored.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from aegis.geofence import CONTACT_BUFFER_NM, PROXIMITY_NM, Assessment
+from aegis.routing import Route
+
+
+@dataclass
+class RoutePlan:
+    """A planned route and its sovereignty assessment."""
+    route: Route
+    assessment: Assessment
+    exclude_restricted: bool
+
+    @property
+    def sovereignty_score(self):
+        return self.assessment.score
+
+
+class RoutePlanner:
+    """Plans routes over a :class:`RouteGraph` while respecting a :class:`Geofence`."""
+
+    def __init__(self, graph, geofence):
+        self.graph = graph
+        self.geofence = geofence
+        codes = geofence.codes
+        edges = len(graph.edge_nm)
+        self.edge_crossed = np.zeros((edges, len(codes)), dtype=bool)
+        self.edge_distance = np.full((edges, len(codes)), np.inf)
+        for e in range(edges):
+            a, b = int(graph.edge_src[e]), int(graph.edge_dst[e])
+            if a > b:
+                continue  # assess each undirected lane once, mirrored below
+            assessment = geofence.assess(*graph.geometry([a, b], step_nm=50.0))
+            for code in assessment.crossed:
+                self.edge_crossed[e, codes.index(code)] = True
+            for code, nm in assessment.distances.items():
+                self.edge_distance[e, codes.index(code)] = nm
+        reverse = self._reverse_edges()
+        mirror = graph.edge_src > graph.edge_dst
+        self.edge_crossed[mirror] = self.edge_crossed[reverse[mirror]]
+        self.edge_distance[mirror] = self.edge_distance[reverse[mirror]]
+
+        contact = self.edge_crossed | (self.edge_distance < CONTACT_BUFFER_NM)
+        self.compliant_weights = np.where(contact.any(axis=1), np.inf, graph.edge_nm)
+
+    def _reverse_edges(self):
+        graph = self.graph
+        position = {(int(a), int(b)): e for e, (a, b) in enumerate(zip(graph.edge_src, graph.edge_dst))}
+        return np.array([position[(int(b), int(a))] for a, b in zip(graph.edge_src, graph.edge_dst)])
+
+    def assess_edges(self, edges):
+        """Combine the precomputed checks of a route's edges."""
+        if not edges:
+            return Assessment()
+        crossed = self.edge_crossed[edges].any(axis=0)
+        closest = self.edge_distance[edges].min(axis=0)
+        codes = self.geofence.codes
+        return Assessment(
+            crossed=tuple(codes[i] for i in np.flatnonzero(crossed)),
+            distances={codes[i]: float(closest[i]) for i in np.flatnonzero(closest < PROXIMITY_NM)},
+        )
+
+    def plan(self, origin, destination, waypoint=None, exclude_restricted=True):
+        """Plan a route; ``None`` when no (compliant) route exists."""
+        weights = self.compliant_weights if exclude_restricted else None
+        route = self.graph.plan(origin, destination, waypoint, weights=weights)
+        if route is None:
+            return None
+        return self._plan(route, exclude_restricted)
+
+    def replay(self, nodes, edges, exclude_restricted=True):
+        """Rebuild a plan from a stored path (node names and edge indices)."""
+        route = self.graph.route([self.graph.index[name] for name in nodes], list(edges))
+        return self._plan(route, exclude_restricted)
+
+    def _plan(self, route, exclude_restricted):
+        return RoutePlan(route=route, assessment=self.assess_edges(route.edges),
+                         exclude_restricted=exclude_restricted)
+
@@ -0,0 +1,137 @@
+"""HTML templates for card lists.
+
+A list of cards is rendered into one HTML block and sent with a single
+``st.markdown`` call, instead of one delta message per card. Templates are
+parsed once at import into literal text and fields. Every field value is
+HTML-escaped unless it is wrapped in :class:`Safe`. Rendered lists are
+cached by the template and the content of the items, so a rerun that
+shows the same cards again skips the formatting.
+"""
+
+import functools
+import html
+from string import Formatter
+
+import streamlit as st
+
+# Rendered lists kept by content.
+CACHE_SIZE = 256
+
+
+class Safe(str):
+    """Markup that a template inserts without escaping."""
+
+
+def escape(value, spec=''):
+    """``value`` formatted with ``spec``, then HTML-escaped unless it is :class:`Safe`."""
+    if isinstance(value, Safe):
+        return value
+    return html.escape(format(value, spec), quote=True)
+
+
+class Template:
+    """A ``str.format``-style HTML template, parsed once, that escapes its fields."""
+
+    def __init__(self, source):
+        self.source = source.strip()
+        self._parts = [(literal, field, spec or '')
+                       for literal, field, spec, _ in Formatter().parse(self.source)]
+
+    def render(self, item=None, **fields):
+        """The template filled from the mapping ``item`` and ``fields``."""
+        values = {**item, **fields} if item else fields
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(escape(values[field], spec))
+        return ''.join(out)
+
+    def render_many(self, items, separator='\n'):
+        """All ``items`` rendered and joined into one block; cached by their content."""
+        return _render_many(self, tuple(tuple(item.items()) for item in items), separator)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _render_many(template, items, separator):
+    return Safe(separator.join(template.render(dict(item)) for item in items))
+
+
+def html_list(template, items, separator='\n'):
+    """Emit ``items`` through ``template`` as one ``st.markdown`` element."""
+    if items:
+        st.markdown(template.render_many(items, separator), unsafe_allow_html=True)
+
+
+def shown_count(key, total, step):
+    """How many of ``total`` items to show: ``step`` at first, more after each :func:`show_more` click."""
+    return min(st.session_state.get(key, step), total)
+
+
+def show_more(key, shown, total, step):
+    """A "Show more" button under a list cut at ``shown``; each click reveals ``step`` more."""
+    if shown < total:
+        st.button(f"Show more ({total - shown:,} hidden)", key=f"{key}.more",
+                  on_click=_reveal, args=(key, shown + step))
+
+
+def _reveal(key, count):
+    st.session_state[key] = count
+
+
+# ============ TEMPLATES ============
+
+ASSET_CARD = Template("""
+<div class='card'>
+    <div style='display: flex; justify-content: space-between; align-items: center;'>
+        <span class='mono'>{id}</span>
+        <span style='background: rgba(16, 185, 129, 0.1); color: {status_color};
+                     padding: 2px 8px; border-radius: 4px; font-size: 10px;'>
+            {status}
+        </span>
+    </div>
+    <p style='font-size: 12px; color: #94a3b8; margin: 8px 0 4px 0;'>{cargo}</p>
+    <div style='background: #1e293b; height: 4px; border-radius: 2px; overflow: hidden;'>
+        <div style='background: #10b981; height: 100%; width: {progress}%;'></div>
+    </div>
+    <div style='display: flex; justify-content: space-between; font-size: 10px; color: #64748b; margin-top: 4px;'>
+        <span>ETA {eta}</span>
+        <span>{progress}%</span>
+    </div>
+</div>
+""")
+
+CUSTODY_STEP = Template("""
+<div style='border-left: 2px solid {color}; padding-left: 12px; margin: 8px 0;'>
+    <p style='font-size: 12px; color: {color}; margin: 0;'>{icon} {step}</p>
+    <p style='font-size: 10px; color: #64748b; margin: 2px 0;'>📍 {location}</p>
+    <p style='font-size: 10px; color: #475569; font-family: monospace;'>{time}</p>
+</div>
+""")
+
+AUDIT_CARD = Template("""
+<div class='card' style='display: flex; align-items: center; gap: 16px;'>
+    <span style='font-size: 20px;'>✅</span>
+    <div style='flex: 1;'>
+        <p style='font-family: monospace; color: #cbd5e1; margin: 0;'>{id}</p>
+        <p style='font-size: 12px; color: #64748b; margin: 4px 0 0 0;'>{type}</p>
+    </div>
+    <div style='text-align: right;'>
+        <p style='font-size: 12px; font-family: monospace; color: #94a3b8;'>{date}</p>
+        <p style='font-size: 10px; color: #64748b;'>{findings} findings</p>
+    </div>
+</div>
+""")
+
+JURISDICTION_ROW = Template("""
+<div style='background: rgba(244, 63, 94, 0.05); border: 1px solid rgba(244, 63, 94, 0.1);
+            padding: 8px 12px; border-radius: 4px; margin: 4px 0; display: flex;
+            justify-content: space-between; align-items: center;'>
+    <span style='font-size: 12px; color: #cbd5e1;'>❌ {name}</span>
+    <span style='font-size: 10px; font-family: monospace; color: #f43f5e;'>{code}</span>
+</div>
+""")
+
+ZONE_CHIP = Template("""
+<span class='restricted-zone' style='color: {color}; border-color: {color};'>{code}</span>
+""")
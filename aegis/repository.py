@@ -0,0 +1,525 @@
+"""SQL persistence for shipments, custody events, audits, jurisdictions and routes.
+
+The columnar :class:`~aegis.store.ShipmentStore` stays the read path for
+shipments. It is loaded from the database in chunks, and a
+:class:`StoreWriter` persists its writes, so the fleet survives restarts and
+replicas can share one database. Audits, jurisdictions and saved routes are
+read straight from the database with one indexed query each.
+
+``sqlite:///path.db`` uses a small pool of ``sqlite3`` connections in WAL
+mode, and ``sqlite://`` a shared in-memory database. Any other URL goes
+through a pooled SQLAlchemy engine, which must be installed. Statements
+use ``:name`` parameters, are prepared once per connection (SQLite's
+statement cache, SQLAlchemy's compiled cache), and bulk writes go through
+``executemany``.
+"""
+
+import contextlib
+import itertools
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.parse
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from aegis.store import CATEGORY_COLUMNS, parse_weight
+
+log = logging.getLogger(__name__)
+
+# Where shipments, audits, jurisdictions and routes are stored: "sqlite:///file.db",
+# "sqlite://" (in memory, lost on restart) or any SQLAlchemy database URL.
+DATABASE_URL = os.environ.get('AEGIS_DATABASE_URL', 'sqlite:///aegis.db')
+# Connections per pool.
+POOL_SIZE = 8
+# Prepared statements kept per SQLite connection.
+STATEMENT_CACHE = 256
+# Shipments per chunk when loading the store.
+CHUNK_SIZE = 50_000
+# Ids per query when checking which shipments exist.
+ID_BATCH = 500
+# Batched position and progress writes reach the database at most this often.
+WRITE_BEHIND_SECONDS = 5.0
+
+SHIPMENT_COLUMNS = ['id', *CATEGORY_COLUMNS, 'progress', 'lat', 'lng', 'eta', 'sovereignty_score',
+                    'weight_kg', 'value_usd']
+CUSTODY_COLUMNS = ['step', 'status', 'location', 'time']
+AUDIT_COLUMNS = ['id', 'type', 'status', 'date', 'findings']
+JURISDICTION_COLUMNS = ['code', 'name', 'category']
+ROUTE_COLUMNS = ['id', 'created', 'state', 'origin', 'waypoint', 'destination', 'exclude_126', 'route',
+                 'distance_nm', 'sovereignty_score', 'jurisdictions_version']
+ROUTE_STATES = ('approved', 'draft')
+JURISDICTIONS_SQL = f"SELECT {', '.join(JURISDICTION_COLUMNS)} FROM jurisdictions ORDER BY load_order"
+
+SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS shipments (
+        id TEXT PRIMARY KEY,
+        load_order INTEGER NOT NULL,
+        {', '.join(f'{name} TEXT' for name in CATEGORY_COLUMNS)},
+        progress INTEGER, lat REAL, lng REAL, eta TEXT, sovereignty_score INTEGER,
+        weight_kg REAL, value_usd REAL)""",
+    "CREATE INDEX IF NOT EXISTS shipments_load_order ON shipments (load_order)",
+    """CREATE TABLE IF NOT EXISTS custody_events (
+        shipment_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        step TEXT, status TEXT, location TEXT, time TEXT,
+        PRIMARY KEY (shipment_id, seq))""",
+    "CREATE INDEX IF NOT EXISTS custody_events_location ON custody_events (location)",
+    """CREATE TABLE IF NOT EXISTS audits (
+        id TEXT PRIMARY KEY, type TEXT, status TEXT, date TEXT, findings INTEGER)""",
+    "CREATE INDEX IF NOT EXISTS audits_date ON audits (date)",
+    """CREATE TABLE IF NOT EXISTS jurisdictions (
+        code TEXT PRIMARY KEY, load_order INTEGER NOT NULL, name TEXT, category TEXT)""",
+    """CREATE TABLE IF NOT EXISTS routes (
+        id TEXT PRIMARY KEY, created TEXT NOT NULL, state TEXT NOT NULL,
+        origin TEXT, waypoint TEXT, destination TEXT, exclude_126 INTEGER, route TEXT,
+        distance_nm REAL, sovereignty_score INTEGER, jurisdictions_version TEXT)""",
+    "CREATE INDEX IF NOT EXISTS routes_state_created ON routes (state, created)",
+]
+
+
+# ============ CONNECTION POOLS ============
+
+class SqlitePool:
+    """A bounded pool of ``sqlite3`` connections to one database, in WAL mode."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self._uri = False
+        self._keepalive = None
+        if path in ('', ':memory:'):
+            # One in-memory database shared by the pool, alive while the pool is
+            self.path, self._uri = f"file:aegis-{uuid.uuid4().hex}?mode=memory&cache=shared", True
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        if self._uri:
+            self._keepalive = self._connect()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, uri=self._uri, timeout=30, check_same_thread=False,
+                                     cached_statements=STATEMENT_CACHE)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """A pooled connection inside one transaction, committed unless the block raises."""
+        with self._slots:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+            try:
+                with connection:
+                    yield _SqliteSession(connection)
+            finally:
+                self._idle.put(connection)
+
+
+class _SqliteSession:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, params).fetchall()
+
+    def executemany(self, sql, rows):
+        self.connection.executemany(sql, rows)
+
+
+class SqlAlchemyPool:
+    """Any database SQLAlchemy can reach, through its pooled engine."""
+
+    def __init__(self, url, size=POOL_SIZE):
+        try:
+            import sqlalchemy
+        except ImportError as exc:
+            raise RuntimeError(f"Database URL {url.split(':')[0]}:// needs SQLAlchemy installed") from exc
+        self.engine = sqlalchemy.create_engine(url, pool_size=size, pool_pre_ping=True)
+        self._text = sqlalchemy.text
+        self._statements = {}
+
+    def statement(self, sql):
+        statement = self._statements.get(sql)
+        if statement is None:
+            statement = self._statements[sql] = self._text(sql)
+        return statement
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.engine.begin() as connection:
+            yield _SqlAlchemySession(self, connection)
+
+
+class _SqlAlchemySession:
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        result = self.connection.execute(self.pool.statement(sql), params or {})
+        return [tuple(row) for row in result] if result.returns_rows else []
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        if rows:
+            self.connection.execute(self.pool.statement(sql), rows)
+
+
+def _sqlite_path(url):
+    path = url[len('sqlite://'):]
+    return path[1:] if path.startswith('/') else path
+
+
+def open_pool(url, size=POOL_SIZE):
+    """A connection pool for ``url``: ``sqlite:///file.db``, ``sqlite://`` or any SQLAlchemy URL."""
+    if url.startswith('sqlite://'):
+        return SqlitePool(_sqlite_path(url), size)
+    return SqlAlchemyPool(url, size)
+
+
+def stored_jurisdictions(url):
+    """The restricted jurisdictions stored at ``url``, or ``None`` if it has no such table yet.
+
+    Unlike :class:`Repository` this only reads: no database file, table or
+    pool is created.
+    """
+    if url.startswith('sqlite://'):
+        path = _sqlite_path(url)
+        if path in ('', ':memory:') or not os.path.exists(path):
+            return None
+        connection = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro", uri=True)
+        try:
+            if not connection.execute("SELECT 1 FROM sqlite_master "
+                                      "WHERE type = 'table' AND name = 'jurisdictions'").fetchall():
+                return None
+            rows = connection.execute(JURISDICTIONS_SQL).fetchall()
+        finally:
+            connection.close()
+    else:
+        try:
+            import sqlalchemy
+        except ImportError as exc:
+            raise RuntimeError(f"Database URL {url.split(':')[0]}:// needs SQLAlchemy installed") from exc
+        engine = sqlalchemy.create_engine(url)
+        try:
+            with engine.connect() as connection:
+                if not sqlalchemy.inspect(connection).has_table('jurisdictions'):
+                    return None
+                rows = connection.execute(sqlalchemy.text(JURISDICTIONS_SQL)).fetchall()
+        finally:
+            engine.dispose()
+    return [dict(zip(JURISDICTION_COLUMNS, row)) for row in rows]
+
+
+# ============ REPOSITORY ============
+
+def _text(value):
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else str(value.astype('datetime64[s]'))
+    return value
+
+
+def _python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _sql_rows(frame):
+    """A frame's rows as dicts of plain Python values, with ``None`` for missing ones."""
+    names = list(frame.columns)
+    columns = [frame[name].astype(object).where(frame[name].notna(), None).tolist() for name in names]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def _insert(table, columns):
+    return (f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + name for name in columns)})")
+
+
+class Repository:
+    """Tables behind the app, over a connection pool from :func:`open_pool`."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._appended = 0   # shipment rows this process has added since seeding
+        self._appending = threading.Lock()   # an append and its count move together
+        with pool.transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    def is_empty(self):
+        with self.pool.transaction() as db:
+            return not db.execute("SELECT 1 FROM shipments LIMIT 1")
+
+    def seed(self, shipments=(), audits=(), jurisdictions=()):
+        """Bulk-load initial data, e.g. the seed module's records, in one transaction."""
+        with self.pool.transaction() as db:
+            self._insert_shipments(db, shipments, 0)
+            db.executemany(_insert('audits', AUDIT_COLUMNS),
+                           [{name: _text(audit.get(name)) for name in AUDIT_COLUMNS} for audit in audits])
+            db.executemany(_insert('jurisdictions', ['load_order', *JURISDICTION_COLUMNS]),
+                           [dict({name: j.get(name) for name in JURISDICTION_COLUMNS}, load_order=i)
+                            for i, j in enumerate(jurisdictions)])
+
+    # ---- shipments ----
+
+    @staticmethod
+    def _insert_shipments(db, records, first):
+        shipments, events = [], []
+        for order, record in enumerate(records, first):
+            row = {name: _text(record.get(name)) for name in SHIPMENT_COLUMNS}
+            row['weight_kg'] = (_python(record['weight_kg']) if 'weight_kg' in record
+                                else parse_weight(record.get('weight')))
+            if row['weight_kg'] != row['weight_kg']:   # NaN
+                row['weight_kg'] = None
+            row['load_order'] = order
+            shipments.append({name: _python(value) for name, value in row.items()})
+            events.extend(dict({name: step.get(name) for name in CUSTODY_COLUMNS},
+                               shipment_id=record['id'], seq=seq)
+                          for seq, step in enumerate(record.get('custody_chain', ())))
+        db.executemany(_insert('shipments', ['load_order', *SHIPMENT_COLUMNS]), shipments)
+        db.executemany(_insert('custody_events', ['shipment_id', 'seq', *CUSTODY_COLUMNS]), events)
+
+    def append_frames(self, shipments, events):
+        """Bulk-insert a frame of shipment rows and one of custody events, columns named as in the tables.
+
+        Shipments are numbered after the last stored one (``MAX(load_order) + 1``,
+        read by the insert itself), so concurrent writers never reuse a number.
+        """
+        names = list(shipments.columns)
+        sql = (f"INSERT INTO shipments (load_order, {', '.join(names)}) "
+               f"SELECT COALESCE(MAX(load_order), -1) + 1, {', '.join(':' + name for name in names)} FROM shipments")
+        with self._appending:
+            with self.pool.transaction() as db:
+                db.executemany(sql, _sql_rows(shipments))
+                db.executemany(_insert('custody_events', list(events.columns)), _sql_rows(events))
+            self._appended += len(shipments)
+
+    def shipments_marker(self):
+        """Cheap change marker: shipments added by other writers since the database was opened.
+
+        Rows appended through this repository are not counted, so the app's own
+        imports leave it unchanged. Edits to existing rows are not tracked.
+        """
+        with self._appending:
+            with self.pool.transaction() as db:
+                last = db.execute("SELECT MAX(load_order) FROM shipments")[0][0]
+            return (-1 if last is None else last) + 1 - self._appended
+
+    def shipment_chunks(self, chunk_size=CHUNK_SIZE):
+        """Yield shipment records in load order, with custody chains, ``chunk_size`` at a time."""
+        for start in itertools.count(0, chunk_size):
+            window = {'start': start, 'end': start + chunk_size}
+            with self.pool.transaction() as db:
+                rows = db.execute(f"SELECT {', '.join(SHIPMENT_COLUMNS)} FROM shipments "
+                                  "WHERE load_order >= :start AND load_order < :end ORDER BY load_order",
+                                  window)
+                if not rows:
+                    return
+                events = db.execute(
+                    f"SELECT c.shipment_id, {', '.join('c.' + name for name in CUSTODY_COLUMNS)} "
+                    "FROM custody_events c JOIN shipments s ON s.id = c.shipment_id "
+                    "WHERE s.load_order >= :start AND s.load_order < :end ORDER BY c.shipment_id, c.seq",
+                    window)
+            chains = {}
+            for shipment_id, *values in events:
+                chains.setdefault(shipment_id, []).append(dict(zip(CUSTODY_COLUMNS, values)))
+            records = []
+            for values in rows:
+                record = dict(zip(SHIPMENT_COLUMNS, values))
+                record['weight'] = record.pop('weight_kg')
+                record['custody_chain'] = chains.get(record['id'], [])
+                records.append(record)
+            yield records
+
+    def stored_ids(self, ids):
+        """The shipment ids among ``ids`` that are already in the database."""
+        ids = list(ids)
+        found = set()
+        with self.pool.transaction() as db:
+            for start in range(0, len(ids), ID_BATCH):
+                batch = {f'id{i}': shipment_id for i, shipment_id in enumerate(ids[start:start + ID_BATCH])}
+                found.update(row[0] for row in db.execute(
+                    f"SELECT id FROM shipments WHERE id IN ({', '.join(':' + name for name in batch)})", batch))
+        return found
+
+    def update_shipments(self, names, rows):
+        """Write columns ``names`` for each dict in ``rows`` (an ``id`` plus those columns)."""
+        assignments = ', '.join(f'{name} = :{name}' for name in names if name in SHIPMENT_COLUMNS)
+        with self.pool.transaction() as db:
+            db.executemany(f"UPDATE shipments SET {assignments} WHERE id = :id", rows)
+
+    def append_custody(self, shipment_id, event):
+        """Add ``event`` after the shipment's last persisted custody event."""
+        with self.pool.transaction() as db:
+            last = db.execute("SELECT MAX(seq) FROM custody_events WHERE shipment_id = :shipment_id",
+                              {'shipment_id': shipment_id})[0][0]
+            db.execute(_insert('custody_events', ['shipment_id', 'seq', *CUSTODY_COLUMNS]),
+                       dict({name: event.get(name) for name in CUSTODY_COLUMNS},
+                            shipment_id=shipment_id, seq=(-1 if last is None else last) + 1))
+
+    # ---- audits and jurisdictions ----
+
+    def audits(self, limit=None):
+        """Audits newest first, with ``date`` as a ``date``."""
+        sql = f"SELECT {', '.join(AUDIT_COLUMNS)} FROM audits ORDER BY date DESC, id DESC"
+        with self.pool.transaction() as db:
+            rows = db.execute(sql + " LIMIT :limit", {'limit': limit}) if limit else db.execute(sql)
+        audits = [dict(zip(AUDIT_COLUMNS, row)) for row in rows]
+        for audit in audits:
+            audit['date'] = date.fromisoformat(audit['date'])
+        return audits
+
+    def audit_count(self):
+        with self.pool.transaction() as db:
+            return db.execute("SELECT COUNT(*) FROM audits")[0][0]
+
+    def jurisdictions(self):
+        """Restricted jurisdictions in the order they were listed."""
+        with self.pool.transaction() as db:
+            rows = db.execute(JURISDICTIONS_SQL)
+        return [dict(zip(JURISDICTION_COLUMNS, row)) for row in rows]
+
+    # ---- routes ----
+
+    def save_route(self, decision, state, when=None):
+        """Record a route decision (see the Route Planner) as ``state``; returns its id."""
+        if state not in ROUTE_STATES:
+            raise ValueError(f"Unknown route state: {state}")
+        row = {name: _python(decision.get(name)) for name in ROUTE_COLUMNS}
+        row.update(id=uuid.uuid4().hex, created=(when or datetime.now()).isoformat(timespec='seconds'),
+                   state=state, exclude_126=int(bool(decision.get('exclude_126'))))
+        with self.pool.transaction() as db:
+            db.execute(_insert('routes', ROUTE_COLUMNS), row)
+        return row['id']
+
+    def route_count(self, state):
+        with self.pool.transaction() as db:
+            return db.execute("SELECT COUNT(*) FROM routes WHERE state = :state", {'state': state})[0][0]
+
+    def routes(self, state, limit=50):
+        """The latest routes saved as ``state``, newest first."""
+        with self.pool.transaction() as db:
+            rows = db.execute(f"SELECT {', '.join(ROUTE_COLUMNS)} FROM routes WHERE state = :state "
+                              "ORDER BY created DESC LIMIT :limit", {'state': state, 'limit': limit})
+        return [dict(zip(ROUTE_COLUMNS, row)) for row in rows]
+
+
+# ============ WRITE-BEHIND ============
+
+class StoreWriter:
+    """Store listener that persists writes to a :class:`Repository` from its own thread.
+
+    Notifications arrive under ``store.lock``; they only copy what changed
+    and queue it, so no database I/O happens while the store is locked.
+    Appends, custody events and single-shipment updates are queued as they
+    come. Batched numeric updates from the position feed only mark rows
+    dirty; every ``flush_seconds`` the thread copies their current values
+    and writes them. Everything is written in the order it happened.
+    :meth:`close` writes what is left.
+    """
+
+    def __init__(self, repository, store, flush_seconds=WRITE_BEHIND_SECONDS):
+        self.repository = repository
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.written = 0           # queued writes done
+        self.failures = 0          # queued writes that raised; they are not retried
+        self.last_error = None
+        self._dirty = {}           # column -> list of row arrays, guarded by store.lock
+        self._work = queue.SimpleQueue()   # (write, args) in notification order; None stops the thread
+        self._thread = threading.Thread(target=self._run, name='aegis-store-writer', daemon=True)
+        with store.lock:
+            store.subscribe(self)
+        self._thread.start()
+
+    def close(self, timeout=10.0):
+        """Stop following the store and write everything queued or dirty."""
+        self.store.unsubscribe(self)
+        self.flush()
+        self._work.put(None)
+        self._thread.join(timeout)
+
+    def backlog(self):
+        """Writes queued and not yet done."""
+        return self._work.qsize()
+
+    # ---- store notifications: copy and queue ----
+
+    def _row(self, row, names):
+        values = {'id': self.store.id_of(row)}
+        for name in names:
+            values[name] = _python(_text(self.store.value(name, row)))
+        return values
+
+    def on_append(self, rows):
+        shipments = self.store.frame(rows, SHIPMENT_COLUMNS)
+        for name in CATEGORY_COLUMNS:
+            shipments[name] = shipments[name].astype(str)
+        eta = shipments['eta'].to_numpy(dtype='datetime64[s]')
+        shipments['eta'] = np.where(np.isnat(eta), None, np.datetime_as_string(eta, unit='s'))
+        events = pd.DataFrame([dict(step, shipment_id=shipment_id, seq=seq)
+                               for shipment_id, chain in zip(shipments['id'], self.store.custody.timelines(rows))
+                               for seq, step in enumerate(chain)],
+                              columns=['shipment_id', 'seq', *CUSTODY_COLUMNS])
+        self._work.put((self.repository.append_frames, (shipments, events)))
+
+    def on_update(self, row, changes):
+        self._work.put((self.repository.update_shipments, (list(changes), [self._row(row, changes)])))
+
+    def on_update_many(self, rows, names):
+        for name in names:
+            self._dirty.setdefault(name, []).append(rows)
+
+    def on_custody(self, row):
+        custody = self.store.custody
+        self._work.put((self.repository.append_custody, (self.store.id_of(row), custody.event(len(custody) - 1))))
+
+    # ---- writes ----
+
+    def flush(self):
+        """Queue the current values of rows changed by batched updates."""
+        with self.store.lock:
+            dirty, self._dirty = self._dirty, {}
+            for name, batches in dirty.items():
+                rows = np.unique(np.concatenate(batches))
+                ids = self.store.ids_of(rows)
+                values = self.store.column(name)[rows].tolist()
+                self._work.put((self.repository.update_shipments,
+                                ([name], [{'id': shipment_id, name: value} for shipment_id, value in zip(ids, values)])))
+
+    def _run(self):
+        flushed = time.monotonic()
+        while True:
+            try:
+                item = self._work.get(timeout=max(flushed + self.flush_seconds - time.monotonic(), 0.0))
+            except queue.Empty:
+                pass
+            else:
+                if item is None:   # queued by close(), after its flush
+                    return
+                self._write(*item)
+            if time.monotonic() - flushed >= self.flush_seconds:
+                self.flush()
+                flushed = time.monotonic()
+
+    def _write(self, write, args):
+        try:
+            write(*args)
+            self.written += 1
+        except Exception as exc:
+            # A failed write must not stop the ones queued after it
+            self.failures += 1
+            self.last_error = repr(exc)
+            log.exception("Shipment write failed (%d so far)", self.failures)
@@ -0,0 +1,130 @@
+"""Materialized compliance rollups for the Monthly Compliance Trend.
+
+Compliance observations are sovereignty results with a timestamp. Each
+actual custody event observes its shipment's current sovereignty score.
+Every later score change and every approved route plan is an observation
+too. Observations are queued and folded into daily, weekly and monthly
+buckets with vectorized group-bys. Buckets hold additive sums (observations,
+clean observations, score total), so a refresh only adds the new
+observations into the buckets they fall in, usually just the current one.
+Charts read the materialized buckets and never the raw events.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aegis.store import TIME_ACTUAL
+
+FREQUENCIES = {'D': 'Daily', 'W': 'Weekly', 'M': 'Monthly'}
+
+_COLUMNS = ['observations', 'clean', 'score_total']
+
+
+def bucket_starts(times, freq):
+    """Start of the day, ISO week (Monday) or month containing each time."""
+    times = np.asarray(times, dtype='datetime64[s]')
+    if freq == 'D':
+        return times.astype('datetime64[D]')
+    if freq == 'W':
+        days = times.astype('datetime64[D]').astype(np.int64)
+        return ((days + 3) // 7 * 7 - 3).astype('datetime64[D]')   # 1970-01-01 was a Thursday
+    if freq == 'M':
+        return times.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"Unknown frequency: {freq}")
+
+
+class ComplianceRollup:
+    """Daily, weekly and monthly compliance buckets kept current from store notifications."""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._pending = []   # (times, scores) batches not yet folded in
+        self._buckets = {freq: pd.DataFrame(columns=_COLUMNS, dtype=np.float64) for freq in FREQUENCIES}
+        with store.lock:
+            store.subscribe(self)
+            self._observe_custody(store.rows())
+
+    def close(self):
+        """Stop following the store."""
+        self.store.unsubscribe(self)
+
+    # ---- observations ----
+
+    def _queue(self, times, scores):
+        times = np.asarray(times, dtype='datetime64[s]')
+        keep = ~np.isnat(times)
+        if keep.any():
+            with self._lock:
+                self._pending.append((times[keep], np.asarray(scores, dtype=np.float64)[keep]))
+
+    def _observe_custody(self, rows):
+        custody = self.store.custody
+        n = len(custody)
+        events = np.flatnonzero(np.isin(custody.shipment[:n], rows) & (custody.kind[:n] == TIME_ACTUAL))
+        self._queue(custody.time[events],
+                    self.store.column('sovereignty_score')[custody.shipment[events]])
+
+    def record_route(self, plan, when=None):
+        """Record a route plan's sovereignty score, e.g. when it is approved."""
+        self._queue([np.datetime64(when or pd.Timestamp.now(), 's')], [plan.sovereignty_score])
+
+    def on_append(self, rows):
+        self._observe_custody(rows)
+
+    def on_custody(self, row):
+        custody = self.store.custody
+        event = len(custody) - 1
+        if custody.kind[event] == TIME_ACTUAL:
+            self._queue(custody.time[event:event + 1],
+                        [self.store.column('sovereignty_score')[row]])
+
+    def on_update(self, row, changes):
+        if 'sovereignty_score' in changes:
+            self._queue([np.datetime64(pd.Timestamp.now(), 's')], [changes['sovereignty_score'][1]])
+
+    def on_update_many(self, rows, names):
+        if 'sovereignty_score' in names:
+            now = np.datetime64(pd.Timestamp.now(), 's')
+            self._queue(np.full(len(rows), now), self.store.column('sovereignty_score')[rows])
+
+    # ---- materialization ----
+
+    def refresh(self):
+        """Fold queued observations into every frequency's buckets."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            times = np.concatenate([batch[0] for batch in pending])
+            scores = np.concatenate([batch[1] for batch in pending])
+            observed = pd.DataFrame({'observations': 1.0, 'clean': (scores >= 100).astype(np.float64),
+                                     'score_total': scores})
+            for freq, buckets in self._buckets.items():
+                grouped = observed.groupby(bucket_starts(times, freq)).sum()
+                self._buckets[freq] = buckets.add(grouped, fill_value=0.0).sort_index()
+
+    def series(self, freq='M', start=None, end=None):
+        """Buckets of ``freq`` starting in ``[start, end)``, with score and clean share."""
+        self.refresh()
+        buckets = self._buckets[freq]
+        if start is not None:
+            buckets = buckets[buckets.index >= bucket_starts([np.datetime64(start, 's')], freq)[0]]
+        if end is not None:
+            buckets = buckets[buckets.index < np.datetime64(end, 'D')]
+        result = buckets.copy()
+        result['score'] = result['score_total'] / result['observations']
+        result['clean_pct'] = 100.0 * result['clean'] / result['observations']
+        return result
+
+    def summary(self, start=None, end=None):
+        """Compliance over an arbitrary ``[start, end)`` day range, summed from daily buckets."""
+        daily = self.series('D', start, end)
+        observations = daily['observations'].sum()
+        return {
+            'observations': int(observations),
+            'score': daily['score_total'].sum() / observations if observations else float('nan'),
+            'clean_pct': 100.0 * daily['clean'].sum() / observations if observations else float('nan'),
+        }
@@ -0,0 +1,110 @@
+"""Memoized route plans.
+
+Plans are keyed on ``(origin, waypoint, destination, exclude_126)`` plus the
+versions of the restricted-jurisdiction list and the sea-lane graph. A
+change to ``RESTRICTED_JURISDICTIONS``, the zone polygons or the lanes
+therefore misses every earlier entry, so nothing is served stale. The
+in-memory layer is an LRU bounded by entry count and shared by all
+sessions. An optional SQLite file keeps plans across restarts. It stores
+only the path (node names and edge indices), and plans are rebuilt from the
+path on load, which takes microseconds. Unreachable requests are cached
+too.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ROUTE_CACHE_SIZE = int(os.environ.get('AEGIS_ROUTE_CACHE_SIZE', 1024))
+# Local SQLite file for persisted plans; unset keeps the cache in memory only.
+ROUTE_CACHE_PATH = os.environ.get('AEGIS_ROUTE_CACHE', '')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS route_plans (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    path TEXT,
+    created REAL NOT NULL
+)
+"""
+
+
+class RouteCache:
+    """LRU of :class:`RoutePlan` results for one :class:`RoutePlanner`."""
+
+    def __init__(self, planner, capacity=ROUTE_CACHE_SIZE, path=ROUTE_CACHE_PATH):
+        self.planner = planner
+        self.capacity = capacity
+        self.version = f"{planner.geofence.version}:{planner.graph.version}"
+        self.hits = 0
+        self.misses = 0
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(_SCHEMA)
+                # Rows from other versions can never be hit again.
+                self._db.execute("DELETE FROM route_plans WHERE version != ?", (self.version,))
+
+    def __len__(self):
+        return len(self._plans)
+
+    def key(self, origin, destination, waypoint=None, exclude_restricted=True):
+        return (origin, waypoint or '', destination, bool(exclude_restricted), self.version)
+
+    def plan(self, origin, destination, waypoint=None, exclude_restricted=True):
+        """Return the plan for a request, computing it only on the first ask."""
+        key = self.key(origin, destination, waypoint, exclude_restricted)
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return self._plans[key]
+        found, plan = self._load(key)
+        if not found:
+            plan = self.planner.plan(origin, destination, waypoint, exclude_restricted=exclude_restricted)
+            self._save(key, plan)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.capacity:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM route_plans")
+
+    def _load(self, key):
+        if self._db is None:
+            return False, None
+        with self._lock:
+            row = self._db.execute("SELECT path FROM route_plans WHERE key = ?",
+                                   (json.dumps(key),)).fetchone()
+        if row is None:
+            return False, None
+        if row[0] is None:
+            return True, None
+        path = json.loads(row[0])
+        return True, self.planner.replay(path['nodes'], path['edges'], exclude_restricted=key[3])
+
+    def _save(self, key, plan):
+        if self._db is None:
+            return
+        path = None if plan is None else json.dumps({'nodes': plan.route.nodes,
+                                                     'edges': [int(e) for e in plan.route.edges]})
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO route_plans VALUES (?, ?, ?, ?)",
+                             (json.dumps(key), self.version, path, time.time()))
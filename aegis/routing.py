@@ -0,0 +1,344 @@
+"""Maritime route engine for the Route Planner.
+
+The graph joins the planner's origin, waypoint and destination ports through
+named sea nodes (straits, canals, open-ocean junctions). Each lane is a
+great-circle leg. Node coordinates and edge lengths are precomputed into
+NumPy arrays in CSR form when the graph is built. Queries run A* with a
+haversine heuristic, which is admissible because every edge is at least as
+long as the great-circle distance it spans.
+"""
+
+import hashlib
+import heapq
+import json
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from aegis.geo import great_circle_points, haversine_nm
+
+# Planner ports: the seed ORIGINS, WAYPOINTS and DESTINATIONS.
+PORTS = {
+    'Los Angeles, CA': (33.74, -118.27),
+    'San Francisco, CA': (37.80, -122.42),
+    'Seattle, WA': (47.60, -122.34),
+    'San Diego, CA': (32.71, -117.17),
+    'Norfolk, VA': (36.95, -76.33),
+    'Charleston, SC': (32.78, -79.93),
+    'Pearl Harbor, HI': (21.35, -157.97),
+    'Guam': (13.44, 144.66),
+    'Anchorage, AK': (61.22, -149.90),
+    'Diego Garcia': (-7.31, 72.41),
+    'Yokosuka, Japan': (35.28, 139.67),
+    'Tokyo, Japan': (35.62, 139.78),
+    'Busan, South Korea': (35.10, 129.04),
+    'Darwin, Australia': (-12.46, 130.84),
+    'Ramstein, Germany': (49.44, 7.60),
+    'Rota, Spain': (36.62, -6.35),
+}
+
+# Intermediate sea nodes.
+SEA_NODES = {
+    'Eastern Pacific': (15.0, -105.0),
+    'North Pacific': (45.0, -160.0),
+    'Gulf of Alaska': (55.0, -145.0),
+    'Aleutian Passage': (50.0, 175.0),
+    'Northwest Pacific': (38.0, 160.0),
+    'Mid Pacific': (28.0, 170.0),
+    'South Pacific': (-10.0, -150.0),
+    'Philippine Sea': (20.0, 135.0),
+    'Tsushima Strait': (34.0, 129.5),
+    'East China Sea': (30.0, 125.0),
+    'Taiwan Strait': (24.0, 119.5),
+    'Luzon Strait': (20.5, 121.0),
+    'South China Sea': (14.0, 114.0),
+    'Celebes Sea': (3.0, 123.0),
+    'Arafura Sea': (-10.0, 135.0),
+    'Coral Sea': (-15.0, 155.0),
+    'Malacca Strait': (3.0, 100.5),
+    'Lombok Strait': (-8.8, 115.7),
+    'Bay of Bengal': (10.0, 88.0),
+    'Arabian Sea': (15.0, 62.0),
+    'Gulf of Aden': (12.5, 47.0),
+    'Red Sea': (20.0, 38.5),
+    'Suez Canal': (30.5, 32.3),
+    'Eastern Mediterranean': (34.0, 25.0),
+    'Western Mediterranean': (37.5, 5.0),
+    'Strait of Gibraltar': (35.95, -5.6),
+    'North Atlantic': (40.0, -40.0),
+    'Azores': (38.0, -28.0),
+    'English Channel': (50.0, -2.0),
+    'North Sea': (53.5, 4.5),
+    'Caribbean Sea': (15.0, -75.0),
+    'Windward Passage': (20.0, -73.8),
+    'Mona Passage': (18.3, -67.9),
+    'Panama Canal': (9.1, -79.7),
+    'South Atlantic': (-10.0, -15.0),
+    'Cape of Good Hope': (-35.0, 20.0),
+    'Southern Indian Ocean': (-30.0, 60.0),
+}
+
+# Undirected sea lanes.
+LANES = [
+    # US West Coast
+    ('San Diego, CA', 'Los Angeles, CA'),
+    ('Los Angeles, CA', 'San Francisco, CA'),
+    ('San Francisco, CA', 'Seattle, WA'),
+    ('San Diego, CA', 'Eastern Pacific'),
+    ('Los Angeles, CA', 'Eastern Pacific'),
+    ('Los Angeles, CA', 'Pearl Harbor, HI'),
+    ('San Diego, CA', 'Pearl Harbor, HI'),
+    ('San Francisco, CA', 'Pearl Harbor, HI'),
+    ('Seattle, WA', 'Pearl Harbor, HI'),
+    ('San Francisco, CA', 'North Pacific'),
+    ('Seattle, WA', 'North Pacific'),
+    ('Seattle, WA', 'Gulf of Alaska'),
+    ('Gulf of Alaska', 'Anchorage, AK'),
+    # North and central Pacific
+    ('Anchorage, AK', 'Aleutian Passage'),
+    ('Anchorage, AK', 'North Pacific'),
+    ('North Pacific', 'Aleutian Passage'),
+    ('North Pacific', 'Northwest Pacific'),
+    ('North Pacific', 'Pearl Harbor, HI'),
+    ('Aleutian Passage', 'Northwest Pacific'),
+    ('Aleutian Passage', 'Tokyo, Japan'),
+    ('Northwest Pacific', 'Tokyo, Japan'),
+    ('Northwest Pacific', 'Yokosuka, Japan'),
+    ('Pearl Harbor, HI', 'Mid Pacific'),
+    ('Pearl Harbor, HI', 'Guam'),
+    ('Pearl Harbor, HI', 'South Pacific'),
+    ('Pearl Harbor, HI', 'Yokosuka, Japan'),
+    ('Mid Pacific', 'Northwest Pacific'),
+    ('Mid Pacific', 'Guam'),
+    ('Mid Pacific', 'Yokosuka, Japan'),
+    ('Eastern Pacific', 'Pearl Harbor, HI'),
+    ('Eastern Pacific', 'Panama Canal'),
+    ('Eastern Pacific', 'South Pacific'),
+    # Western Pacific
+    ('Tokyo, Japan', 'Yokosuka, Japan'),
+    ('Yokosuka, Japan', 'Tsushima Strait'),
+    ('Yokosuka, Japan', 'Philippine Sea'),
+    ('Guam', 'Yokosuka, Japan'),
+    ('Guam', 'Philippine Sea'),
+    ('Guam', 'Celebes Sea'),
+    ('Guam', 'Coral Sea'),
+    ('Philippine Sea', 'Tsushima Strait'),
+    ('Philippine Sea', 'East China Sea'),
+    ('Philippine Sea', 'Luzon Strait'),
+    ('Tsushima Strait', 'Busan, South Korea'),
+    ('East China Sea', 'Tsushima Strait'),
+    ('East China Sea', 'Taiwan Strait'),
+    ('Taiwan Strait', 'South China Sea'),
+    ('Luzon Strait', 'South China Sea'),
+    ('South China Sea', 'Malacca Strait'),
+    ('South China Sea', 'Celebes Sea'),
+    ('Celebes Sea', 'Arafura Sea'),
+    ('Celebes Sea', 'Lombok Strait'),
+    ('Arafura Sea', 'Darwin, Australia'),
+    ('Coral Sea', 'Arafura Sea'),
+    ('Coral Sea', 'South Pacific'),
+    ('Lombok Strait', 'Darwin, Australia'),
+    # Indian Ocean
+    ('Malacca Strait', 'Bay of Bengal'),
+    ('Malacca Strait', 'Diego Garcia'),
+    ('Lombok Strait', 'Diego Garcia'),
+    ('Bay of Bengal', 'Diego Garcia'),
+    ('Diego Garcia', 'Arabian Sea'),
+    ('Diego Garcia', 'Gulf of Aden'),
+    ('Diego Garcia', 'Southern Indian Ocean'),
+    ('Arabian Sea', 'Gulf of Aden'),
+    ('Southern Indian Ocean', 'Cape of Good Hope'),
+    # Suez and the Mediterranean
+    ('Gulf of Aden', 'Red Sea'),
+    ('Red Sea', 'Suez Canal'),
+    ('Suez Canal', 'Eastern Mediterranean'),
+    ('Eastern Mediterranean', 'Western Mediterranean'),
+    ('Western Mediterranean', 'Strait of Gibraltar'),
+    ('Strait of Gibraltar', 'Rota, Spain'),
+    # Atlantic
+    ('Norfolk, VA', 'Charleston, SC'),
+    ('Norfolk, VA', 'North Atlantic'),
+    ('Charleston, SC', 'North Atlantic'),
+    ('Norfolk, VA', 'Mona Passage'),
+    ('Charleston, SC', 'Windward Passage'),
+    ('Windward Passage', 'Caribbean Sea'),
+    ('Mona Passage', 'Caribbean Sea'),
+    ('Caribbean Sea', 'Panama Canal'),
+    ('North Atlantic', 'Azores'),
+    ('North Atlantic', 'English Channel'),
+    ('Azores', 'Strait of Gibraltar'),
+    ('Azores', 'English Channel'),
+    ('Azores', 'South Atlantic'),
+    ('English Channel', 'North Sea'),
+    ('North Sea', 'Ramstein, Germany'),
+    ('South Atlantic', 'Cape of Good Hope'),
+]
+
+# Extra charges in $K for transiting a canal node.
+CANAL_FEES_K = {'Panama Canal': 150, 'Suez Canal': 250}
+
+# Planning speed of a US-flag container ship, port fees and running cost.
+SERVICE_SPEED_KNOTS = 16.7
+PORT_FEES_K = 50
+COST_PER_NM_K = 0.08
+
+
+@dataclass
+class Route:
+    """A planned voyage through the graph."""
+    nodes: list
+    legs: list
+    distance_nm: float
+    transit_days: float
+    cost_k: float
+    edges: list = field(default_factory=list, repr=False)
+    geometry: tuple = field(default=None, repr=False)
+
+    @property
+    def summary(self):
+        return " → ".join(self.nodes)
+
+
+class RouteGraph:
+    """Sea-lane graph in CSR form with precomputed great-circle edge lengths."""
+
+    def __init__(self, ports=PORTS, sea_nodes=SEA_NODES, lanes=LANES):
+        self.names = list(ports) + list(sea_nodes)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        coords = np.array([*ports.values(), *sea_nodes.values()], dtype=np.float64)
+        self.lat, self.lng = coords[:, 0], coords[:, 1]
+        # Changes whenever the nodes, coordinates or lanes change; stored
+        # paths refer to edge indices and are only valid for one version.
+        self.version = hashlib.sha1(json.dumps(
+            [self.names, coords.tolist(), sorted(map(list, lanes))]).encode()).hexdigest()[:12]
+
+        src = np.array([self.index[a] for a, b in lanes] + [self.index[b] for a, b in lanes])
+        dst = np.array([self.index[b] for a, b in lanes] + [self.index[a] for a, b in lanes])
+        order = np.lexsort((dst, src))
+        self.edge_src, self.edge_dst = src[order], dst[order]
+        self.edge_nm = haversine_nm(self.lat[self.edge_src], self.lng[self.edge_src],
+                                    self.lat[self.edge_dst], self.lng[self.edge_dst])
+        self.indptr = np.searchsorted(self.edge_src, np.arange(len(self.names) + 1))
+        # Plain lists for the hot loop; indexing NumPy scalars per edge is slow.
+        self._adjacency = [
+            list(zip(self.edge_dst[self.indptr[i]:self.indptr[i + 1]].tolist(),
+                     range(self.indptr[i], self.indptr[i + 1])))
+            for i in range(len(self.names))
+        ]
+        self._distances = {}   # target -> lane distance from every node
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def shortest_path(self, source, target, weights=None):
+        """A* between two node names; returns ``(node indices, edge indices)``.
+
+        ``weights`` optionally replaces the edge costs, one per edge in CSR
+        order; costs must never undercut the edge length, and ``inf`` closes
+        an edge. Returns ``None`` when the target is unreachable.
+        """
+        s, t = self.index[source], self.index[target]
+        cost = (self.edge_nm if weights is None else weights).tolist()
+        heuristic = haversine_nm(self.lat, self.lng, self.lat[t], self.lng[t]).tolist()
+        best = {s: 0.0}
+        via = {s: None}
+        frontier = [(heuristic[s], 0.0, s)]
+        while frontier:
+            _, g, node = heapq.heappop(frontier)
+            if node == t:
+                break
+            if g > best[node]:
+                continue
+            for neighbour, edge in self._adjacency[node]:
+                candidate = g + cost[edge]
+                if candidate < best.get(neighbour, np.inf):
+                    best[neighbour] = candidate
+                    via[neighbour] = (node, edge)
+                    heapq.heappush(frontier, (candidate + heuristic[neighbour], candidate, neighbour))
+        else:
+            return None
+
+        nodes, edges = [t], []
+        while via[nodes[-1]] is not None:
+            node, edge = via[nodes[-1]]
+            nodes.append(node)
+            edges.append(edge)
+        return nodes[::-1], edges[::-1]
+
+    def distances_to(self, target):
+        """Sea-lane distance in nm from every node to ``target``; ``inf`` where unreachable."""
+        distances = self._distances.get(target)
+        if distances is None:
+            t = self.index[target]
+            cost = self.edge_nm.tolist()
+            best = [np.inf] * len(self.names)
+            best[t] = 0.0
+            frontier = [(0.0, t)]
+            while frontier:
+                g, node = heapq.heappop(frontier)
+                if g > best[node]:
+                    continue
+                for neighbour, edge in self._adjacency[node]:   # lanes run both ways
+                    if g + cost[edge] < best[neighbour]:
+                        best[neighbour] = g + cost[edge]
+                        heapq.heappush(frontier, (best[neighbour], neighbour))
+            distances = self._distances[target] = np.array(best)
+        return distances
+
+    def distance_to_go(self, lat, lng, target, chunk_size=65_536):
+        """Sea distance in nm from positions to ``target``.
+
+        Each position takes the straight leg to whichever node gives the
+        shortest total, then the lanes from there.
+        """
+        to = self.distances_to(target)
+        reachable = np.isfinite(to)
+        node_lat, node_lng, to = self.lat[reachable], self.lng[reachable], to[reachable]
+        lat, lng = np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)
+        out = np.empty(len(lat))
+        for start in range(0, len(lat), chunk_size):
+            part = slice(start, start + chunk_size)
+            legs = haversine_nm(lat[part, None], lng[part, None], node_lat, node_lng)
+            out[part] = (legs + to).min(axis=1)
+        return out
+
+    def plan(self, origin, destination, waypoint=None, weights=None):
+        """Plan ``origin`` → (``waypoint``) → ``destination``; ``None`` if unreachable."""
+        stops = [origin] + ([waypoint] if waypoint else []) + [destination]
+        nodes, edges = [self.index[origin]], []
+        for a, b in zip(stops, stops[1:]):
+            if a == b:
+                continue
+            path = self.shortest_path(a, b, weights)
+            if path is None:
+                return None
+            nodes.extend(path[0][1:])
+            edges.extend(path[1])
+        return self.route(nodes, edges)
+
+    def route(self, nodes, edges):
+        """Build a :class:`Route` from node indices and the edges joining them."""
+        legs = self.edge_nm[edges].tolist()
+        distance = float(sum(legs))
+        names = [self.names[i] for i in nodes]
+        fees = sum(CANAL_FEES_K.get(name, 0) for name in names)
+        return Route(
+            nodes=names,
+            legs=legs,
+            distance_nm=distance,
+            transit_days=distance / (SERVICE_SPEED_KNOTS * 24),
+            cost_k=PORT_FEES_K + COST_PER_NM_K * distance + fees,
+            edges=list(edges),
+            geometry=self.geometry(nodes),
+        )
+
+    def geometry(self, nodes, step_nm=100.0):
+        """Densified great-circle polyline through ``nodes`` as ``(lat, lng)``."""
+        lats, lngs = [], []
+        for a, b in zip(nodes, nodes[1:]):
+            lat, lng = great_circle_points(self.lat[a], self.lng[a], self.lat[b], self.lng[b], step_nm)
+            lats.append(lat if not lats else lat[1:])
+            lngs.append(lng if not lngs else lng[1:])
+        if not lats:
+            return np.array([self.lat[nodes[0]]]), np.array([self.lng[nodes[0]]])
+        return np.concatenate(lats), np.concatenate(lngs)
@@ -0,0 +1,389 @@
+"""Fleet-wide sovereignty scoring.
+
+A shipment's sovereignty score follows from what it has actually done: its
+track from the origin port through every reported position, the places of
+its custody events so far and its vessel's flag. As for a planned route
+(see :class:`~aegis.geofence.Assessment`), each restricted zone the track
+enters costs ``CROSSING_PENALTY`` and each zone it passes within
+``PROXIMITY_NM`` of costs up to ``PROXIMITY_PENALTY``. Custody in a
+restricted country counts as entering it, and a vessel flagged by a
+restricted jurisdiction costs ``FLAG_PENALTY`` more.
+
+A :class:`SovereigntyScorer` keeps, per shipment and restricted
+jurisdiction, the closest approach so far and whether the track entered the
+zone. Track segments are checked in bulk, zone by zone: only segments whose
+bounding box meets a zone's buffered extent are tested, in chunks, with the
+point-in-polygon, segment-intersection and edge-distance tests of
+:class:`~aegis.geofence.Geofence`. A position batch tests just the segments
+the moved ships travelled and rescores those ships. A new restricted list
+rescores the whole fleet from each voyage so far: origin port to current
+position, plus custody. That runs on a background thread in chunks, releasing
+the store lock between them.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from aegis.geofence import CROSSING_PENALTY, NM_PER_DEGREE, PROXIMITY_NM, PROXIMITY_PENALTY, Assessment
+from aegis.routing import PORTS, SEA_NODES
+from aegis.store import TIME_ACTUAL
+
+# Vessels flagged by a restricted jurisdiction lose this much more.
+FLAG_PENALTY = 60
+# Segment-edge pairs tested at once, which bounds each temporary array.
+PAIRS_PER_CHUNK = 1 << 19
+# Shipments scored at once, under the store lock, when the whole fleet is rescored.
+RESCORE_CHUNK = 200_000
+
+# Port cities, for custody places such as "Port of Tokyo" or "Busan Naval Base".
+_CITIES = {name.split(', ')[0]: xy for name, xy in PORTS.items()}
+
+
+def place_coordinates(name):
+    """``(lat, lng)`` of a port, sea area or port facility name; NaNs when unknown."""
+    name = str(name or '').strip()
+    if name in PORTS:
+        return PORTS[name]
+    if name in SEA_NODES:
+        return SEA_NODES[name]
+    city = name.removeprefix('Port of ').split(', ')[0]
+    return _CITIES.get(city) or _CITIES.get(city.split(' ')[0], (np.nan, np.nan))
+
+
+# ============ GEOMETRY ============
+
+def _orient(x0, y0, x1, y1, x2, y2):
+    return np.sign((x1 - x0) * (y2 - y0) - (y1 - y0) * (x2 - x0))
+
+
+def _inside(px, py, ax, ay, bx, by):
+    """Even-odd test of column-vector points against all edges of one zone."""
+    straddles = (ay > py) != (by > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = (bx - ax) * (py - ay) / (by - ay) + ax
+    return (np.count_nonzero(straddles & (px < x_cross), axis=1) % 2).astype(bool)
+
+
+def _distance(px, py, ax, ay, bx, by):
+    """Nautical miles from points to segments, broadcast against each other."""
+    scale = np.cos(np.radians(py))
+    ex, ey = (bx - ax) * scale, by - ay
+    qx, qy = (px - ax) * scale, py - ay
+    length2 = ex * ex + ey * ey
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(np.where(length2 > 0, (qx * ex + qy * ey) / length2, 0.0), 0.0, 1.0)
+    return np.hypot(qx - t * ex, qy - t * ey) * NM_PER_DEGREE
+
+
+def _zone_contact(lat0, lng0, lat1, lng1, ax, ay, bx, by):
+    """Closest approach (nm) and entry of track segments against one zone's edges."""
+    x0, y0, x1, y1 = lng0[:, None], lat0[:, None], lng1[:, None], lat1[:, None]
+    entered = _inside(x0, y0, ax, ay, bx, by) | _inside(x1, y1, ax, ay, bx, by)
+    entered |= ((_orient(x0, y0, x1, y1, ax, ay) != _orient(x0, y0, x1, y1, bx, by))
+                & (_orient(ax, ay, bx, by, x0, y0) != _orient(ax, ay, bx, by, x1, y1))).any(axis=1)
+    # Segment ends to the zone's edges, and the zone's vertices to the segment
+    closest = np.minimum(_distance(x0, y0, ax, ay, bx, by).min(axis=1),
+                         _distance(x1, y1, ax, ay, bx, by).min(axis=1))
+    closest = np.minimum(closest, _distance(ax, ay, x0, y0, x1, y1).min(axis=1))
+    closest[entered] = 0.0
+    return closest, entered
+
+
+def track_contacts(geofence, lat0, lng0, lat1, lng1):
+    """Closest approach (nm) and entry of many track segments against every zone.
+
+    Segments run from ``(lat0, lng0)`` to ``(lat1, lng1)``; equal ends make a
+    point and NaN ends are skipped. Returns ``(closest, entered)`` arrays of
+    shape ``(segments, zones)``, zones in ``geofence.codes`` order. Segments
+    that jump the antimeridian are checked at their ends only; no zone
+    straddles it.
+    """
+    lat0, lng0, lat1, lng1 = (np.array(v, dtype=np.float64, ndmin=1) for v in (lat0, lng0, lat1, lng1))
+    n = len(lat0)
+    closest = np.full((n, len(geofence.codes)), np.inf, dtype=np.float32)
+    entered = np.zeros((n, len(geofence.codes)), dtype=bool)
+
+    jump = np.flatnonzero(np.abs(lng1 - lng0) >= 180.0)
+    owner = np.concatenate([np.arange(n), jump])
+    ends = lat1[jump], lng1[jump]
+    lat1[jump], lng1[jump] = lat0[jump], lng0[jump]
+    lat0, lng0 = np.concatenate([lat0, ends[0]]), np.concatenate([lng0, ends[1]])
+    lat1, lng1 = np.concatenate([lat1, ends[0]]), np.concatenate([lng1, ends[1]])
+
+    valid = ~(np.isnan(lat0) | np.isnan(lng0) | np.isnan(lat1) | np.isnan(lng1))
+    west, east = np.fmin(lng0, lng1), np.fmax(lng0, lng1)
+    south, north = np.fmin(lat0, lat1), np.fmax(lat0, lat1)
+    for z, (x0, y0, x1, y1) in enumerate(geofence.bbox):
+        candidates = np.flatnonzero(valid & (west <= x1) & (east >= x0) & (south <= y1) & (north >= y0))
+        if not len(candidates):
+            continue
+        s, e = geofence.offsets[z], geofence.offsets[z + 1]
+        edges = geofence.ax[s:e], geofence.ay[s:e], geofence.bx[s:e], geofence.by[s:e]
+        step = max(1, PAIRS_PER_CHUNK // (e - s))
+        for start in range(0, len(candidates), step):
+            part = candidates[start:start + step]
+            near, inside = _zone_contact(lat0[part], lng0[part], lat1[part], lng1[part], *edges)
+            np.minimum.at(closest[:, z], owner[part], near.astype(np.float32))
+            np.logical_or.at(entered[:, z], owner[part], inside)
+    return closest, entered
+
+
+# ============ SCORER ============
+
+def _fit(array, size, fill):
+    """``array`` with room for ``size`` rows, new rows set to ``fill``."""
+    if len(array) >= size:
+        return array
+    grown = np.full((max(size, 2 * len(array)), *array.shape[1:]), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class SovereigntyScorer:
+    """Sovereignty scores of every shipment in a store, kept current from store notifications.
+
+    Scores are written back to the store's ``sovereignty_score`` column with
+    ``update_many``, only for shipments whose score, zone contact or
+    restricted flag changed, so the KPIs, rollups and database see them like
+    any other write.
+    """
+
+    def __init__(self, store, geofence):
+        self.store = store
+        self.scored = 0                 # shipments scored, over the scorer's life
+        self.last_rescore_ms = 0.0      # duration of the last full rescore
+        self._pending = (0, 0)          # rows a running rescore has yet to reach
+        self._wanted = geofence
+        self._thread = None
+        self._rescoring = threading.Lock()   # guards _wanted and _thread
+        # Per row, as of the last write: within PROXIMITY_NM of a zone, under a restricted flag
+        self.contact = np.zeros(0, dtype=bool)
+        self.restricted = np.zeros(0, dtype=bool)
+        with store.lock:
+            self._reset(geofence)
+            store.subscribe(self)
+            self.on_append(store.rows())
+
+    def _reset(self, geofence):
+        """Empty per-shipment state for ``geofence``; columns are every restricted code."""
+        self.geofence = geofence
+        self.codes = list(geofence.restricted)
+        self._zone_columns = np.array([self.codes.index(code) for code in geofence.codes], dtype=np.int64)
+        self._countries = {name: self.codes.index(code) for code, name in geofence.restricted.items()}
+        width = len(self.codes)
+        self.closest = np.full((0, width), np.inf, dtype=np.float32)
+        self.entered = np.zeros((0, width), dtype=bool)
+        self.lat = np.zeros(0, dtype=np.float32)
+        self.lng = np.zeros(0, dtype=np.float32)
+        # Per dictionary code: custody place contacts, origin coordinates, restricted flags
+        self._place_closest = np.empty((0, width), dtype=np.float32)
+        self._place_entered = np.empty((0, width), dtype=bool)
+        self._origins = np.empty((0, 2), dtype=np.float64)
+        self._flagged = np.zeros(0, dtype=bool)
+
+    def _contacts(self, lat0, lng0, lat1, lng1):
+        """:func:`track_contacts` with zones laid out in ``codes`` columns."""
+        near, inside = track_contacts(self.geofence, lat0, lng0, lat1, lng1)
+        closest = np.full((len(near), len(self.codes)), np.inf, dtype=np.float32)
+        entered = np.zeros((len(near), len(self.codes)), dtype=bool)
+        closest[:, self._zone_columns], entered[:, self._zone_columns] = near, inside
+        return closest, entered
+
+    def _extend(self):
+        """Grow per-row state and per-code tables to what the store now holds."""
+        store = self.store
+        size = len(store)
+        self.closest = _fit(self.closest, size, np.inf)
+        self.entered = _fit(self.entered, size, False)
+        self.lat, self.lng = _fit(self.lat, size, np.nan), _fit(self.lng, size, np.nan)
+        self.contact, self.restricted = _fit(self.contact, size, False), _fit(self.restricted, size, False)
+
+        places = store.custody.dictionaries['location'].values[len(self._place_closest):]
+        if places:
+            xy = np.array([place_coordinates(place) for place in places], dtype=np.float64)
+            closest, entered = self._contacts(xy[:, 0], xy[:, 1], xy[:, 0], xy[:, 1])
+            for i, place in enumerate(places):
+                column = self._countries.get(str(place).rpartition(', ')[2])
+                if column is not None:
+                    closest[i, column], entered[i, column] = 0.0, True
+            self._place_closest = np.concatenate([self._place_closest, closest])
+            self._place_entered = np.concatenate([self._place_entered, entered])
+
+        origins = store.dictionaries['origin'].values[len(self._origins):]
+        if origins:
+            xy = np.array([place_coordinates(origin) for origin in origins], dtype=np.float64)
+            self._origins = np.concatenate([self._origins, xy.reshape(-1, 2)])
+
+        flags = store.dictionaries['vessel_flag'].values
+        if len(flags) != len(self._flagged):
+            restricted = {*self.geofence.restricted, *self.geofence.restricted.values()}
+            self._flagged = np.array([str(flag).strip() in restricted or str(flag).strip().upper() in restricted
+                                      for flag in flags], dtype=bool)
+
+    def _track(self, rows):
+        """Contacts of each shipment's voyage so far, origin port to current position, plus custody."""
+        store = self.store
+        lat = store.column('lat')[rows].astype(np.float64)
+        lng = store.column('lng')[rows].astype(np.float64)
+        origin = self._origins[store.column('origin')[rows]]
+        start_lat = np.where(np.isnan(origin[:, 0]), lat, origin[:, 0])
+        start_lng = np.where(np.isnan(origin[:, 1]), lng, origin[:, 1])
+        closest, entered = self._contacts(start_lat, start_lng,
+                                          np.where(np.isnan(lat), start_lat, lat),
+                                          np.where(np.isnan(lng), start_lng, lng))
+
+        # Custody events that already happened, at places within range of a zone
+        custody = store.custody
+        n = len(custody)
+        events = np.flatnonzero(np.isin(custody.shipment[:n], rows) & (custody.kind[:n] == TIME_ACTUAL))
+        places = custody.codes['location'][events]
+        relevant = (self._place_closest[places] < PROXIMITY_NM).any(axis=1)
+        events, places = events[relevant], places[relevant]
+        if len(events):
+            order = np.argsort(rows)
+            at = order[np.searchsorted(rows, custody.shipment[events], sorter=order)]
+            np.minimum.at(closest, at, self._place_closest[places])
+            np.logical_or.at(entered, at, self._place_entered[places])
+
+        self.closest[rows], self.entered[rows] = closest, entered
+        self.lat[rows], self.lng[rows] = lat, lng
+
+    def _write(self, rows):
+        """Store the scores of ``rows`` whose score or exposure changed; returns how many did."""
+        scores = self.scores(rows)
+        contact = (self.closest[rows] < PROXIMITY_NM).any(axis=1)
+        restricted = self._flagged[self.store.column('vessel_flag')[rows]]
+        changed = ((scores != self.store.column('sovereignty_score')[rows])
+                   | (contact != self.contact[rows]) | (restricted != self.restricted[rows]))
+        self.scored += len(rows)
+        if changed.any():
+            rows = rows[changed]
+            self.contact[rows], self.restricted[rows] = contact[changed], restricted[changed]
+            self.store.update_many(rows, sovereignty_score=scores[changed])
+        return int(changed.sum())
+
+    def _settled(self, rows):
+        """``rows`` less those a running rescore has yet to reach; it scores them from scratch."""
+        start, end = self._pending
+        return rows[(rows < start) | (rows >= end)]
+
+    def _advance(self, rows):
+        """Extend the tracks of ``rows`` to their current positions and rescore the ships that moved."""
+        rows = self._settled(rows)
+        lat = self.store.column('lat')[rows]
+        lng = self.store.column('lng')[rows]
+        moved = ~np.isnan(lat) & ~np.isnan(lng) & ((lat != self.lat[rows]) | (lng != self.lng[rows]))
+        rows, lat, lng = rows[moved], lat[moved], lng[moved]
+        if not len(rows):
+            return
+        last_lat, last_lng = self.lat[rows], self.lng[rows]
+        closest, entered = self._contacts(np.where(np.isnan(last_lat), lat, last_lat),
+                                          np.where(np.isnan(last_lng), lng, last_lng), lat, lng)
+        self.closest[rows] = np.minimum(self.closest[rows], closest)
+        self.entered[rows] |= entered
+        self.lat[rows], self.lng[rows] = lat, lng
+        self._write(rows)
+
+    # ---- store notifications ----
+
+    def on_append(self, rows):
+        if len(rows):
+            self._extend()
+            self._track(rows)
+            self._write(rows)
+
+    def on_update(self, row, changes):
+        if {'lat', 'lng', 'vessel_flag'} & set(changes):
+            self._extend()
+            self._advance(np.array([row]))
+            if 'vessel_flag' in changes:
+                self._write(self._settled(np.array([row])))
+
+    def on_update_many(self, rows, names):
+        if 'lat' in names or 'lng' in names:
+            self._advance(np.asarray(rows, dtype=np.int64))
+
+    def on_custody(self, row):
+        custody = self.store.custody
+        event = len(custody) - 1
+        if custody.kind[event] == TIME_ACTUAL and len(self._settled(np.array([row]))):
+            self._extend()
+            place = custody.codes['location'][event]
+            self.closest[row] = np.minimum(self.closest[row], self._place_closest[place])
+            self.entered[row] |= self._place_entered[place]
+            self._write(np.array([row]))
+
+    # ---- scores ----
+
+    def scores(self, rows):
+        """Sovereignty scores (0-100) of ``rows`` from their current contacts and flags."""
+        closest, entered = self.closest[rows], self.entered[rows]
+        near = np.where(entered, 0.0, np.clip(1.0 - closest / PROXIMITY_NM, 0.0, 1.0))
+        penalty = (CROSSING_PENALTY * entered.sum(axis=1) + PROXIMITY_PENALTY * near.sum(axis=1)
+                   + FLAG_PENALTY * self._flagged[self.store.column('vessel_flag')[rows]])
+        return np.rint(np.clip(100.0 - penalty, 0.0, 100.0)).astype(np.uint8)
+
+    def assessment(self, row):
+        """One shipment's zone contacts so far; its score also counts the vessel flag."""
+        return Assessment(
+            crossed=tuple(code for code, inside in zip(self.codes, self.entered[row].tolist()) if inside),
+            distances={code: nm for code, nm in zip(self.codes, self.closest[row].tolist()) if nm < PROXIMITY_NM},
+        )
+
+    def exposure(self, rows):
+        """Whether ``rows`` have come within ``PROXIMITY_NM`` of a zone, and fly a restricted flag, as last written."""
+        return self.contact[rows], self.restricted[rows]
+
+    def flagged(self, row):
+        """Whether the shipment's vessel flies a restricted jurisdiction's flag."""
+        return bool(self._flagged[self.store.codes['vessel_flag'][row]])
+
+    def rescore(self, geofence=None):
+        """Rescore every shipment from scratch, against ``geofence`` if given; returns how many changed.
+
+        The store lock is held for one ``RESCORE_CHUNK`` of shipments at a
+        time. Notifications in between skip the shipments not yet reached.
+        """
+        started = time.perf_counter()
+        changed = 0
+        with self.store.lock:
+            self._reset(geofence or self.geofence)
+            self._extend()
+            end = len(self.store)
+            self._pending = (0, end)
+        for start in range(0, end, RESCORE_CHUNK):
+            with self.store.lock:
+                self._extend()
+                part = np.arange(start, min(start + RESCORE_CHUNK, end))
+                self._track(part)
+                self._pending = (start + len(part), end)
+                changed += self._write(part)
+        self.last_rescore_ms = (time.perf_counter() - started) * 1e3
+        return changed
+
+    @property
+    def rescoring(self):
+        """Whether a background rescore is running."""
+        return self._thread is not None
+
+    def use(self, geofence):
+        """Score against ``geofence`` from now on; a new restricted list rescores the fleet in the background."""
+        with self._rescoring:
+            if geofence.version == self._wanted.version:
+                return
+            self._wanted = geofence
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._follow, name='aegis-rescore', daemon=True)
+                self._thread.start()
+
+    def _follow(self):
+        """Rescore until the scores match the latest geofence handed to :meth:`use`."""
+        while True:
+            with self._rescoring:
+                geofence = self._wanted
+                if geofence.version == self.geofence.version:
+                    self._thread = None
+                    return
+            self.rescore(geofence)
@@ -0,0 +1,227 @@
+"""Trigram search index for the Active Shipments search box.
+
+Container IDs are unique per row, so they get a row-level trigram index plus a
+sorted array for prefix lookups with ``searchsorted``. ID postings are sorted
+row arrays, intersected rarest first; candidates that are not already prefix
+matches are checked for the full substring. The other searchable fields are
+dictionary-encoded in the store and repeat heavily, so their trigrams index
+the distinct values and a posting set per value maps back to rows. Hits are
+collected in a boolean row mask, which comes out sorted. Every string is
+lowercased once when it enters the index.
+
+The index subscribes to the store and applies appends and field updates
+incrementally instead of rebuilding.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SEARCH_FIELDS = ('id', 'cargo', 'destination', 'vessel', 'classification')
+
+GRAM = 3
+QUERY_CACHE_SIZE = 256
+
+
+def trigrams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def _intersect(postings, grams):
+    """Intersect the posting sets of ``grams``, smallest first."""
+    sets = [postings.get(gram) for gram in grams]
+    if not sets or any(s is None for s in sets):
+        return set()
+    sets.sort(key=len)
+    result = set(sets[0])
+    for other in sets[1:]:
+        result &= other
+        if not result:
+            break
+    return result
+
+
+def _intersect_rows(postings):
+    """Intersect sorted row arrays, rarest first, probing the others with ``searchsorted``."""
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        if not len(result):
+            break
+        at = np.minimum(np.searchsorted(other, result), len(other) - 1)
+        result = result[other[at] == result]
+    return result
+
+
+class _ValueIndex:
+    """Trigram index over the distinct values of one dictionary-encoded field."""
+
+    def __init__(self):
+        self.lowered = {}     # code -> lowercased value
+        self.grams = {}       # trigram -> {code}
+        self.rows = {}        # code -> {row}
+        self._arrays = {}     # code -> sorted rows, built on demand
+
+    def add_value(self, code, value):
+        if code in self.lowered:
+            return
+        lowered = value.lower()
+        self.lowered[code] = lowered
+        for gram in trigrams(lowered):
+            self.grams.setdefault(gram, set()).add(code)
+
+    def add_row(self, code, row):
+        self.rows.setdefault(code, set()).add(row)
+        self._arrays.pop(code, None)
+
+    def remove_row(self, code, row):
+        rows = self.rows.get(code)
+        if rows is not None:
+            rows.discard(row)
+            self._arrays.pop(code, None)
+
+    def row_array(self, code):
+        rows = self._arrays.get(code)
+        if rows is None:
+            posting = self.rows.get(code, ())
+            rows = self._arrays[code] = np.fromiter(posting, dtype=np.int64, count=len(posting))
+        return rows
+
+    def match(self, query):
+        if len(query) >= GRAM:
+            candidates = _intersect(self.grams, trigrams(query))
+        else:
+            candidates = self.lowered
+        return [code for code in candidates if query in self.lowered[code]]
+
+
+class SearchIndex:
+    """Substring and ID-prefix search over a :class:`ShipmentStore`."""
+
+    def __init__(self, store, fields=SEARCH_FIELDS):
+        self.store = store
+        self.fields = [f for f in fields if f != 'id']
+        self.version = 0
+        self._lock = threading.RLock()
+        self._ids = []            # row -> lowercased id
+        self._id_grams = {}       # trigram -> [row], ascending as rows are appended in order
+        self._gram_rows = {}      # trigram -> the same rows as an array, built on demand
+        self._sorted = None       # (ids as an array, their sort order, sorted ids), built on demand
+        self._values = {field: _ValueIndex() for field in self.fields}
+        self._cache = OrderedDict()
+        with store.lock:
+            self.on_append(store.rows())
+            store.subscribe(self)
+
+    def close(self):
+        """Stop following the store."""
+        self.store.unsubscribe(self)
+
+    # ---- store listener ----
+
+    def on_append(self, rows):
+        store = self.store
+        with self._lock:
+            for row in rows.tolist():
+                lowered = store.id_of(row).lower()
+                self._ids.append(lowered)
+                for gram in trigrams(lowered):
+                    self._id_grams.setdefault(gram, []).append(row)
+                for field in self.fields:
+                    code = int(store.codes[field][row])
+                    index = self._values[field]
+                    index.add_value(code, store.dictionaries[field].decode(code))
+                    index.add_row(code, row)
+            self._changed()
+
+    def on_update(self, row, changes):
+        indexed = [f for f in self.fields if f in changes]
+        if not indexed:
+            return
+        store = self.store
+        with self._lock:
+            for field in indexed:
+                old, new = (int(code) for code in changes[field])
+                index = self._values[field]
+                index.remove_row(old, row)
+                index.add_value(new, store.dictionaries[field].decode(new))
+                index.add_row(new, row)
+            self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._cache.clear()
+
+    def _id_arrays(self):
+        if self._sorted is None or len(self._sorted[0]) != len(self._ids):
+            ids = np.array(self._ids, dtype=str)
+            order = np.argsort(ids, kind='stable')
+            self._sorted = ids, order, ids[order]
+            self._gram_rows = {}
+        return self._sorted
+
+    def _gram_postings(self, grams):
+        """Row arrays of the ID trigrams ``grams``; ``None`` if one of them never occurs."""
+        self._id_arrays()
+        postings = []
+        for gram in grams:
+            rows = self._gram_rows.get(gram)
+            if rows is None:
+                posting = self._id_grams.get(gram)
+                if posting is None:
+                    return None
+                rows = self._gram_rows[gram] = np.array(posting, dtype=np.int64)
+            postings.append(rows)
+        return postings
+
+    # ---- queries ----
+
+    def prefix(self, text):
+        """Rows whose container ID starts with ``text`` (case-insensitive)."""
+        with self._lock:
+            return np.sort(self._prefix_rows(text.lower()))
+
+    def _prefix_rows(self, query):
+        _, order, ordered = self._id_arrays()
+        start = np.searchsorted(ordered, query, side='left')
+        stop = np.searchsorted(ordered, query + '\U0010ffff', side='left')
+        return order[start:stop]
+
+    def search(self, text):
+        """Sorted rows where any indexed field contains ``text``.
+
+        IDs match on substring for queries of three or more characters and on
+        prefix for shorter ones.
+        """
+        query = text.strip().lower()
+        if not query:
+            return self.store.rows()
+        with self._lock:
+            cached = self._cache.get(query)
+            if cached is not None:
+                self._cache.move_to_end(query)
+                return cached
+
+            hits = np.zeros(len(self._ids), dtype=bool)
+            hits[self._prefix_rows(query)] = True
+            if len(query) >= GRAM:
+                postings = self._gram_postings(trigrams(query))
+                candidates = _intersect_rows(postings) if postings else np.zeros(0, dtype=np.int64)
+                if len(query) > GRAM:
+                    # Prefix matches are already in; check the rest for the whole query
+                    candidates = candidates[~hits[candidates]]
+                    candidates = candidates[np.char.find(self._id_arrays()[0][candidates], query) >= 0]
+                hits[candidates] = True
+
+            for field in self.fields:
+                index = self._values[field]
+                for code in index.match(query):
+                    hits[index.row_array(code)] = True
+
+            result = np.flatnonzero(hits)
+            result.flags.writeable = False
+            self._cache[query] = result
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return result
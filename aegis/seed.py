@@ -0,0 +1,252 @@
+"""Seed data for the dashboard.
+
+ETAs are stored as day offsets and only turned into datetimes when the data
+is loaded, so importing this module does no per-shipment work. Custody times
+and audit dates are written as of ``SEED_DATE`` and shifted to the load date
+the same way.
+"""
+
+from datetime import datetime, timedelta
+
+# The day the literal custody times below were written against.
+SEED_DATE = datetime(2025, 1, 23)
+
+SHIPMENTS = [
+    {
+        'id': 'US-MIL-8842X',
+        'cargo': 'Guidance Chips (Class 3)',
+        'classification': 'ITAR',
+        'origin': 'Los Angeles, CA',
+        'destination': 'Yokosuka, Japan',
+        'status': 'In Transit',
+        'progress': 65,
+        'vessel': 'USNS Comfort',
+        'vessel_flag': 'US',
+        'eta_days': 5,
+        'weight': '2,400 kg',
+        'value_usd': 212_000_000,
+        'license': 'DSP-5 050-118842',
+        'sovereignty_score': 100,
+        'lat': 21.3069,
+        'lng': -157.8583,
+        'custody_chain': [
+            {'step': 'Pickup (Secure Facility)', 'status': 'complete', 'location': 'Raytheon Tucson, AZ', 'time': '2025-01-18 06:00'},
+            {'step': 'Customs Cleared (US)', 'status': 'complete', 'location': 'Port of Los Angeles', 'time': '2025-01-18 07:30'},
+            {'step': 'Loaded (US Flag Vessel)', 'status': 'complete', 'location': 'USNS Comfort', 'time': '2025-01-18 08:00'},
+            {'step': 'Transit (International Waters)', 'status': 'active', 'location': 'Pacific Ocean', 'time': '2025-01-23 16:45'},
+            {'step': 'Arrival (Allied Port)', 'status': 'pending', 'location': 'Yokosuka Naval Base', 'time': 'ETA 2025-01-28'},
+        ]
+    },
+    {
+        'id': 'US-MIL-7721A',
+        'cargo': 'Thermal Optics Array',
+        'classification': 'ITAR',
+        'origin': 'San Diego, CA',
+        'destination': 'Tokyo, Japan',
+        'status': 'In Transit',
+        'progress': 45,
+        'vessel': 'MV Alliance',
+        'vessel_flag': 'US',
+        'eta_days': 7,
+        'weight': '890 kg',
+        'value_usd': 96_500_000,
+        'license': 'DSP-5 050-117721',
+        'sovereignty_score': 100,
+        'lat': 25.7617,
+        'lng': -140.1918,
+        'custody_chain': [
+            {'step': 'Pickup (Secure Facility)', 'status': 'complete', 'location': 'L3Harris San Diego', 'time': '2025-01-20 10:00'},
+            {'step': 'Customs Cleared (US)', 'status': 'complete', 'location': 'Port of San Diego', 'time': '2025-01-20 11:30'},
+            {'step': 'Loaded (US Flag Vessel)', 'status': 'complete', 'location': 'MV Alliance', 'time': '2025-01-20 12:00'},
+            {'step': 'Transit (International Waters)', 'status': 'active', 'location': 'Pacific Ocean', 'time': '2025-01-23 14:20'},
+            {'step': 'Arrival (Allied Port)', 'status': 'pending', 'location': 'Port of Tokyo', 'time': 'ETA 2025-01-30'},
+        ]
+    },
+    {
+        'id': 'US-MIL-9034B',
+        'cargo': 'F-35 Spare Components',
+        'classification': 'ITAR/EAR99',
+        'origin': 'Fort Worth, TX',
+        'destination': 'Iwakuni, Japan',
+        'status': 'In Transit',
+        'progress': 82,
+        'vessel': 'USS Theodore Roosevelt',
+        'vessel_flag': 'US',
+        'eta_days': 2,
+        'weight': '5,200 kg',
+        'value_usd': 184_000_000,
+        'license': 'DSP-73 050-119034',
+        'sovereignty_score': 100,
+        'lat': 28.4177,
+        'lng': 145.7731,
+        'custody_chain': [
+            {'step': 'Pickup (Secure Facility)', 'status': 'complete', 'location': 'Lockheed Martin Fort Worth', 'time': '2025-01-15 12:00'},
+            {'step': 'Customs Cleared (US)', 'status': 'complete', 'location': 'DFW Air Cargo', 'time': '2025-01-15 13:30'},
+            {'step': 'Loaded (US Flag Vessel)', 'status': 'complete', 'location': 'USS Theodore Roosevelt', 'time': '2025-01-15 14:00'},
+            {'step': 'Transit (International Waters)', 'status': 'complete', 'location': 'Pacific Ocean', 'time': '2025-01-22 08:00'},
+            {'step': 'Arrival (Allied Port)', 'status': 'active', 'location': 'MCAS Iwakuni', 'time': 'ETA 2025-01-25'},
+        ]
+    },
+    {
+        'id': 'US-MIL-6655C',
+        'cargo': 'Encrypted Comm Modules',
+        'classification': 'ITAR',
+        'origin': 'Seattle, WA',
+        'destination': 'Seoul, South Korea',
+        'status': 'Loading',
+        'progress': 15,
+        'vessel': 'USNS Bob Hope',
+        'vessel_flag': 'US',
+        'eta_days': 13,
+        'weight': '340 kg',
+        'value_usd': 58_000_000,
+        'license': 'DSP-5 050-116655',
+        'sovereignty_score': 100,
+        'lat': 47.6062,
+        'lng': -122.3321,
+        'custody_chain': [
+            {'step': 'Pickup (Secure Facility)', 'status': 'complete', 'location': 'Boeing Seattle', 'time': '2025-01-23 08:00'},
+            {'step': 'Customs Cleared (US)', 'status': 'active', 'location': 'Port of Seattle', 'time': '2025-01-23 10:00'},
+            {'step': 'Loaded (US Flag Vessel)', 'status': 'pending', 'location': 'USNS Bob Hope', 'time': 'Pending'},
+            {'step': 'Transit (International Waters)', 'status': 'pending', 'location': 'TBD', 'time': 'Pending'},
+            {'step': 'Arrival (Allied Port)', 'status': 'pending', 'location': 'Busan Naval Base', 'time': 'ETA 2025-02-05'},
+        ]
+    },
+    {
+        'id': 'US-MIL-3398D',
+        'cargo': 'Radar Components (AN/APG-81)',
+        'classification': 'ITAR',
+        'origin': 'Baltimore, MD',
+        'destination': 'Ramstein, Germany',
+        'status': 'Delivered',
+        'progress': 100,
+        'vessel': 'MV Cape Race',
+        'vessel_flag': 'US',
+        'eta_days': -3,
+        'weight': '1,800 kg',
+        'value_usd': 143_000_000,
+        'license': 'DSP-5 050-113398',
+        'sovereignty_score': 100,
+        'lat': 49.4401,
+        'lng': 7.6009,
+        'custody_chain': [
+            {'step': 'Pickup (Secure Facility)', 'status': 'complete', 'location': 'Northrop Grumman Baltimore', 'time': '2025-01-10 04:00'},
+            {'step': 'Customs Cleared (US)', 'status': 'complete', 'location': 'Port of Baltimore', 'time': '2025-01-10 05:30'},
+            {'step': 'Loaded (US Flag Vessel)', 'status': 'complete', 'location': 'MV Cape Race', 'time': '2025-01-10 06:00'},
+            {'step': 'Transit (International Waters)', 'status': 'complete', 'location': 'Atlantic Ocean', 'time': '2025-01-18 12:00'},
+            {'step': 'Arrival (Allied Port)', 'status': 'complete', 'location': 'Ramstein Air Base', 'time': '2025-01-20 08:00'},
+        ]
+    },
+    {
+        'id': 'US-MIL-2287E',
+        'cargo': 'UAV Control Systems',
+        'classification': 'ITAR',
+        'origin': 'Phoenix, AZ',
+        'destination': 'Darwin, Australia',
+        'status': 'In Transit',
+        'progress': 55,
+        'vessel': 'USNS Watkins',
+        'vessel_flag': 'US',
+        'eta_days': 9,
+        'weight': '670 kg',
+        'value_usd': 153_500_000,
+        'license': 'DSP-5 050-112287',
+        'sovereignty_score': 100,
+        'lat': 13.4443,
+        'lng': 144.7937,
+        'custody_chain': [
+            {'step': 'Pickup (Secure Facility)', 'status': 'complete', 'location': 'General Atomics Phoenix', 'time': '2025-01-19 08:00'},
+            {'step': 'Customs Cleared (US)', 'status': 'complete', 'location': 'Port of Los Angeles', 'time': '2025-01-19 09:30'},
+            {'step': 'Loaded (US Flag Vessel)', 'status': 'complete', 'location': 'USNS Watkins', 'time': '2025-01-19 10:00'},
+            {'step': 'Transit (International Waters)', 'status': 'active', 'location': 'Western Pacific', 'time': '2025-01-23 12:30'},
+            {'step': 'Arrival (Allied Port)', 'status': 'pending', 'location': 'Port of Darwin', 'time': 'ETA 2025-02-01'},
+        ]
+    },
+]
+
+RESTRICTED_JURISDICTIONS = [
+    {'code': 'CN', 'name': 'China', 'category': 'Primary Adversary'},
+    {'code': 'RU', 'name': 'Russia', 'category': 'Primary Adversary'},
+    {'code': 'IR', 'name': 'Iran', 'category': 'ITAR 126.1'},
+    {'code': 'KP', 'name': 'North Korea', 'category': 'ITAR 126.1'},
+    {'code': 'SY', 'name': 'Syria', 'category': 'ITAR 126.1'},
+    {'code': 'CU', 'name': 'Cuba', 'category': 'ITAR 126.1'},
+    {'code': 'BY', 'name': 'Belarus', 'category': 'Sanctions'},
+    {'code': 'VE', 'name': 'Venezuela', 'category': 'Sanctions'},
+]
+
+ORIGINS = ['Los Angeles, CA', 'San Francisco, CA', 'Seattle, WA', 'San Diego, CA', 'Norfolk, VA', 'Charleston, SC']
+DESTINATIONS = [
+    {'name': 'Yokosuka, Japan', 'alliance': 'US-Japan Treaty'},
+    {'name': 'Tokyo, Japan', 'alliance': 'US-Japan Treaty'},
+    {'name': 'Busan, South Korea', 'alliance': 'US-ROK Alliance'},
+    {'name': 'Darwin, Australia', 'alliance': 'AUKUS'},
+    {'name': 'Ramstein, Germany', 'alliance': 'NATO'},
+    {'name': 'Rota, Spain', 'alliance': 'NATO'},
+]
+WAYPOINTS = ['Pearl Harbor, HI', 'Guam', 'Anchorage, AK', 'Diego Garcia']
+
+AUDITS = [
+    {'id': 'AUD-0123', 'type': 'ITAR Review', 'status': 'Passed', 'days_ago': 0, 'findings': 0},
+    {'id': 'AUD-0115', 'type': 'EAR Classification', 'status': 'Passed', 'days_ago': 8, 'findings': 0},
+    {'id': 'AUD-0108', 'type': 'Quarterly DDTC', 'status': 'Passed', 'days_ago': 15, 'findings': 0},
+    {'id': 'AUD-1219', 'type': 'ITAR Review', 'status': 'Passed', 'days_ago': 35, 'findings': 0},
+    {'id': 'AUD-1122', 'type': 'Vessel Flag Verification', 'status': 'Passed', 'days_ago': 62, 'findings': 0},
+    {'id': 'AUD-1030', 'type': 'Quarterly DDTC', 'status': 'Passed', 'days_ago': 85, 'findings': 0},
+    {'id': 'AUD-0924', 'type': 'EAR Classification', 'status': 'Passed', 'days_ago': 121, 'findings': 0},
+    {'id': 'AUD-0815', 'type': 'ITAR Review', 'status': 'Passed', 'days_ago': 161, 'findings': 0},
+    {'id': 'AUD-0711', 'type': 'Quarterly DDTC', 'status': 'Passed', 'days_ago': 196, 'findings': 0},
+    {'id': 'AUD-0603', 'type': 'Custody Chain Sampling', 'status': 'Passed', 'days_ago': 234, 'findings': 0},
+    {'id': 'AUD-0422', 'type': 'ITAR Review', 'status': 'Passed', 'days_ago': 276, 'findings': 0},
+    {'id': 'AUD-0304', 'type': 'Quarterly DDTC', 'status': 'Passed', 'days_ago': 325, 'findings': 0},
+]
+
+# The last compliance incident, in days before the load date.
+LAST_INCIDENT_DAYS_AGO = 847
+
+
+# Treaty framework per destination country, derived from the allied ports.
+ALLIANCES = {d['name'].split(', ')[-1]: d['alliance'] for d in DESTINATIONS}
+
+
+def alliance_for(destination):
+    return ALLIANCES.get(destination.split(', ')[-1], 'Unaligned')
+
+
+def _shift_time(text, days):
+    """Move a custody time (``'2025-01-18 06:00'``, ``'ETA 2025-01-28'``) by whole days."""
+    prefix = 'ETA ' if text.startswith('ETA ') else ''
+    value = text[len(prefix):]
+    fmt = '%Y-%m-%d %H:%M' if ' ' in value else '%Y-%m-%d'
+    try:
+        shifted = datetime.strptime(value, fmt) + timedelta(days=days)
+    except ValueError:
+        return text   # 'Pending'
+    return prefix + shifted.strftime(fmt)
+
+
+def shipment_records(now=None):
+    """Materialize ``SHIPMENTS`` with absolute ETAs and custody times relative to ``now``."""
+    now = now or datetime.now()
+    days = (now.date() - SEED_DATE.date()).days
+    records = []
+    for shipment in SHIPMENTS:
+        record = dict(shipment)
+        record['eta'] = now + timedelta(days=record.pop('eta_days'))
+        record['alliance'] = alliance_for(record['destination'])
+        record['custody_chain'] = [dict(step, time=_shift_time(step['time'], days))
+                                   for step in shipment['custody_chain']]
+        records.append(record)
+    return records
+
+
+def audit_records(now=None):
+    """Materialize ``AUDITS`` with dates relative to ``now``, newest first."""
+    now = now or datetime.now()
+    return [dict({k: v for k, v in audit.items() if k != 'days_ago'},
+                 date=(now - timedelta(days=audit['days_ago'])).date())
+            for audit in AUDITS]
+
+
+def last_incident(now=None):
+    return (now or datetime.now()).date() - timedelta(days=LAST_INCIDENT_DAYS_AGO)
@@ -0,0 +1,704 @@
+"""Columnar shipment store.
+
+Shipments are kept as typed NumPy columns instead of one dict per container.
+Repeated strings (cargo, ports, vessels, statuses) are dictionary-encoded into
+small integer codes, coordinates are float32 and the ETA is a datetime64
+column. Custody steps live in a separate append-only event log keyed by the
+shipment's row number and indexed by shipment, location and time, so nothing
+is nested per shipment.
+"""
+
+import itertools
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Dictionary-encoded string columns and the integer width of their codes.
+CATEGORY_COLUMNS = {
+    'cargo': np.int32,
+    'classification': np.int16,
+    'origin': np.int32,
+    'destination': np.int32,
+    'alliance': np.int16,
+    'status': np.int16,
+    'vessel': np.int32,
+    'vessel_flag': np.int16,
+    'license': np.int32,
+}
+
+NUMERIC_COLUMNS = {
+    'progress': np.uint8,
+    'lat': np.float32,
+    'lng': np.float32,
+    'eta': 'datetime64[s]',
+    'sovereignty_score': np.uint8,
+    'weight_kg': np.float32,
+    'value_usd': np.float64,
+}
+
+CUSTODY_CATEGORY_COLUMNS = {
+    'step': np.int16,
+    'status': np.int16,
+    'location': np.int32,
+}
+
+# Keys of a custody event in the legacy dict shape.
+_EVENT_FIELDS = (*CUSTODY_CATEGORY_COLUMNS, 'time')
+
+# Custody event times: an actual time, an expected one ("ETA ...") or none yet.
+TIME_ACTUAL, TIME_EXPECTED, TIME_PENDING = 0, 1, 2
+_NO_TIME = 2 ** 32 - 1
+
+# Values of numeric columns a new shipment does not specify.
+_NUMERIC_DEFAULTS = {
+    'progress': 0,
+    'lat': np.nan,
+    'lng': np.nan,
+    'eta': np.datetime64('NaT'),
+    'sovereignty_score': 100,
+    'weight_kg': np.nan,
+    'value_usd': 0.0,
+}
+
+WEIGHT_UNITS = {'kg': 1.0, 'kgs': 1.0, 't': 1000.0, 'lb': 0.45359237, 'lbs': 0.45359237}
+
+_INITIAL_CAPACITY = 64
+
+
+def parse_weight(value):
+    """Convert a manifest weight such as '2,400 kg' into kilograms; NaN for a unit not in ``WEIGHT_UNITS``."""
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    parts = str(value).replace(',', '').split()
+    unit = parts[1].lower() if len(parts) > 1 else 'kg'
+    return float(parts[0]) * WEIGHT_UNITS.get(unit, np.nan)
+
+
+def format_weight(kg):
+    if np.isnan(kg):
+        return ''
+    return f"{kg:,.0f} kg"
+
+
+class Dictionary:
+    """Append-only string dictionary used for dictionary-encoded columns."""
+
+    def __init__(self, values=()):
+        self.values = []
+        self._codes = {}
+        for value in values:
+            self.encode(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self._codes
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code(self, value):
+        """Return the code for ``value`` or -1 if it was never stored."""
+        return self._codes.get(value, -1)
+
+    def encode_many(self, values, dtype=np.int32):
+        """Codes for a sequence of values; large batches look up each distinct value once."""
+        if len(values) < 64:
+            return np.fromiter((self.encode(v) for v in values), dtype=dtype, count=len(values))
+        positions, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+        codes = np.fromiter((self.encode(v) for v in uniques), dtype=dtype, count=len(uniques))
+        return codes[positions]
+
+    def decode(self, code):
+        return self.values[code]
+
+    def nbytes(self):
+        return sum(len(v) for v in self.values) + 8 * len(self.values)
+
+
+def _grow(array, capacity):
+    grown = np.empty(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _parse_custody_time(value):
+    if isinstance(value, (datetime, np.datetime64)):
+        return np.datetime64(value, 's'), TIME_ACTUAL
+    text = str(value or '').strip()
+    kind = TIME_ACTUAL
+    if text[:3].upper() == 'ETA':
+        text, kind = text[3:].strip(), TIME_EXPECTED
+    try:
+        return np.datetime64(datetime.fromisoformat(text), 's'), kind
+    except ValueError:
+        stamp = pd.to_datetime(text, errors='coerce')
+        if pd.isna(stamp):
+            return np.datetime64('NaT', 's'), TIME_PENDING
+        return np.datetime64(stamp.to_datetime64(), 's'), kind
+
+
+def parse_custody_times(values):
+    """Parse custody display times into ``(datetime64[s] array, kind array)``.
+
+    Accepts ``'2025-01-18 06:00'`` (actual), ``'ETA 2025-01-28'`` (expected)
+    and ``'Pending'`` or anything unparseable (no time yet). Each distinct
+    value is parsed once, ISO times in one vectorized pass.
+    """
+    codes, uniques = pd.factorize(pd.Series(list(values), dtype=object), use_na_sentinel=False)
+    text = pd.Series(uniques, dtype=object).map(lambda v: v if isinstance(v, str) else '').str.strip()
+    expected = text.str[:3].str.upper().eq('ETA')
+    text = text.mask(expected, text.str[3:].str.strip())
+    stamps = pd.to_datetime(text, errors='coerce', format='ISO8601').to_numpy(dtype='datetime64[s]', copy=True)
+    kinds = np.where(expected, TIME_EXPECTED, TIME_ACTUAL).astype(np.uint8)
+    # Datetimes, and other layouts pandas can read, one at a time
+    for i in np.flatnonzero(np.isnat(stamps)):
+        stamps[i], kinds[i] = _parse_custody_time(uniques[i])
+    return stamps[codes], kinds[codes]
+
+
+def event_columns(events):
+    """Custody event dicts as the column lists ``CustodyLog.append_columns`` takes."""
+    columns = {name: [event.get(name, '') for event in events] for name in CUSTODY_CATEGORY_COLUMNS}
+    columns['time'] = [event.get('time') for event in events]
+    return columns
+
+
+def format_custody_time(stamp, kind):
+    if kind == TIME_PENDING:
+        return 'Pending'
+    stamp = pd.Timestamp(stamp)
+    if kind == TIME_EXPECTED:
+        return f"ETA {stamp:%Y-%m-%d}"
+    return f"{stamp:%Y-%m-%d %H:%M}"
+
+
+def _time_key(stamps):
+    """Seconds since the epoch as sortable uint32 keys; missing times sort last."""
+    seconds = stamps.astype('datetime64[s]').astype(np.int64)
+    return np.where(np.isnat(stamps), _NO_TIME, np.clip(seconds, 0, _NO_TIME - 1)).astype(np.int64)
+
+
+class _SortedIndex:
+    """Event numbers ordered by an int64 key, grown by merging sorted batches."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.events = np.empty(0, dtype=np.int64)
+
+    def merge(self, keys, events):
+        order = np.argsort(keys, kind='stable')
+        keys, events = keys[order], events[order]
+        at = np.searchsorted(self.keys, keys, side='right')
+        self.keys = np.insert(self.keys, at, keys)
+        self.events = np.insert(self.events, at, events)
+
+    def range(self, low, high):
+        """Events with ``low <= key < high``, in key order."""
+        return self.events[np.searchsorted(self.keys, low, 'left'):np.searchsorted(self.keys, high, 'left')]
+
+    def nbytes(self):
+        return self.keys.nbytes + self.events.nbytes
+
+
+class CustodyLog:
+    """Append-only, time-stamped custody events.
+
+    Events are never rewritten. A step that moves on (pending, active,
+    complete) is recorded as a new event, and a timeline shows each step's
+    latest event in the order the steps first appeared. Lookups by shipment,
+    by location and time, and by time alone go through sorted indexes, i.e.
+    binary searches. Recent appends sit in a short unindexed tail, scanned
+    with one vectorized comparison, until ``MERGE_EVERY`` of them have
+    accumulated and are merged into the indexes in one pass.
+    """
+
+    MERGE_EVERY = 4096
+
+    def __init__(self):
+        self._n = 0
+        self._indexed = 0
+        self.shipment = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self.time = np.empty(_INITIAL_CAPACITY, dtype='datetime64[s]')
+        self.kind = np.empty(_INITIAL_CAPACITY, dtype=np.uint8)
+        self.dictionaries = {name: Dictionary() for name in CUSTODY_CATEGORY_COLUMNS}
+        self.codes = {name: np.empty(_INITIAL_CAPACITY, dtype=dtype)
+                      for name, dtype in CUSTODY_CATEGORY_COLUMNS.items()}
+        self._by_shipment = _SortedIndex()
+        self._by_location = _SortedIndex()   # key: location code << 32 | time
+        self._by_time = _SortedIndex()
+
+    def __len__(self):
+        return self._n
+
+    def _reserve(self, extra):
+        needed = self._n + extra
+        capacity = len(self.shipment)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.shipment = _grow(self.shipment, capacity)
+        self.time = _grow(self.time, capacity)
+        self.kind = _grow(self.kind, capacity)
+        self.codes = {name: _grow(col, capacity) for name, col in self.codes.items()}
+
+    def append(self, shipments, events):
+        """Append events (dicts with step, status, location and time) for the given shipment rows."""
+        self.append_columns(shipments, event_columns(events))
+
+    def append_columns(self, shipments, columns):
+        """Append events given as ``step``, ``status``, ``location`` and ``time`` sequences."""
+        count = len(shipments)
+        if not count:
+            return
+        self._reserve(count)
+        start, end = self._n, self._n + count
+        self.shipment[start:end] = shipments
+        for name, dtype in CUSTODY_CATEGORY_COLUMNS.items():
+            self.codes[name][start:end] = self.dictionaries[name].encode_many(columns[name], dtype=dtype)
+        self.time[start:end], self.kind[start:end] = parse_custody_times(columns['time'])
+        self._n = end
+        if end - self._indexed >= self.MERGE_EVERY:
+            self._merge()
+
+    def _merge(self):
+        start, end = self._indexed, self._n
+        events = np.arange(start, end, dtype=np.int64)
+        times = _time_key(self.time[start:end])
+        self._by_shipment.merge(self.shipment[start:end].astype(np.int64), events)
+        self._by_location.merge((self.codes['location'][start:end].astype(np.int64) << 32) | times, events)
+        timed = times != _NO_TIME
+        self._by_time.merge(times[timed], events[timed])
+        self._indexed = end
+
+    def _tail(self, mask):
+        return np.flatnonzero(mask) + self._indexed
+
+    # ---- queries ----
+
+    def shipment_events(self, shipment_row):
+        """All events of one shipment, in append order."""
+        indexed = self._by_shipment.range(shipment_row, shipment_row + 1)
+        tail = self._tail(self.shipment[self._indexed:self._n] == shipment_row)
+        return np.concatenate([indexed, tail])
+
+    def actual_span(self, rows):
+        """First and last actual (not expected or pending) event time per distinct shipment row."""
+        rows = np.asarray(rows, dtype=np.int64)
+        first = np.full(len(rows), _NO_TIME, dtype=np.int64)
+        last = np.full(len(rows), -1, dtype=np.int64)
+        if len(rows) <= 64:
+            for i, row in enumerate(rows.tolist()):
+                events = self.shipment_events(row)
+                events = events[self.kind[events] == TIME_ACTUAL]
+                if len(events):
+                    times = _time_key(self.time[events])
+                    first[i], last[i] = times.min(), times.max()
+        else:
+            order = np.argsort(rows)
+            n = self._n
+            events = np.flatnonzero(np.isin(self.shipment[:n], rows) & (self.kind[:n] == TIME_ACTUAL))
+            at = order[np.searchsorted(rows, self.shipment[events], sorter=order)]
+            times = _time_key(self.time[events])
+            np.minimum.at(first, at, times)
+            np.maximum.at(last, at, times)
+        missing = last < 0
+        first = first.astype('datetime64[s]')
+        last = last.astype('datetime64[s]')
+        first[missing] = last[missing] = np.datetime64('NaT')
+        return first, last
+
+    def timeline(self, shipment_row):
+        """Current state of each custody step of one shipment, legacy dict shape."""
+        latest = {}
+        for event in self.shipment_events(shipment_row).tolist():
+            latest[self.codes['step'][event]] = event   # dicts keep first-insertion order
+        return [self.event(event) for event in latest.values()]
+
+    def timelines(self, shipment_rows):
+        """:meth:`timeline` for many shipments at once, as one list per row."""
+        rows = np.asarray(shipment_rows, dtype=np.int64)
+        n = self._n
+        events = np.flatnonzero(np.isin(self.shipment[:n], rows))
+        if not len(events):
+            return [[] for _ in rows.tolist()]
+        steps = pd.DataFrame({'shipment': self.shipment[events], 'step': self.codes['step'][events],
+                              'event': events})
+        # Each step's latest event, in the order the steps first appeared
+        latest = steps.groupby(['shipment', 'step'], sort=False)['event'].agg(['first', 'last'])
+        latest = latest.sort_values('first')
+        shipments = latest.index.get_level_values('shipment').to_numpy()
+        latest = latest['last'].to_numpy()
+
+        kind, stamps = self.kind[latest], self.time[latest]
+        times = np.where(kind == TIME_EXPECTED, np.char.add('ETA ', np.datetime_as_string(stamps, unit='D')),
+                         np.char.replace(np.datetime_as_string(stamps, unit='m'), 'T', ' '))
+        times = np.where(kind == TIME_PENDING, 'Pending', times).tolist()
+        columns = [np.array(self.dictionaries[name].values, dtype=object)[self.codes[name][latest]]
+                   for name in CUSTODY_CATEGORY_COLUMNS]
+        chains = {}
+        for shipment, *values in zip(shipments.tolist(), *columns, times):
+            chains.setdefault(shipment, []).append(dict(zip(_EVENT_FIELDS, values)))
+        return [chains.get(row, []) for row in rows.tolist()]
+
+    def at_location(self, location, start=None, end=None):
+        """Events at ``location`` with a time in ``[start, end)``, ordered by time."""
+        code = self.dictionaries['location'].code(location)
+        if code < 0:
+            return np.arange(0)
+        low, high = self._window(start, end)
+        indexed = self._by_location.range((code << 32) | low, (code << 32) | high)
+        tail = slice(self._indexed, self._n)
+        times = _time_key(self.time[tail])
+        tail = self._tail((self.codes['location'][tail] == code) & (times >= low) & (times < high))
+        return self._by_time_order(np.concatenate([indexed, tail]))
+
+    def between(self, start=None, end=None):
+        """Events with a time in ``[start, end)`` anywhere, ordered by time."""
+        low, high = self._window(start, end)
+        times = _time_key(self.time[self._indexed:self._n])
+        tail = self._tail((times >= low) & (times < high))
+        return self._by_time_order(np.concatenate([self._by_time.range(low, high), tail]))
+
+    def _window(self, start, end):
+        low = 0 if start is None else int(_time_key(np.array([start], dtype='datetime64[s]'))[0])
+        high = _NO_TIME if end is None else int(_time_key(np.array([end], dtype='datetime64[s]'))[0])
+        return low, high
+
+    def _by_time_order(self, events):
+        return events[np.argsort(self.time[events], kind='stable')]
+
+    def event(self, event):
+        record = {name: self.dictionaries[name].decode(self.codes[name][event])
+                  for name in CUSTODY_CATEGORY_COLUMNS}
+        record['time'] = format_custody_time(self.time[event], self.kind[event])
+        return record
+
+    def frame(self, events):
+        """Events as a DataFrame with the shipment row, categories and timestamp."""
+        data = {'shipment': self.shipment[events]}
+        for name in CUSTODY_CATEGORY_COLUMNS:
+            data[name] = pd.Categorical.from_codes(self.codes[name][events],
+                                                   categories=self.dictionaries[name].values)
+        data['time'] = self.time[events]
+        data['expected'] = self.kind[events] == TIME_EXPECTED
+        return pd.DataFrame(data)
+
+    def nbytes(self):
+        n = self._n
+        total = self.shipment[:n].nbytes + self.time[:n].nbytes + self.kind[:n].nbytes
+        total += sum(col[:n].nbytes for col in self.codes.values())
+        total += sum(index.nbytes() for index in (self._by_shipment, self._by_location, self._by_time))
+        return total + sum(d.nbytes() for d in self.dictionaries.values())
+
+
+_instances = itertools.count()
+
+
+class ShipmentStore:
+    """Typed, growable columns for every tracked shipment.
+
+    Rows are addressed by position; ``row_of`` maps container IDs to rows.
+    Column accessors return views of the live data, never per-row copies.
+    ``source`` names the data the store was loaded from and ``version`` is
+    bumped on every write, together they identify a snapshot for caching.
+    ``instance`` tells apart stores loaded from the same source, so workers
+    bound to one store are not handed its replacement. :meth:`columns_key`
+    is a narrower snapshot key that only changes with the named columns.
+    Writes hold ``lock``, so a background feed can update positions while
+    the app reads.
+    """
+
+    def __init__(self, source=''):
+        self._n = 0
+        self.source = source
+        self.instance = next(_instances)
+        self.version = 0
+        self._appends = 0
+        self._writes = {}   # column -> writes since load
+        self.ids = np.empty(_INITIAL_CAPACITY, dtype='S16')
+        self._row_by_id = {}
+        self.dictionaries = {name: Dictionary() for name in CATEGORY_COLUMNS}
+        self.codes = {name: np.empty(_INITIAL_CAPACITY, dtype=dtype)
+                      for name, dtype in CATEGORY_COLUMNS.items()}
+        self.numeric = {name: np.empty(_INITIAL_CAPACITY, dtype=dtype)
+                        for name, dtype in NUMERIC_COLUMNS.items()}
+        self.custody = CustodyLog()
+        self._listeners = []
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_records(cls, records, source=''):
+        store = cls(source)
+        store.append(records)
+        return store
+
+    def __len__(self):
+        return self._n
+
+    # ---- writes ----
+
+    def subscribe(self, listener):
+        """Register an object notified of writes.
+
+        Listeners may implement ``on_append(rows)``,
+        ``on_update(row, changes)``, where ``changes`` maps each column to its
+        ``(old, new)`` stored value (codes for category columns),
+        ``on_update_many(rows, names)`` for batched numeric writes and
+        ``on_custody(row)`` when a custody event is logged.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop notifying ``listener``."""
+        with self.lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, event, *args):
+        for listener in self._listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+
+    def _reserve(self, extra):
+        needed = self._n + extra
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.ids = _grow(self.ids, capacity)
+        self.codes = {name: _grow(col, capacity) for name, col in self.codes.items()}
+        self.numeric = {name: _grow(col, capacity) for name, col in self.numeric.items()}
+
+    def append(self, records):
+        """Append shipment dicts (the legacy mock-data shape) and return their rows."""
+        records = list(records)
+        columns = {'id': [r['id'] for r in records]}
+        for name in CATEGORY_COLUMNS:
+            columns[name] = [r.get(name, '') for r in records]
+        for name, default in _NUMERIC_DEFAULTS.items():
+            columns[name] = [r.get(name, default) for r in records]
+        columns['eta'] = [np.datetime64(r['eta'], 's') if r.get('eta') else np.datetime64('NaT')
+                          for r in records]
+        columns['weight_kg'] = [parse_weight(r.get('weight')) for r in records]
+
+        offsets, events = [], []
+        for offset, record in enumerate(records):
+            steps = record.get('custody_chain', ())
+            offsets.extend([offset] * len(steps))
+            events.extend(steps)
+        return self.append_columns(columns, offsets, event_columns(events))
+
+    def append_columns(self, columns, custody_offsets=(), custody=None):
+        """Append shipments given column by column and return their rows.
+
+        ``columns`` maps ``id`` and store column names to equal-length
+        sequences; absent columns are blank or take their defaults, and
+        ``weight_kg`` is in kilograms. Custody events come as ``custody``
+        columns (``step``, ``status``, ``location``, ``time``) with
+        ``custody_offsets`` giving each event's shipment within this batch.
+        """
+        with self.lock:
+            ids = [str(shipment_id) for shipment_id in columns['id']]
+            count = len(ids)
+            if not count:
+                return np.arange(0)
+            self._reserve(count)
+            start, end = self._n, self._n + count
+
+            encoded = np.array([i.encode() for i in ids])
+            if encoded.dtype.itemsize > self.ids.dtype.itemsize:
+                self.ids = self.ids.astype(encoded.dtype)
+            self.ids[start:end] = encoded
+
+            for name, dtype in CATEGORY_COLUMNS.items():
+                values = columns.get(name)
+                dictionary = self.dictionaries[name]
+                self.codes[name][start:end] = (dictionary.encode('') if values is None
+                                               else dictionary.encode_many(values, dtype=dtype))
+            for name, default in _NUMERIC_DEFAULTS.items():
+                values = columns.get(name)
+                self.numeric[name][start:end] = default if values is None else values
+
+            self._row_by_id.update(zip(ids, range(start, end)))
+            if custody is not None and len(custody_offsets):
+                self.custody.append_columns(np.asarray(custody_offsets, dtype=np.int32) + start, custody)
+
+            self._n = end
+            self.version += 1
+            self._appends += 1
+            rows = np.arange(start, end)
+            self._notify('on_append', rows)
+            return rows
+
+    def update(self, row, **fields):
+        """Overwrite individual fields of one shipment."""
+        with self.lock:
+            changes = {}
+            for name, value in fields.items():
+                if name in CATEGORY_COLUMNS:
+                    column, value = self.codes[name], self.dictionaries[name].encode(value)
+                elif name == 'eta':
+                    column, value = self.numeric['eta'], np.datetime64(value, 's')
+                elif name in NUMERIC_COLUMNS:
+                    column = self.numeric[name]
+                else:
+                    raise KeyError(f"Unknown shipment column: {name}")
+                changes[name] = (column[row], value)
+                column[row] = value
+                self._writes[name] = self._writes.get(name, 0) + 1
+            self.version += 1
+            self._notify('on_update', row, changes)
+
+    def update_many(self, rows, **columns):
+        """Overwrite numeric columns for many rows at once, e.g. a batch of positions.
+
+        ``columns`` maps numeric column names to arrays aligned with ``rows``.
+        Listeners get one ``on_update_many(rows, names)`` call per batch.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        for name in columns:
+            if name not in NUMERIC_COLUMNS or name == 'eta':
+                raise KeyError(f"Not a batch-updatable column: {name}")
+        with self.lock:
+            for name, values in columns.items():
+                self.numeric[name][rows] = values
+                self._writes[name] = self._writes.get(name, 0) + 1
+            self.version += 1
+            self._notify('on_update_many', rows, tuple(columns))
+
+    def log_custody(self, row, step, status, location, time=None):
+        """Append one custody event; the shipment's timeline shows it as the step's state."""
+        with self.lock:
+            self.custody.append(np.array([row], dtype=np.int32), [
+                {'step': step, 'status': status, 'location': location, 'time': time}])
+            self.version += 1
+            self._notify('on_custody', row)
+
+    # ---- reads ----
+
+    @property
+    def snapshot_key(self):
+        return (self.source, self.version)
+
+    def columns_key(self, names):
+        """A snapshot key that changes only when rows are added or one of ``names`` is written."""
+        return (self.source, self.instance, self._appends, tuple(self._writes.get(name, 0) for name in names))
+
+    def row_of(self, shipment_id, default=None):
+        return self._row_by_id.get(shipment_id, default)
+
+    def column(self, name):
+        """Return a view over a numeric or code column (no copy)."""
+        if name in self.numeric:
+            return self.numeric[name][:self._n]
+        if name in self.codes:
+            return self.codes[name][:self._n]
+        if name == 'id':
+            return self.ids[:self._n]
+        raise KeyError(f"Unknown shipment column: {name}")
+
+    def id_of(self, row):
+        return self.ids[row].decode()
+
+    def ids_of(self, rows):
+        return self.ids[rows].astype(str)
+
+    def value(self, name, row):
+        if name in self.codes:
+            return self.dictionaries[name].decode(self.codes[name][row])
+        if name == 'id':
+            return self.id_of(row)
+        return self.numeric[name][row]
+
+    def decode(self, name, rows):
+        """Decoded values of a category column for ``rows`` as an object array."""
+        values = np.array(self.dictionaries[name].values, dtype=object)
+        return values[self.codes[name][rows]]
+
+    def mask(self, name, value):
+        """Boolean mask of rows whose category column equals ``value``."""
+        return self.column(name) == self.dictionaries[name].code(value)
+
+    def rows(self, mask=None):
+        if mask is None:
+            return np.arange(self._n)
+        return np.flatnonzero(mask)
+
+    def record(self, row):
+        """Decode one shipment into the legacy dict shape for detail views."""
+        record = {'id': self.id_of(row)}
+        for name in CATEGORY_COLUMNS:
+            record[name] = self.dictionaries[name].decode(self.codes[name][row])
+        for name in NUMERIC_COLUMNS:
+            record[name] = self.numeric[name][row]
+        record['eta'] = pd.Timestamp(record['eta']).to_pydatetime()
+        record['weight'] = format_weight(record.pop('weight_kg'))
+        record['custody_chain'] = self.custody.timeline(row)
+        return record
+
+    def custody_at(self, location, start=None, end=None):
+        """Custody events at ``location`` within ``[start, end)``, with container IDs."""
+        events = self.custody.at_location(location, start, end)
+        df = self.custody.frame(events)
+        df.insert(0, 'id', self.ids_of(df.pop('shipment').to_numpy()))
+        return df
+
+    def frame(self, rows=None, columns=None):
+        """Build a DataFrame over ``rows``; category columns stay categorical."""
+        if rows is None:
+            rows = np.arange(self._n)
+        columns = columns or ['id', *CATEGORY_COLUMNS, *NUMERIC_COLUMNS]
+        data = {}
+        for name in columns:
+            if name == 'id':
+                data[name] = self.ids_of(rows)
+            elif name in self.codes:
+                data[name] = pd.Categorical.from_codes(
+                    self.codes[name][rows], categories=self.dictionaries[name].values)
+            else:
+                data[name] = self.numeric[name][rows]
+        return pd.DataFrame(data)
+
+    def nbytes(self):
+        """Approximate resident bytes held by the store, custody table included."""
+        n = self._n
+        total = self.ids[:n].nbytes
+        total += sum(col[:n].nbytes for col in self.codes.values())
+        total += sum(col[:n].nbytes for col in self.numeric.values())
+        total += sum(d.nbytes() for d in self.dictionaries.values())
+        total += 100 * len(self._row_by_id)  # dict entry + key object
+        return total + self.custody.nbytes()
+
+
+def sizeof_records(records):
+    """Deep size in bytes of a list of legacy shipment dicts, for comparison with ``nbytes``."""
+    import sys
+
+    seen = set()
+
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k) + size(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            total += sum(size(v) for v in obj)
+        return total
+
+    return size(records)
@@ -0,0 +1,152 @@
+"""Seeded synthetic fleets for load testing.
+
+Generates shipments in the ``seed.shipment_records`` shape, each with a
+five-step custody chain and a position consistent with its status, at any
+size. The same ``(count, seed, now)`` always produces the same fleet, so
+benchmark runs stay comparable between versions. Records are produced in
+chunks and loaded chunk by chunk, so peak memory follows the store rather
+than the intermediate dicts.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from aegis.routing import PORTS
+from aegis.seed import DESTINATIONS, ORIGINS, alliance_for
+from aegis.store import ShipmentStore
+
+CHUNK_SIZE = 50_000
+
+CARGO = [
+    ('Guidance Chips (Class 3)', 'ITAR'),
+    ('Thermal Optics Array', 'ITAR'),
+    ('F-35 Spare Components', 'ITAR/EAR99'),
+    ('Encrypted Comm Modules', 'ITAR'),
+    ('Radar Components (AN/APG-81)', 'ITAR'),
+    ('UAV Control Systems', 'ITAR'),
+    ('Night Vision Assemblies', 'ITAR'),
+    ('Satellite Transponders', 'EAR99'),
+    ('Armor Plating (Ceramic)', 'ITAR'),
+    ('Navigation Gyroscopes', 'EAR99'),
+    ('Sonar Arrays', 'ITAR'),
+    ('Ruggedized Servers', 'EAR99'),
+]
+VESSELS = ['USNS Comfort', 'MV Alliance', 'USS Theodore Roosevelt', 'USNS Bob Hope', 'MV Cape Race',
+           'USNS Watkins', 'MV Liberty Grace', 'USNS Mercy', 'MV Maersk Kensington', 'USNS Sisler']
+FACILITIES = ['Raytheon Tucson, AZ', 'L3Harris San Diego', 'Lockheed Martin Fort Worth', 'Boeing Seattle',
+              'Northrop Grumman Baltimore', 'General Atomics Phoenix']
+STATUSES = ['In Transit', 'Loading', 'Delivered']
+STATUS_WEIGHTS = [0.6, 0.15, 0.25]
+LICENSES = 500
+
+# Offsets of the first four custody steps from pickup, in minutes; arrival follows the transit time.
+_STEP_OFFSETS = np.array([0, 90, 120, 360])
+
+
+def _stamps(minutes):
+    """Format epoch minutes as custody times (``'2025-01-18 06:00'``)."""
+    return np.char.replace(np.datetime_as_string(minutes.astype('datetime64[m]'), unit='m'), 'T', ' ')
+
+
+def _custody_chain(status, vessel, origin, destination, facility, times):
+    """The five-step chain, complete up to where ``status`` has got to."""
+    steps = [
+        ('Pickup (Secure Facility)', facility),
+        ('Customs Cleared (US)', f"Port of {origin.split(', ')[0]}"),
+        ('Loaded (US Flag Vessel)', vessel),
+        ('Transit (International Waters)', 'International Waters'),
+        ('Arrival (Allied Port)', f"Port of {destination.split(', ')[0]}"),
+    ]
+    done = {'Loading': 1, 'In Transit': 3, 'Delivered': 5}[status]
+    chain = []
+    for i, (step, location) in enumerate(steps):
+        if i < done:
+            chain.append({'step': step, 'status': 'complete', 'location': location, 'time': times[i]})
+        elif i == done and i < 4:
+            chain.append({'step': step, 'status': 'active', 'location': location, 'time': times[i]})
+        else:
+            time = f"ETA {times[4][:10]}" if i == 4 else 'Pending'
+            chain.append({'step': step, 'status': 'pending', 'location': location, 'time': time})
+    return chain
+
+
+def shipment_chunks(count, seed=0, now=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of synthetic shipment records, ``count`` in total."""
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    rng = np.random.default_rng(seed)
+    destinations = [d['name'] for d in DESTINATIONS]
+    origin_xy = np.array([PORTS[o] for o in ORIGINS])
+    destination_xy = np.array([PORTS[d] for d in destinations])
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        status = rng.choice(len(STATUSES), n, p=STATUS_WEIGHTS)
+        origin = rng.integers(len(ORIGINS), size=n)
+        destination = rng.integers(len(destinations), size=n)
+        cargo = rng.integers(len(CARGO), size=n)
+        vessel = rng.integers(len(VESSELS), size=n)
+        facility = rng.integers(len(FACILITIES), size=n)
+        transit_days = rng.integers(8, 30, size=n)
+        # Days since pickup: loading ships just left, delivered ones are up to a year old.
+        age = np.select([status == 1, status == 0],
+                        [rng.uniform(0, 1, n), rng.uniform(1, transit_days)],
+                        rng.uniform(transit_days, 365))
+        progress = np.select([status == 1, status == 0],
+                             [0, np.clip(100 * age / transit_days, 1, 99)], 100).astype(int)
+        pickup = int(np.datetime64(now, 'm').astype(np.int64)) - (age * 1440).astype(np.int64)
+        arrival = pickup + transit_days * 1440
+        times = _stamps(np.column_stack([pickup[:, None] + _STEP_OFFSETS, arrival])).tolist()
+        etas = arrival.astype('datetime64[m]').astype('datetime64[s]').tolist()
+        weight = rng.integers(100, 20_000, size=n)
+        value = rng.lognormal(17.0, 1.0, size=n).round(-3)
+        license_number = rng.integers(LICENSES, size=n)
+        score = np.where(rng.random(n) < 0.97, 100, rng.integers(60, 96, size=n))
+
+        # Positions interpolate from origin to destination by progress, plus jitter.
+        a, b = origin_xy[origin], destination_xy[destination]
+        fraction = progress / 100.0
+        dlng = (b[:, 1] - a[:, 1] + 180.0) % 360.0 - 180.0
+        lat = a[:, 0] + fraction * (b[:, 0] - a[:, 0]) + np.where(status == 0, rng.normal(0, 1.0, n), 0)
+        lng = (a[:, 1] + fraction * dlng + np.where(status == 0, rng.normal(0, 1.0, n), 0)
+               + 180.0) % 360.0 - 180.0
+
+        records = []
+        for i in range(n):
+            origin_name, destination_name = ORIGINS[origin[i]], destinations[destination[i]]
+            vessel_name = VESSELS[vessel[i]]
+            state = STATUSES[status[i]]
+            records.append({
+                'id': f"SYN-{start + i:07d}",
+                'cargo': CARGO[cargo[i]][0],
+                'classification': CARGO[cargo[i]][1],
+                'origin': origin_name,
+                'destination': destination_name,
+                'status': state,
+                'progress': int(progress[i]),
+                'vessel': vessel_name,
+                'vessel_flag': 'US',
+                'eta': etas[i],
+                'weight': f"{int(weight[i]):,} kg",
+                'value_usd': float(value[i]),
+                'license': f"DSP-5 050-{license_number[i]:06d}",
+                'sovereignty_score': int(score[i]),
+                'lat': float(lat[i]),
+                'lng': float(lng[i]),
+                'alliance': alliance_for(destination_name),
+                'custody_chain': _custody_chain(state, vessel_name, origin_name, destination_name,
+                                                FACILITIES[facility[i]], times[i]),
+            })
+        yield records
+
+
+def shipment_records(count, seed=0, now=None):
+    """All ``count`` synthetic records as one list; prefer :func:`synthetic_store` for large fleets."""
+    return [record for chunk in shipment_chunks(count, seed, now) for record in chunk]
+
+
+def synthetic_store(count, seed=0, now=None, source=''):
+    """A :class:`ShipmentStore` holding ``count`` synthetic shipments, loaded chunk by chunk."""
+    store = ShipmentStore(source)
+    for chunk in shipment_chunks(count, seed, now):
+        store.append(chunk)
+    return store
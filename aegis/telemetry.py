@@ -0,0 +1,181 @@
+"""Per-rerun instrumentation.
+
+Page sections and data-access calls are wrapped in named spans. Each span
+records its wall time in a process-wide :class:`Telemetry` registry that all
+sessions share. The registry keeps the most recent samples per span, which
+gives p50/p95 latencies for the admin page, and running counts and totals
+for the Prometheus text export. Recording a span costs about a microsecond.
+
+A full profile of one rerun is available on demand. Set ``AEGIS_PROFILE`` or
+add ``?profile=1`` (or ``?profile=pyinstrument``) to the URL. cProfile is
+used unless pyinstrument is requested and installed.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Samples kept per span for percentiles.
+WINDOW = 1024
+# Default profiler for every rerun: "", "cprofile" or "pyinstrument".
+PROFILE = os.environ.get('AEGIS_PROFILE', '')
+# Where the admin page writes the Prometheus text export.
+METRICS_PATH = os.environ.get('AEGIS_METRICS_FILE', 'aegis_metrics.prom')
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+class Telemetry:
+    """Recent samples, counts and totals per span name, safe to share across sessions."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._samples = {}
+        self._count = {}
+        self._total = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._count[name] = 0
+                self._total[name] = 0.0
+            samples.append(seconds)
+            self._count[name] += 1
+            self._total[name] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._count.clear()
+            self._total.clear()
+
+    def summary(self):
+        """One row per span: call count, total seconds and recent p50/p95/max in milliseconds."""
+        with self._lock:
+            rows = [(name, self._count[name], self._total[name], np.array(samples))
+                    for name, samples in self._samples.items()]
+        frame = pd.DataFrame([{
+            'span': name,
+            'count': count,
+            'total_s': total,
+            'p50_ms': np.percentile(samples, 50) * 1e3,
+            'p95_ms': np.percentile(samples, 95) * 1e3,
+            'max_ms': samples.max() * 1e3,
+        } for name, count, total, samples in rows],
+            columns=['span', 'count', 'total_s', 'p50_ms', 'p95_ms', 'max_ms'])
+        return frame.sort_values('p95_ms', ascending=False, ignore_index=True)
+
+    def prometheus(self):
+        """The spans as a Prometheus summary, in the text exposition format."""
+        lines = ['# HELP aegis_span_seconds Wall time of instrumented page sections and data calls.',
+                 '# TYPE aegis_span_seconds summary']
+        for row in self.summary().itertuples(index=False):
+            label = row.span.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'aegis_span_seconds{{span="{label}",quantile="0.5"}} {row.p50_ms / 1e3:.6g}')
+            lines.append(f'aegis_span_seconds{{span="{label}",quantile="0.95"}} {row.p95_ms / 1e3:.6g}')
+            lines.append(f'aegis_span_seconds_sum{{span="{label}"}} {row.total_s:.6g}')
+            lines.append(f'aegis_span_seconds_count{{span="{label}"}} {row.count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path=METRICS_PATH):
+        """Write :meth:`prometheus` to ``path`` atomically, e.g. for a textfile collector."""
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            handle.write(self.prometheus())
+        os.replace(temporary, path)
+        return path
+
+
+TELEMETRY = Telemetry()
+
+
+class Span:
+    """Times a block under ``name``; use as a context manager, or call :meth:`stop`."""
+
+    __slots__ = ('name', 'telemetry', 'started')
+
+    def __init__(self, name, telemetry=TELEMETRY):
+        self.name = name
+        self.telemetry = telemetry
+        self.started = time.perf_counter()
+
+    def stop(self, name=None):
+        """Record the time since the span started, under ``name`` if given."""
+        elapsed = time.perf_counter() - self.started
+        self.telemetry.record(name or self.name, elapsed)
+        return elapsed
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def span(name):
+    return Span(name)
+
+
+def timed(name):
+    """Decorator recording every call of a function as span ``name``."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ============ PROFILING ============
+
+def requested_profiler(query_params):
+    """The profiler asked for by ``?profile=...`` or ``AEGIS_PROFILE``, or ``None``."""
+    value = str(query_params.get('profile', PROFILE)).strip().lower()
+    if value in ('', '0', 'off', 'false'):
+        return None
+    return value if value in PROFILERS else 'cprofile'
+
+
+class RerunProfile:
+    """Profiles the rest of a rerun; :meth:`stop` returns the report as text."""
+
+    def __init__(self, kind='cprofile'):
+        self.kind = kind
+        self._profiler = None
+        if kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                self.kind = 'cprofile'
+            else:
+                self._profiler = Profiler()
+                self._profiler.start()
+        if self.kind == 'cprofile':
+            try:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            except ValueError:   # another session's profile is running
+                self._profiler = None
+
+    def stop(self, limit=40):
+        if self._profiler is None:
+            return "Another rerun is being profiled; try again."
+        if self.kind == 'pyinstrument':
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True)
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
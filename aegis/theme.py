@@ -0,0 +1,148 @@
+"""Custom CSS for the dark military industrial theme, injected on every page."""
+
+THEME_CSS = """
+<style>
+    /* Main background */
+    .stApp {
+        background-color: #0a0f1a;
+    }
+
+    /* Sidebar */
+    [data-testid="stSidebar"] {
+        background-color: #0f172a;
+        border-right: 1px solid #1e293b;
+    }
+
+    /* Headers */
+    h1, h2, h3 {
+        color: #f1f5f9 !important;
+        font-family: 'Inter', sans-serif;
+    }
+
+    /* Metric cards */
+    [data-testid="stMetricValue"] {
+        color: #10b981 !important;
+        font-family: 'JetBrains Mono', monospace;
+    }
+
+    [data-testid="stMetricLabel"] {
+        color: #94a3b8 !important;
+    }
+
+    /* Text */
+    p, span, label {
+        color: #cbd5e1;
+    }
+
+    /* Selectbox and inputs */
+    .stSelectbox > div > div {
+        background-color: #1e293b;
+        border-color: #334155;
+        color: #f1f5f9;
+    }
+
+    /* Tables */
+    .stDataFrame {
+        background-color: #0f172a;
+    }
+
+    /* Custom classes */
+    .status-safe {
+        background-color: rgba(16, 185, 129, 0.1);
+        color: #34d399;
+        padding: 4px 12px;
+        border-radius: 4px;
+        border: 1px solid rgba(16, 185, 129, 0.2);
+        font-size: 12px;
+    }
+
+    .status-warning {
+        background-color: rgba(245, 158, 11, 0.1);
+        color: #fbbf24;
+        padding: 4px 12px;
+        border-radius: 4px;
+        border: 1px solid rgba(245, 158, 11, 0.2);
+        font-size: 12px;
+    }
+
+    .status-danger {
+        background-color: rgba(244, 63, 94, 0.1);
+        color: #f43f5e;
+        padding: 4px 12px;
+        border-radius: 4px;
+        border: 1px solid rgba(244, 63, 94, 0.2);
+        font-size: 12px;
+    }
+
+    .sovereignty-badge {
+        background-color: rgba(16, 185, 129, 0.1);
+        border: 1px solid rgba(16, 185, 129, 0.3);
+        border-radius: 8px;
+        padding: 16px;
+        text-align: center;
+    }
+
+    .sovereignty-score {
+        font-size: 48px;
+        font-weight: bold;
+        color: #10b981;
+        font-family: 'JetBrains Mono', monospace;
+        text-shadow: 0 0 20px rgba(16, 185, 129, 0.5);
+    }
+
+    .card {
+        background-color: rgba(15, 23, 42, 0.8);
+        border: 1px solid #1e293b;
+        border-radius: 8px;
+        padding: 16px;
+        margin-bottom: 16px;
+    }
+
+    .mono {
+        font-family: 'JetBrains Mono', monospace;
+        color: #10b981;
+    }
+
+    .timeline-step {
+        padding: 12px;
+        border-left: 2px solid #334155;
+        margin-left: 12px;
+    }
+
+    .timeline-step-complete {
+        border-left-color: #10b981;
+    }
+
+    .timeline-step-active {
+        border-left-color: #f59e0b;
+    }
+
+    .restricted-zone {
+        background-color: rgba(244, 63, 94, 0.1);
+        border: 1px solid rgba(244, 63, 94, 0.2);
+        padding: 4px 8px;
+        border-radius: 4px;
+        margin: 2px;
+        display: inline-block;
+        font-family: monospace;
+        font-size: 11px;
+        color: #f43f5e;
+    }
+
+    /* Hide Streamlit branding */
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+
+    .classification-banner {
+        background-color: rgba(245, 158, 11, 0.1);
+        border: 1px solid rgba(245, 158, 11, 0.3);
+        padding: 4px 12px;
+        border-radius: 4px;
+        text-align: center;
+        font-size: 10px;
+        letter-spacing: 2px;
+        color: #f59e0b;
+        margin-bottom: 20px;
+    }
+</style>
+"""
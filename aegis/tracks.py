@@ -0,0 +1,383 @@
+"""Historical position tracks.
+
+Positions written to the store are appended to an archive on disk, one
+partition per day. A partition is a directory with one raw file per column:
+``time`` (uint32 seconds into the day), ``ship`` (uint32 code into the
+day's ``ids.txt``), ``lat`` and ``lng`` (float32). That is 16 bytes a
+report. A ship is archived at most once per ``interval`` seconds, and
+appends are buffered and written in one call per column. Reads
+memory-map only the days that overlap the requested window. Within a day,
+reports are in time order, so a window is a binary search, not a scan.
+
+Tracks are drawn simplified. One Douglas-Peucker pass over a window ranks
+every point by the tolerance below which it is kept. The polyline for
+any zoom level's tolerance is then a threshold on that rank, and every
+ship in the window is simplified at once.
+"""
+
+import functools
+import os
+from collections import OrderedDict
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from aegis.clustering import cell_degrees
+
+# Seconds between archived reports of one ship; reports in between only update the store.
+TRACK_INTERVAL_SECONDS = 60
+# Buffered reports are written once this many are pending or this many seconds have passed.
+FLUSH_POINTS = 65_536
+FLUSH_SECONDS = 5.0
+# Track tolerance per zoom level, as a fraction of that level's cluster cell.
+TOLERANCE_PER_CELL = 0.01
+# Day partitions kept open, most recently used first; each maps ship codes
+# for the whole fleet, so older days are reopened from disk when needed.
+OPEN_PARTITIONS = 4
+COLUMNS = {'time': np.uint32, 'ship': np.uint32, 'lat': np.float32, 'lng': np.float32}
+DAY_SECONDS = 86_400
+
+
+def tolerance(zoom):
+    """Douglas-Peucker tolerance in degrees for drawing tracks at a God View zoom level."""
+    return cell_degrees(zoom) * TOLERANCE_PER_CELL
+
+
+def _epoch(moment):
+    return int(np.datetime64(moment, 's').astype(np.int64))
+
+
+@dataclass
+class TrackPoints:
+    """Archived reports as parallel arrays, ordered by store row and then time."""
+    row: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    time: np.ndarray = field(default_factory=lambda: np.empty(0, dtype='datetime64[s]'))
+    lat: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    lng: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.row)
+
+    def take(self, index):
+        return TrackPoints(self.row[index], self.time[index], self.lat[index], self.lng[index])
+
+    def starts(self):
+        """Index of each ship's first point."""
+        return np.flatnonzero(np.diff(self.row, prepend=-1))
+
+
+# ============ SIMPLIFICATION ============
+
+def _unwrap(lng, starts):
+    """Longitudes made continuous across the antimeridian within each track."""
+    step = np.diff(lng.astype(np.float64), prepend=np.nan)
+    step = (step + 180.0) % 360.0 - 180.0
+    step[starts] = lng[starts]
+    total = np.cumsum(step)
+    return total - np.repeat(total[starts] - step[starts], np.diff(np.append(starts, len(lng))))
+
+
+def simplify_ranks(lat, lng, starts):
+    """Douglas-Peucker rank of every point of consecutive tracks beginning at ``starts``.
+
+    A point is kept at tolerance ``t`` (degrees) if its rank is at least
+    ``t``; track ends rank ``inf``. All tracks are split together, one
+    recursion level per pass.
+    """
+    n = len(lat)
+    ranks = np.zeros(n)
+    if not n:
+        return ranks
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.append(starts[1:], n) - 1
+    x, y = _unwrap(lng, starts), lat.astype(np.float64)
+    ranks[starts] = ranks[ends] = np.inf
+    a, b, cap = starts, ends, np.full(len(starts), np.inf)
+    while True:
+        keep = b - a >= 2
+        a, b, cap = a[keep], b[keep], cap[keep]
+        if not len(a):
+            return ranks
+        inner = b - a - 1
+        segment = np.repeat(np.arange(len(a)), inner)
+        first = np.cumsum(inner) - inner
+        index = np.arange(len(segment)) - first[segment] + a[segment] + 1
+        ax, ay = x[a][segment], y[a][segment]
+        dx, dy = x[b][segment] - ax, y[b][segment] - ay
+        px, py = x[index] - ax, y[index] - ay
+        # Distance to the segment, not its line, so a ship doubling back is kept
+        with np.errstate(divide='ignore', invalid='ignore'):
+            along = np.clip(np.nan_to_num((px * dx + py * dy) / (dx * dx + dy * dy)), 0.0, 1.0)
+        distance = np.hypot(px - along * dx, py - along * dy)
+        farthest = np.maximum.reduceat(distance, first)
+        hits = np.flatnonzero(distance == farthest[segment])
+        _, pick = np.unique(segment[hits], return_index=True)
+        split = index[hits[pick]]
+        rank = np.minimum(farthest, cap)   # a point never outranks the split that exposed it
+        ranks[split] = rank
+        a, b, cap = np.concatenate([a, split]), np.concatenate([split, b]), np.concatenate([rank, rank])
+
+
+# ============ PARTITIONS ============
+
+def _complete_reports(directory):
+    """Reports fully written to a day directory: the shortest column's length."""
+    sizes = [os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+             for path, dtype in ((os.path.join(directory, f'{name}.bin'), dtype) for name, dtype in COLUMNS.items())]
+    return min(sizes)
+
+
+def _day_bounds(directory, start):
+    """Epoch seconds of a day's first and last report, ``None`` if it has none.
+
+    Only the two ends of the time column are read; the day is not opened.
+    """
+    size = _complete_reports(directory)
+    if not size:
+        return None
+    times = np.memmap(os.path.join(directory, 'time.bin'), dtype=np.uint32, mode='r', shape=(size,))
+    return start + int(times[0]), start + int(times[-1])
+
+
+class _Partition:
+    """One day of reports: appended column files, memory-mapped for reads."""
+
+    def __init__(self, directory, day, store):
+        self.directory = directory
+        self.start = int(day.astype('datetime64[s]').astype(np.int64))
+        self.store = store
+        os.makedirs(directory, exist_ok=True)
+        ids_path = os.path.join(directory, 'ids.txt')
+        ids = []
+        if os.path.exists(ids_path):
+            with open(ids_path, encoding='utf-8') as handle:
+                ids = handle.read().split()
+        # Ship codes of this day mapped to and from rows of the live store (-1 where absent)
+        self.code_rows = np.array([store.row_of(i, -1) for i in ids], dtype=np.int64)
+        self.row_codes = np.full(len(store), -1, dtype=np.int64)
+        known = self.code_rows >= 0
+        self.row_codes[self.code_rows[known]] = np.flatnonzero(known)
+        self._maps = {}
+        self._size = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def _codes(self, rows):
+        if len(self.row_codes) < len(self.store):
+            grown = np.full(len(self.store), -1, dtype=np.int64)
+            grown[:len(self.row_codes)] = self.row_codes
+            self.row_codes = grown
+        new = np.unique(rows[self.row_codes[rows] < 0])
+        if len(new):
+            # Ids first, so a reader never meets a code without its ship
+            with open(os.path.join(self.directory, 'ids.txt'), 'a', encoding='utf-8') as handle:
+                handle.write(''.join(f'{i}\n' for i in self.store.ids_of(new)))
+            self.row_codes[new] = np.arange(len(self.code_rows), len(self.code_rows) + len(new))
+            self.code_rows = np.concatenate([self.code_rows, new])
+        return self.row_codes[rows]
+
+    def append(self, rows, seconds, lat, lng):
+        values = {'time': seconds - self.start, 'ship': self._codes(rows), 'lat': lat, 'lng': lng}
+        for name, dtype in COLUMNS.items():
+            with open(self._path(name), 'ab') as handle:
+                handle.write(np.ascontiguousarray(values[name], dtype=dtype).tobytes())
+
+    def columns(self):
+        """Memory maps of the complete reports written so far."""
+        size = _complete_reports(self.directory)
+        if size != self._size or not self._maps:
+            self._maps = {name: np.memmap(self._path(name), dtype=dtype, mode='r', shape=(size,)) if size
+                          else np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+            self._size = size
+        return self._maps
+
+    def select(self, start, end, rows=None, latest=False):
+        """Reports in ``[start, end)`` epoch seconds, of store ``rows`` only if given.
+
+        With ``latest``, only each ship's last report in the window.
+        """
+        columns = self.columns()
+        low, high = np.searchsorted(columns['time'], [max(start - self.start, 0), max(end - self.start, 0)])
+        ships = columns['ship'][low:high]
+        wanted = self.code_rows >= 0
+        if rows is not None:
+            codes = self.row_codes[rows[rows < len(self.row_codes)]]
+            wanted = np.zeros(len(self.code_rows), dtype=bool)
+            wanted[codes[codes >= 0]] = True
+        if latest:
+            last = np.full(len(self.code_rows), -1, dtype=np.int64)
+            np.maximum.at(last, ships, np.arange(len(ships)))
+            index = np.sort(last[wanted & (last >= 0)]) + low
+        else:
+            index = np.flatnonzero(wanted[ships]) + low
+        return TrackPoints(self.code_rows[columns['ship'][index]],
+                           (columns['time'][index].astype(np.int64) + self.start).astype('datetime64[s]'),
+                           np.asarray(columns['lat'][index]), np.asarray(columns['lng'][index]))
+
+
+# ============ ARCHIVE ============
+
+class TrackArchive:
+    """Day-partitioned report history for the ships of a store, fed by its position writes."""
+
+    def __init__(self, store, directory, interval=TRACK_INTERVAL_SECONDS):
+        self.store = store
+        self.directory = directory
+        self.interval = interval
+        self.version = 0
+        self.points_written = 0
+        self.last_flush_ms = 0.0
+        self._partitions = OrderedDict()
+        self._bounds = {}   # first and last report of past days, which no longer change
+        self._last = np.zeros(0, dtype=np.int64)
+        self._newest = 0
+        self._buffer = []
+        self._buffered = 0
+        self._flushed = time.monotonic()
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        with store.lock:
+            store.subscribe(self)
+
+    def close(self):
+        """Write what is buffered and stop following the store."""
+        self.store.unsubscribe(self)
+        self.flush()
+
+    # ---- store notifications ----
+
+    def on_update(self, row, changes):
+        if 'lat' in changes or 'lng' in changes:
+            self.record([row])
+
+    def on_update_many(self, rows, names):
+        if 'lat' in names or 'lng' in names:
+            self.record(rows)
+
+    # ---- writes ----
+
+    def record(self, rows, when=None):
+        """Archive the current position of ``rows`` not archived in the last ``interval`` seconds."""
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            # Reports within a day stay in time order even if the clock steps back
+            now = self._newest = max(_epoch(when or datetime.now()), self._newest)
+            if len(self._last) < len(self.store):
+                self._last = np.concatenate([self._last, np.full(len(self.store) - len(self._last), -self.interval - 1)])
+            due = rows[now - self._last[rows] >= self.interval]
+            if len(due):
+                self._last[due] = now
+                lat, lng = self.store.column('lat')[due].copy(), self.store.column('lng')[due].copy()
+                placed = ~np.isnan(lat) & ~np.isnan(lng)
+                self._buffer.append((due[placed], now, lat[placed], lng[placed]))
+                self._buffered += int(placed.sum())
+            if self._buffered >= FLUSH_POINTS or time.monotonic() - self._flushed >= FLUSH_SECONDS:
+                self.flush()
+
+    def flush(self):
+        """Append buffered reports to their day partitions."""
+        with self._lock:
+            buffer, self._buffer, self._buffered = self._buffer, [], 0
+            self._flushed = time.monotonic()
+            if not buffer:
+                return
+            started = time.perf_counter()
+            rows = np.concatenate([entry[0] for entry in buffer])
+            seconds = np.concatenate([np.full(len(entry[0]), entry[1], dtype=np.int64) for entry in buffer])
+            lat = np.concatenate([entry[2] for entry in buffer])
+            lng = np.concatenate([entry[3] for entry in buffer])
+            days = seconds // DAY_SECONDS
+            for day in np.unique(days).tolist():
+                part = days == day
+                self._partition(day).append(rows[part], seconds[part], lat[part], lng[part])
+            self.points_written += len(rows)
+            self.version += 1
+            self.last_flush_ms = (time.perf_counter() - started) * 1e3
+
+    def _partition(self, day):
+        partition = self._partitions.get(day)
+        if partition is None:
+            stamp = np.datetime64(day, 'D')
+            partition = self._partitions[day] = _Partition(self._day_directory(day), stamp, self.store)
+            while len(self._partitions) > OPEN_PARTITIONS:
+                self._partitions.popitem(last=False)
+        self._partitions.move_to_end(day)
+        return partition
+
+    def _day_directory(self, day):
+        return os.path.join(self.directory, str(np.datetime64(day, 'D')))
+
+    def days(self):
+        """Day numbers (days since the epoch) with archived reports, oldest first."""
+        days = set(self._partitions)
+        for name in os.listdir(self.directory):
+            try:
+                days.add(int(np.datetime64(name, 'D').astype(np.int64)))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    def span(self):
+        """``(start, end)`` of the archive as datetimes on whole hours; ``None`` when empty."""
+        with self._lock:
+            self.flush()
+            today = _epoch(datetime.now()) // DAY_SECONDS
+            bounds = []
+            for day in self.days():
+                if day in self._bounds:
+                    bounds.append(self._bounds[day])
+                    continue
+                found = _day_bounds(self._day_directory(day), day * DAY_SECONDS)
+                if found is not None:
+                    bounds.append(found)
+                    if day < today:
+                        self._bounds[day] = found
+        if not bounds:
+            return None
+        start = np.datetime64(bounds[0][0], 's').astype('datetime64[h]')
+        end = np.datetime64(bounds[-1][1], 's').astype('datetime64[h]') + 1
+        return start.astype(datetime), end.astype(datetime)
+
+    def _select(self, start, end, rows=None, latest=False):
+        with self._lock:
+            self.flush()
+            low, high = _epoch(start), _epoch(end)
+            parts = [self._partition(day).select(low, high, rows, latest)
+                     for day in self.days() if day * DAY_SECONDS < high and (day + 1) * DAY_SECONDS > low]
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return TrackPoints()
+        return TrackPoints(*(np.concatenate(columns) for columns in zip(
+            *((part.row, part.time, part.lat, part.lng) for part in parts))))
+
+    def points(self, start, end, rows=None):
+        """Reports in ``[start, end)`` (of store ``rows`` only if given), reading only the days in range."""
+        points = self._select(start, end, rows)
+        return points.take(np.argsort(points.row, kind='stable'))   # days are in order, so each ship's stays so
+
+    def positions_at(self, moment, lookback=timedelta(days=1)):
+        """Each ship's last archived position at ``moment``, among those reported within ``lookback``."""
+        moment = np.datetime64(moment, 's')
+        points = self._select(moment - np.timedelta64(lookback), moment + np.timedelta64(1, 's'), latest=True)
+        last = np.full(len(self.store), -1, dtype=np.int64)
+        np.maximum.at(last, points.row, np.arange(len(points)))   # a later day's report wins
+        return points.take(last[last >= 0])
+
+    def tracks(self, rows, start, end, tolerance_degrees):
+        """Tracks of store ``rows`` over ``[start, end)``, simplified to ``tolerance_degrees``."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return _simplified(self, rows.tobytes(), _epoch(start), _epoch(end), tolerance_degrees, self.version)
+
+
+@functools.lru_cache(maxsize=32)
+def _simplified(archive, rows, start, end, tolerance_degrees, version):
+    """Memoized per archive version, so reruns between flushes reuse the simplification."""
+    points = archive.points(start, end, np.frombuffer(rows, dtype=np.int64))
+    if not len(points):
+        return points
+    ranks = simplify_ranks(points.lat, points.lng, points.starts())
+    return points.take(ranks >= tolerance_degrees)
@@ -0,0 +1,282 @@
+"""Page render latency at synthetic fleet sizes.
+
+Drives each page of ``app.py`` headlessly through Streamlit's ``AppTest``
+against seeded synthetic fleets (see :mod:`aegis.synthetic`) and records,
+per page:
+
+* ``script_ms``: wall time of a full script run (median, min and max over
+  ``--repeat`` runs, after one warm-up run; scripts are compiled once, as
+  on a live server),
+* ``figure_ms``: the part of the median run spent building Plotly figures
+  and handing them to ``st.plotly_chart``,
+* ``peak_memory_mb``: peak Python and NumPy allocation during one run, from
+  ``tracemalloc`` (measured in a separate run so tracing does not skew the
+  timings),
+* ``payload_bytes``: serialized size of the elements the run sent to the
+  browser.
+
+Each fleet size runs in its own process, so the store load time and the
+process's peak RSS are recorded per size too. Results are written as JSON.
+Pass ``--compare`` with an earlier result file to print the ratios against it.
+
+    python benchmarks/page_latency.py --sizes 1000,10000 --output bench.json
+    python benchmarks/page_latency.py --sizes 1000,10000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_REPEAT = 5
+# How much slower than the baseline a page may get before --compare flags it.
+REGRESSION_RATIO = 1.2
+
+
+PAGE_FILES = {
+    "Dashboard": "views/dashboard.py",
+    "Active Shipments": "views/shipments.py",
+    "Route Planner": "views/route_planner.py",
+    "Compliance & Risk": "views/compliance.py",
+}
+
+
+def _navigate(at, page):
+    at.switch_page(PAGE_FILES[page])
+
+
+def _visit(at, page):
+    """Make ``page`` current with an untimed run, so its widgets can be set."""
+    _navigate(at, page)
+    at.run()
+
+
+def _search(at):
+    _visit(at, "Active Shipments")
+    at.text_input[0].set_value("Tokyo")
+
+
+def _plan_route(at):
+    _visit(at, "Route Planner")
+    options = {box.label: box for box in at.selectbox}
+    options["📍 Origin Port"].set_value("Los Angeles, CA")
+    options["⚓ Destination"].set_value("Tokyo, Japan")
+    next(button for button in at.button if button.label == "⚡ Calculate Route").click()
+
+
+# Each scenario sets up the session; the timed run that follows renders the page.
+SCENARIOS = {
+    "Dashboard": lambda at: _navigate(at, "Dashboard"),
+    "Active Shipments": lambda at: _navigate(at, "Active Shipments"),
+    "Active Shipments (search)": _search,
+    "Route Planner": lambda at: _navigate(at, "Route Planner"),
+    "Route Planner (calculate)": _plan_route,
+    "Compliance & Risk": lambda at: _navigate(at, "Compliance & Risk"),
+}
+
+
+# ============ WORKER ============
+
+class _FigureTimer:
+    """Accumulates time spent in the app's figure builders and ``st.plotly_chart``."""
+
+    def __init__(self):
+        import streamlit as st
+        from aegis import maps
+        self.elapsed = 0.0
+        self._depth = 0
+        st.plotly_chart = self._wrap(st.plotly_chart)
+        # The page scripts in views/ re-import these names from the module on every run
+        maps.god_view_figure = self._wrap(maps.god_view_figure)
+        maps.route_figure = self._wrap(maps.route_figure)
+
+    def _wrap(self, function):
+        def timed(*args, **kwargs):
+            self._depth += 1
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                if not self._depth:
+                    self.elapsed += time.perf_counter() - started
+        return timed
+
+
+def _share_script_cache():
+    """Compile each script once per process, as a live server does.
+
+    AppTest builds a fresh ``ScriptCache`` for every run, so without this each
+    timed run would include parsing and compiling the app's scripts.
+    """
+    from streamlit.testing.v1 import app_test, local_script_runner
+    cache = app_test.ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+
+
+def _payload_bytes(node):
+    children = getattr(node, 'children', None)
+    if children:
+        return sum(_payload_bytes(child) for child in children.values())
+    proto = getattr(node, 'proto', None)
+    return proto.ByteSize() if proto is not None else 0
+
+
+def _run(at, timer):
+    timer.elapsed = 0.0
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].message}")
+    return elapsed * 1e3, timer.elapsed * 1e3
+
+
+def measure_size(size, repeat=DEFAULT_REPEAT, timeout=600):
+    """Measure every scenario against a fleet of ``size``; must run in a fresh process."""
+    os.environ['AEGIS_SYNTHETIC_SHIPMENTS'] = str(size)
+    os.environ.setdefault('AEGIS_FEED', 'off')
+    os.environ.setdefault('AEGIS_DATABASE_URL', 'sqlite://')   # leave the app's database alone
+    # and its track archive, should a scenario's writes reach it
+    tracks = tempfile.TemporaryDirectory(prefix='aegis-tracks-', ignore_cleanup_errors=True)
+    os.environ.setdefault('AEGIS_TRACKS_DIR', tracks.name)
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    _share_script_cache()
+    timer = _FigureTimer()
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    load_ms, _ = _run(at, timer)   # first run loads the store and builds the indexes
+
+    pages = {}
+    for name, prepare in SCENARIOS.items():
+        prepare(at)
+        _run(at, timer)   # warm-up: fills the per-snapshot caches
+        runs = []
+        for _ in range(repeat):
+            prepare(at)
+            runs.append(_run(at, timer))
+        prepare(at)
+        tracemalloc.start()
+        _run(at, timer)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        script = [run[0] for run in runs]
+        median = sorted(runs)[len(runs) // 2]
+        pages[name] = {
+            'script_ms': {'median': statistics.median(script), 'min': min(script), 'max': max(script)},
+            'figure_ms': median[1],
+            'peak_memory_mb': peak / 2**20,
+            'payload_bytes': _payload_bytes(at._tree),
+        }
+    tracks.cleanup()
+    return {
+        'size': size,
+        'load_ms': load_ms,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'pages': pages,
+    }
+
+
+# ============ DRIVER ============
+
+def _version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes, repeat=DEFAULT_REPEAT):
+    import streamlit
+    results = []
+    for size in sizes:
+        print(f"Measuring {size:,} shipments...", file=sys.stderr)
+        worker = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', str(size),
+                                 '--repeat', str(repeat)], capture_output=True, text=True)
+        if worker.returncode:
+            raise RuntimeError(f"Benchmark at {size:,} shipments failed:\n{worker.stderr}")
+        results.append(json.loads(worker.stdout.strip().splitlines()[-1]))
+    return {
+        'version': _version(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'streamlit': streamlit.__version__,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_RATIO):
+    """Rows of ``(size, page, baseline ms, current ms, ratio, flagged)`` for matching entries."""
+    previous = {(r['size'], page): stats for r in baseline['results'] for page, stats in r['pages'].items()}
+    rows = []
+    for result in current['results']:
+        for page, stats in result['pages'].items():
+            before = previous.get((result['size'], page))
+            if before is None:
+                continue
+            old, new = before['script_ms']['median'], stats['script_ms']['median']
+            ratio = new / old if old else float('inf')
+            rows.append((result['size'], page, old, new, ratio, ratio > threshold))
+    return rows
+
+
+def _report(report):
+    for result in report['results']:
+        print(f"\n{result['size']:,} shipments: load {result['load_ms']:,.0f} ms, "
+              f"peak RSS {result['peak_rss_mb']:,.0f} MB")
+        for page, stats in result['pages'].items():
+            print(f"  {page:<28} {stats['script_ms']['median']:>9,.1f} ms  figures {stats['figure_ms']:>7,.1f} ms"
+                  f"  peak {stats['peak_memory_mb']:>7,.1f} MB  payload {stats['payload_bytes']:>9,} B")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated fleet sizes")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="timed runs per page")
+    parser.add_argument('--output', default='page_latency.json', help="where to write the JSON results")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        print(json.dumps(measure_size(args.worker, args.repeat)))
+        return 0
+
+    report = run([int(size) for size in args.sizes.split(',')], args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    _report(report)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        print(f"\nAgainst {baseline['version']}:")
+        flagged = 0
+        for size, page, old, new, ratio, slower in compare(report, baseline):
+            flagged += slower
+            print(f"  {size:>9,} {page:<28} {old:>9,.1f} -> {new:>9,.1f} ms  x{ratio:.2f}"
+                  f"{'  REGRESSION' if slower else ''}")
+        return 1 if flagged else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
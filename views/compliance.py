@@ -0,0 +1,100 @@
+"""Compliance & Risk: compliance KPIs, the rollup trend, audits and restricted jurisdictions."""
+
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+from aegis.alerts import HOME_FLAG
+from aegis.charts import clean_pie, trend_bars
+from aegis.data import get_audits, get_jurisdictions, get_kpis, get_repository, get_rollups, get_store
+from aegis.rollups import FREQUENCIES
+from aegis.render import AUDIT_CARD, JURISDICTION_ROW, html_list, show_more, shown_count
+from aegis.telemetry import span
+
+# Audit cards shown at first, and added per "Show more"
+AUDITS_SHOWN = 3
+
+STORE = get_store()
+
+st.title("Compliance & Risk")
+st.caption("ITAR/EAR compliance dashboard and jurisdiction risk management")
+
+# Top metrics, read from the running KPI aggregates
+with span("compliance.kpis"):
+    kpis = get_kpis(STORE).snapshot()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.markdown(f"""
+        <div class='sovereignty-badge'>
+            <p style='font-size: 10px; color: #64748b;'>COMPLIANCE SCORE</p>
+            <p class='sovereignty-score'>{kpis.compliance_score:.0f}%</p>
+            <p style='font-size: 10px; color: {"#10b981" if not kpis.at_risk else "#f43f5e"};'>{"All shipments clean" if not kpis.at_risk else f"{kpis.at_risk} shipments at risk"}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    with col2:
+        st.metric("Active Licenses", f"{kpis.active_licenses:,}", "ITAR/EAR authorizations")
+    with col3:
+        st.metric("Days Since Incident",
+                  f"{kpis.days_since_incident:,}" if kpis.days_since_incident is not None else "—",
+                  "Perfect record" if kpis.days_since_incident != 0 else "Incident today", delta_color="off")
+    with col4:
+        passed = kpis.audits_passed_ytd / kpis.audits_ytd if kpis.audits_ytd else 1.0
+        st.metric("Audits (YTD)", f"{kpis.audits_ytd}", f"{passed:.0%} passed")
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+col_chart, col_status = st.columns([2, 1])
+
+with col_chart:
+    st.subheader("📈 Monthly Compliance Trend")
+
+    # Materialized rollup buckets; the chart never reads raw events
+    col_freq, col_range = st.columns([1, 2])
+    with col_freq:
+        freq = st.selectbox("Granularity", list(FREQUENCIES), index=2, format_func=FREQUENCIES.get,
+                            label_visibility="collapsed")
+    with col_range:
+        default_start = (pd.Timestamp.now() - pd.DateOffset(months=5)).replace(day=1).date()
+        trend_range = st.date_input("Trend Window", value=(default_start, pd.Timestamp.now().date()),
+                                    label_visibility="collapsed")
+    trend_start = trend_range[0] if len(trend_range) > 0 else None
+    trend_end = trend_range[1] + timedelta(days=1) if len(trend_range) == 2 else None
+    with span("compliance.trend"):
+        trend = get_rollups(STORE).series(freq, trend_start, trend_end)
+    labels = {'D': '%b %d', 'W': 'Wk %b %d', 'M': '%b'}[freq]
+    months = tuple(bucket.strftime(labels) for bucket in trend.index)
+    scores = tuple(trend['score'].round(0).astype(int).tolist())
+    observations = tuple(trend['observations'].astype(int).tolist())
+    with span("compliance.trend_chart"):
+        st.plotly_chart(trend_bars(months, scores, observations), use_container_width=True)
+
+    # Recent audits
+    st.subheader("Recent Audits")
+    total = get_repository().audit_count()
+    shown = shown_count("compliance.audits", total, AUDITS_SHOWN)
+    html_list(AUDIT_CARD, get_audits(shown))
+    show_more("compliance.audits", shown, total, AUDITS_SHOWN)
+
+with col_status, span("compliance.status"):
+    st.subheader("🔒 Sovereignty Status")
+
+    # Pie chart, rebuilt only when the counts change
+    st.plotly_chart(clean_pie(kpis.clean, kpis.total), use_container_width=True)
+
+    # Checklist from the current scores, flags and destinations
+    contact, foreign, unaligned = kpis.contact, kpis.foreign_flag, kpis.unaligned
+    checks = [
+        (not contact, "Zero adversary contact" if not contact else f"{contact:,} with adversary contact"),
+        (not foreign, f"{HOME_FLAG}-flag vessels only" if not foreign
+         else f"{foreign:,} non-{HOME_FLAG}-flag vessels ({kpis.restricted_flag:,} restricted)"),
+        (not unaligned, "Allied destinations only" if not unaligned else f"{unaligned:,} unaligned destinations"),
+    ]
+    lines = "".join(f"<p style='color: {'#10b981' if ok else '#f43f5e'}; margin: 8px 0;'>"
+                    f"{'✓' if ok else '✗'} {text}</p>" for ok, text in checks)
+    st.markdown(f"<div style='font-size: 12px;'>{lines}</div>", unsafe_allow_html=True)
+
+    st.markdown("---")
+    st.subheader("🚫 Restricted Jurisdictions")
+
+    html_list(JURISDICTION_ROW, get_jurisdictions())
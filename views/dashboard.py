@@ -0,0 +1,138 @@
+"""Command Center: fleet KPIs, the God View map and active asset cards."""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from aegis.clustering import ZOOM_LEVELS, ClusterIndex
+from aegis.data import (LIVE_REFRESH_SECONDS, TRACK_HOURS, cluster_key, get_alert_engine, get_cluster_index,
+                        get_eta_predictor, get_facet_index, get_geofence, get_kpis, get_store, get_track_archive)
+from aegis.eta import format_band
+from aegis.maps import REGIONS, god_view_figure, live_figure
+from aegis.render import ASSET_CARD, html_list, show_more, shown_count
+from aegis.telemetry import span, timed
+from aegis.tracks import tolerance
+
+# Asset cards shown at first, and added per "Show more"
+ASSETS_SHOWN = 4
+# Replay slider granularity
+REPLAY_STEP = timedelta(minutes=5)
+
+STORE = get_store()
+
+st.title("Command Center")
+st.caption("Real-time sovereign logistics overview")
+
+# Top stats row, read from the running KPI aggregates
+with span("dashboard.kpis"):
+    kpis = get_kpis(STORE).snapshot()
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Active Shipments", f"{kpis.active:,}", f"+{kpis.new_this_week} this week")
+    with col2:
+        st.metric("Compliance Score", f"{kpis.compliance_score:.0f}%",
+                  "Perfect record" if not kpis.at_risk else f"-{kpis.at_risk} at risk")
+    with col3:
+        st.metric("Avg Transit Time",
+                  f"{kpis.avg_transit_days:.1f} days" if pd.notna(kpis.avg_transit_days) else "—",
+                  f"{kpis.transit_change:+.1f} vs last month" if pd.notna(kpis.transit_change) else None,
+                  delta_color="inverse")
+    with col4:
+        yoy = (f"{kpis.cargo_value_mtd / kpis.cargo_value_yoy - 1:+.0%} YoY" if kpis.cargo_value_yoy
+               else "No prior-year data")
+        st.metric("Cargo Value (MTD)", f"${kpis.cargo_value_mtd / 1e6:,.0f}M", yoy)
+
+# Sovereignty badge, driven by the open alerts and refreshed with the feed
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+@timed("dashboard.alerts")
+def alert_banner():
+    counts = get_alert_engine(STORE).open_counts()
+    contacts = counts.get('proximity', 0)
+    others = ", ".join(f"{count:,} {label}" for label, count in (
+        ("foreign flags", counts.get('flag', 0)), ("overdue", counts.get('overdue', 0)),
+        ("stuck in custody", counts.get('stuck', 0))) if count)
+    badge_color = "16, 185, 129" if not contacts else "244, 63, 94"
+    st.markdown(f"""
+    <div style='background: rgba({badge_color}, 0.1); border: 1px solid rgba({badge_color}, 0.2);
+                border-radius: 8px; padding: 12px; margin: 20px 0; display: flex; align-items: center; gap: 12px;'>
+        <span style='font-size: 20px;'>🛡️</span>
+        <span style='color: rgb({badge_color}); font-weight: 500;'>{"All Routes Clean" if not contacts else "Routes At Risk"}</span>
+        <span style='color: rgba({badge_color}, 0.6); font-family: monospace; font-size: 12px;'>{contacts:,} adversary contacts</span>
+        <span style='color: #f59e0b; font-family: monospace; font-size: 12px; margin-left: auto;'>{others}</span>
+    </div>
+    """, unsafe_allow_html=True)
+
+alert_banner()
+
+# Map and shipments
+col_map, col_list = st.columns([2, 1])
+
+# Map and asset cards follow the live feed through fragment reruns
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+@timed("dashboard.map")
+def god_view():
+    st.subheader("🗺️ God View")
+
+    # Clusters or individual ships for the selected viewport, bounded in size
+    archive = get_track_archive(STORE)
+    col_region, col_zoom, col_replay = st.columns([2, 2, 1])
+    with col_region:
+        region = st.selectbox("Region", list(REGIONS), label_visibility="collapsed")
+    with col_zoom:
+        zoom = st.slider("Detail", 0, ZOOM_LEVELS - 1, 3, label_visibility="collapsed")
+    with col_replay:
+        archived = archive.span()
+        replay = st.toggle("Replay", disabled=archived is None)
+    trail = timedelta(hours=TRACK_HOURS)
+    bounds = REGIONS[region]['bounds']
+
+    # Replay: archived positions at the chosen time, read from the days in range only
+    if replay and archived is not None:
+        moment = st.slider("Replay time", *archived, value=archived[1], step=REPLAY_STEP,
+                           format="MMM DD HH:mm", label_visibility="collapsed")
+        with span("dashboard.map.replay"):
+            past = archive.positions_at(moment, trail)
+            view = ClusterIndex(STORE, past.row, past.lat, past.lng).view(bounds, zoom)
+
+        # Tracks of the ships drawn individually, as detailed as the zoom level needs
+        with span("dashboard.map.tracks"):
+            tracks = archive.tracks(view.rows, moment - trail, moment, tolerance(view.zoom)) if view.rows is not None else None
+        with span("dashboard.map.figure"):
+            fig = god_view_figure(STORE, view, region, zones=get_geofence(), tracks=tracks)
+    else:
+        # Live: the figure is rebuilt when the clusters, viewport, trail window or archive change
+        moment = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        with span("dashboard.map.figure"):
+            fig = live_figure(STORE, get_cluster_index(STORE, cluster_key(STORE)), region, zoom,
+                              get_geofence(), archive, moment - trail, moment)
+
+    with span("dashboard.map.chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+@timed("dashboard.asset_cards")
+def active_assets():
+    st.subheader("Active Assets")
+
+    # One HTML block for the visible cards; more are revealed on request. The
+    # count and the first rows come from the facet index, not a fleet scan.
+    facets = get_facet_index(STORE)
+    total = len(STORE) - facets.counts('status').get('Delivered', 0)
+    shown = shown_count("dashboard.assets", total, ASSETS_SHOWN)
+    predictor = get_eta_predictor(STORE)
+    cards = []
+    for row in facets.first_rows_without('status', 'Delivered', shown):
+        ship = {name: STORE.value(name, row) for name in ('id', 'status', 'cargo', 'progress')}
+        ship['status_color'] = '#10b981' if ship['status'] == 'In Transit' else '#f59e0b'
+        ship['eta'] = format_band(predictor.bands(row))
+        cards.append(ship)
+    html_list(ASSET_CARD, cards)
+    show_more("dashboard.assets", shown, total, ASSETS_SHOWN)
+
+with col_map:
+    god_view()
+
+with col_list:
+    active_assets()
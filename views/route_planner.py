@@ -0,0 +1,195 @@
+"""Route Planner: sovereignty-aware routes, single or in batches."""
+
+import streamlit as st
+
+from aegis.batch import evaluate_routes, read_requests
+from aegis.data import (get_geofence, get_jurisdictions, get_repository, get_rollups, get_route_cache,
+                        get_route_planner, get_store)
+from aegis.maps import route_figure
+from aegis.render import ZONE_CHIP, html_list
+from aegis.seed import DESTINATIONS, ORIGINS, WAYPOINTS
+from aegis.telemetry import span
+
+STORE = get_store()
+
+st.title("Route Planner")
+st.caption("Plan sovereign-compliant logistics routes with automated ITAR/EAR validation")
+
+col_config, col_result = st.columns([1, 1])
+
+with col_config:
+    st.subheader("Route Configuration")
+
+    origin = st.selectbox("📍 Origin Port", [""] + ORIGINS)
+    waypoint = st.selectbox("🔗 Waypoint (Optional)", ["None"] + WAYPOINTS)
+    dest_names = [d['name'] for d in DESTINATIONS]
+    destination = st.selectbox("⚓ Destination", [""] + dest_names)
+
+    if destination:
+        dest_info = next((d for d in DESTINATIONS if d['name'] == destination), None)
+        if dest_info:
+            st.markdown(f"<p style='font-size: 11px; color: #64748b;'>Alliance: <span style='color: #10b981;'>{dest_info['alliance']}</span></p>", unsafe_allow_html=True)
+
+    st.markdown("---")
+    st.subheader("Compliance Controls")
+
+    exclude_126 = st.toggle("🛡️ Exclude 126.1 Countries", value=True)
+
+    if not exclude_126:
+        st.warning("⚠️ **Compliance Risk**: Routes may pass through restricted jurisdictions. ITAR violations can result in severe penalties.")
+
+    st.markdown("<p style='font-size: 10px; color: #64748b; margin-top: 16px;'>EXCLUDED JURISDICTIONS</p>", unsafe_allow_html=True)
+
+    color = "#f43f5e" if exclude_126 else "#64748b"
+    html_list(ZONE_CHIP, [{'code': j['code'], 'color': color} for j in get_jurisdictions()], separator=' ')
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    calculate = st.button("⚡ Calculate Route", type="primary", use_container_width=True)
+
+with col_result:
+    st.subheader("Route Analysis")
+
+    # Plans come from the shared cache; the last one stays on screen until the inputs change
+    routes = get_route_cache()
+    via = None if waypoint == "None" else waypoint
+    request = routes.key(origin, destination, via, exclude_126)
+    if calculate and origin and destination:
+        with span("route.plan"):
+            st.session_state['route_result'] = (request, routes.plan(origin, destination, via, exclude_126))
+
+    plan = None
+    calculated = st.session_state.get('route_result')
+    if calculated is not None and calculated[0] == request:
+        plan = calculated[1]
+        if plan is None:
+            st.error("No compliant sea route avoids the restricted jurisdictions" if exclude_126
+                     else "No sea route connects the selected ports")
+
+    if plan is not None:
+        route = plan.route
+        distance = route.distance_nm
+        transit_days = route.transit_days
+        cost = route.cost_k
+        sovereignty_score = plan.sovereignty_score
+        clean = plan.assessment.clean
+        if clean:
+            contact_line = "No adversary jurisdiction contact"
+        else:
+            contact_line = f"Route contacts restricted zones: {', '.join(plan.assessment.contact)}"
+        if plan.assessment.distances:
+            code, nm = min(plan.assessment.distances.items(), key=lambda item: item[1])
+            approach_line = f"Closest approach: {code} at {nm:,.0f} nm"
+        else:
+            approach_line = "No restricted zone within range"
+
+        # Status badge
+        if clean:
+            st.markdown("""
+            <div style='background: rgba(16, 185, 129, 0.1); border: 1px solid rgba(16, 185, 129, 0.3);
+                        padding: 8px 16px; border-radius: 4px; display: inline-block;'>
+                <span style='color: #10b981; font-weight: 500;'>✅ CLEAN ROUTE</span>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown("""
+            <div style='background: rgba(244, 63, 94, 0.1); border: 1px solid rgba(244, 63, 94, 0.3);
+                        padding: 8px 16px; border-radius: 4px; display: inline-block;'>
+                <span style='color: #f43f5e; font-weight: 500;'>⚠️ HIGH RISK</span>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # Route summary
+        st.markdown(f"""
+        <div class='card'>
+            <p style='font-size: 12px; color: #94a3b8;'>📍 {route.summary}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        with span("route.figure"):
+            st.plotly_chart(route_figure(route, get_geofence(), clean), use_container_width=True)
+
+        # Metrics
+        col_m1, col_m2, col_m3 = st.columns(3)
+        with col_m1:
+            st.metric("Distance", f"{distance:,.0f} nm")
+        with col_m2:
+            st.metric("Transit Time", f"{transit_days:.1f} days")
+        with col_m3:
+            st.metric("Est. Cost", f"${cost:,.0f}K")
+
+        # Sovereignty score
+        score_color = "#10b981" if clean else "#f43f5e"
+        st.markdown(f"""
+        <div style='background: rgba(16, 185, 129, 0.05); border: 1px solid {score_color}33;
+                    border-radius: 8px; padding: 20px; margin-top: 16px;'>
+            <div style='display: flex; justify-content: space-between; align-items: center;'>
+                <span style='color: #cbd5e1;'>🛡️ Sovereignty Score</span>
+                <span style='font-size: 32px; font-weight: bold; color: {score_color};
+                            font-family: monospace; text-shadow: 0 0 20px {score_color}50;'>
+                    {sovereignty_score}%
+                </span>
+            </div>
+            <div style='margin-top: 16px; font-size: 12px;'>
+                <p style='color: {score_color}; margin: 4px 0;'>
+                    {"✓" if clean else "✗"} {contact_line}
+                </p>
+                <p style='color: #94a3b8; margin: 4px 0;'>◦ {approach_line}</p>
+                <p style='color: #10b981; margin: 4px 0;'>✓ US-Flag vessel required</p>
+                <p style='color: #10b981; margin: 4px 0;'>✓ Allied port destination confirmed</p>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # Vessel recommendation
+        st.markdown("""
+        <div class='card'>
+            <p style='font-size: 10px; color: #64748b;'>RECOMMENDED VESSEL TYPE</p>
+            <p style='font-size: 14px; color: #cbd5e1;'>🚢 US-Flag Container</p>
+            <p style='font-size: 12px; color: #10b981; font-family: monospace;'>🇺🇸 US Flag</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        decision = {
+            'origin': origin, 'waypoint': via, 'destination': destination,
+            'exclude_126': exclude_126, 'route': route.summary,
+            'distance_nm': round(distance, 1), 'sovereignty_score': sovereignty_score,
+            'jurisdictions_version': request[4],
+        }
+        col_b1, col_b2 = st.columns(2)
+        with col_b1:
+            if st.button("✅ Approve Route", type="primary", use_container_width=True):
+                get_repository().save_route(decision, 'approved')
+                get_rollups(STORE).record_route(plan)
+                st.success(f"Route approved ({get_repository().route_count('approved'):,} on record)")
+        with col_b2:
+            if st.button("💾 Save Draft", use_container_width=True):
+                get_repository().save_route(decision, 'draft')
+                st.info(f"Draft saved ({get_repository().route_count('draft'):,} on record)")
+    else:
+        st.markdown("""
+        <div style='text-align: center; padding: 60px 20px; color: #64748b;'>
+            <p style='font-size: 48px; margin-bottom: 16px;'>🌍</p>
+            <p>Configure route parameters</p>
+            <p style='font-size: 12px;'>Select origin, destination, and calculate</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+# Batch re-routing, e.g. after a sanctions update
+with st.expander("📑 Batch Route Evaluation"):
+    st.caption("CSV with origin, destination and optional waypoint and exclude_126 columns")
+    upload = st.file_uploader("Route requests", type="csv", label_visibility="collapsed")
+    if upload is not None and st.button("⚡ Evaluate Batch"):
+        try:
+            requests = read_requests(upload)
+        except ValueError as exc:
+            st.error(f"Could not read batch: {exc}")
+        else:
+            with st.spinner(f"Planning {len(requests)} routes..."), span("route.batch"):
+                results = evaluate_routes(requests, get_route_planner())
+            st.dataframe(results, use_container_width=True, hide_index=True)
+            st.download_button("⬇️ Download Results", results.to_csv(index=False),
+                               file_name="route_batch.csv", mime="text/csv")
@@ -0,0 +1,202 @@
+"""Active Shipments: searchable, filterable shipment table and chain of custody."""
+
+import html
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+from aegis.data import (get_eta_predictor, get_facet_index, get_scorer, get_store, shipment_page,
+                        shipment_rows, shipment_rows_key)
+from aegis.eta import format_band
+from aegis.manifest import FORMATS, MIME_TYPES, import_manifest, manifest_file
+from aegis.paging import PAGE_SIZES, SORT_COLUMNS, page_count, page_rows
+from aegis.render import CUSTODY_STEP, html_list
+from aegis.telemetry import span
+
+# Icon and colour of custody timeline steps by status
+STEP_STYLES = {
+    'complete': {'icon': "✅", 'color': "#10b981"},
+    'active': {'icon': "🔄", 'color': "#f59e0b"},
+    'pending': {'icon': "⏳", 'color': "#64748b"},
+}
+
+STORE = get_store()
+
+st.title("Active Shipments")
+st.caption("Manage and track all sovereign logistics operations")
+
+# Filters, labelled with counts from the facet index
+facets = get_facet_index(STORE)
+
+def counted(facet):
+    counts = facets.counts(facet)
+    return lambda value: value if value == "All" else f"{value} ({counts.get(value, 0)})"
+
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    search = st.text_input("🔍 Search", placeholder="Search by ID, cargo, destination, or vessel...")
+with col2:
+    status_filter = st.selectbox("Status", ["All", "In Transit", "Loading", "Delivered"],
+                                 format_func=counted('status'))
+with col3:
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(f"<span style='color: #10b981; font-family: monospace;'>{len(STORE)}</span> shipments", unsafe_allow_html=True)
+
+with st.expander("More filters"):
+    col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+    with col_f1:
+        classifications = st.multiselect("Classification", facets.options('classification'),
+                                         format_func=counted('classification'))
+    with col_f2:
+        flags = st.multiselect("Vessel Flag", facets.options('vessel_flag'),
+                               format_func=counted('vessel_flag'))
+    with col_f3:
+        alliances = st.multiselect("Destination Alliance", facets.options('alliance'),
+                                   format_func=counted('alliance'))
+    with col_f4:
+        eta_range = st.date_input("ETA Window", value=())
+
+filters = {
+    'status': [status_filter] if status_filter != "All" else [],
+    'classification': classifications,
+    'vessel_flag': flags,
+    'alliance': alliances,
+}
+eta_window = (eta_range[0], eta_range[1] + timedelta(days=1)) if len(eta_range) == 2 else None
+
+# Shipments table and detail panel
+col_table, col_detail = st.columns([2, 1])
+
+with col_table:
+    # Sorting and paging happen server-side; only the visible page is built
+    col_s1, col_s2, col_s3, col_s4 = st.columns([2, 1, 1, 1])
+    with col_s1:
+        sort_label = st.selectbox("Sort by", list(SORT_COLUMNS))
+    with col_s2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        descending = st.toggle("Descending")
+    with col_s3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES)
+
+    with span("data.shipment_rows"):
+        sort_by = SORT_COLUMNS[sort_label]
+        rows = shipment_rows(STORE, shipment_rows_key(STORE, sort_by), search, filters,
+                             eta_window, sort_by, descending)
+    pages = page_count(len(rows), page_size)
+    if st.session_state.get('shipments_page', 1) > pages:
+        st.session_state['shipments_page'] = pages
+    with col_s4:
+        page_number = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages,
+                                      key='shipments_page')
+
+    # Display the current page as a dataframe
+    if len(rows):
+        with span("data.shipment_page"):
+            df = shipment_page(STORE, STORE.snapshot_key, page_rows(rows, page_number, page_size))
+
+        # Let user select a shipment from the visible page
+        selected_id = st.selectbox("Select shipment for details:",
+                                   df['Container ID'],
+                                   label_visibility="collapsed")
+
+        with span("shipments.table"):
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        first = (page_number - 1) * page_size + 1
+        st.caption(f"Showing {first:,}–{first + len(df) - 1:,} of {len(rows):,} shipments")
+
+        # Exports of the whole filtered view are only written when a button is clicked
+        for fmt, col_export in zip(FORMATS, st.columns(len(FORMATS))):
+            with col_export:
+                st.download_button(f"⬇️ Export {fmt.upper()}", lambda fmt=fmt: manifest_file(STORE, rows, fmt),
+                                   file_name=f"shipments.{fmt}", mime=MIME_TYPES[fmt], on_click="ignore",
+                                   use_container_width=True)
+    else:
+        st.info("No shipments match your filters")
+        selected_id = None
+
+with col_detail, span("shipments.custody"):
+    st.subheader("Chain of Custody")
+
+    if selected_id:
+        row = STORE.row_of(selected_id)
+        if row is not None:
+            ship = STORE.record(row)
+            # Sovereignty badge, with what the score found along the track
+            scorer = get_scorer(STORE)
+            contact = scorer.assessment(row).contact
+            if scorer.flagged(row):
+                verdict = f"RESTRICTED FLAG / {ship['vessel_flag']}"
+            elif contact:
+                verdict = f"ADVERSARY CONTACT / {', '.join(contact)}"
+            else:
+                verdict = "CLEAN / NO ADVERSARY CONTACT"
+            st.markdown(f"""
+            <div class='sovereignty-badge'>
+                <p style='font-size: 12px; color: #10b981; margin-bottom: 8px;'>🛡️ SOVEREIGNTY CHECK</p>
+                <p class='sovereignty-score'>{ship['sovereignty_score']}%</p>
+                <p style='font-size: 10px; color: rgba(16, 185, 129, 0.7); margin-top: 8px;'>
+                    {html.escape(verdict)}
+                </p>
+            </div>
+            """, unsafe_allow_html=True)
+
+            st.markdown("<br>", unsafe_allow_html=True)
+
+            # Shipment details
+            st.markdown(f"""
+            <div class='card'>
+                <p style='font-size: 10px; color: #64748b;'>CONTAINER</p>
+                <p class='mono' style='font-size: 14px;'>{html.escape(ship['id'])}</p>
+                <p style='font-size: 12px; color: #cbd5e1; margin-top: 4px;'>{html.escape(ship['cargo'])}</p>
+                <p style='font-size: 10px; color: #64748b; margin-top: 4px;'>{html.escape(ship['classification'])}</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+            col_v1, col_v2 = st.columns(2)
+            with col_v1:
+                st.markdown(f"<p style='font-size: 10px; color: #64748b;'>VESSEL</p><p style='font-size: 12px; font-family: monospace;'>{html.escape(ship['vessel'])}</p>", unsafe_allow_html=True)
+            with col_v2:
+                st.markdown(f"<p style='font-size: 10px; color: #64748b;'>FLAG</p><p style='font-size: 12px;'>🇺🇸 <span style='color: #10b981;'>{html.escape(ship['vessel_flag'])}</span></p>", unsafe_allow_html=True)
+
+            # Predicted arrival with its 10th-90th percentile band, against the planned ETA
+            bands = get_eta_predictor(STORE).bands(row)
+            planned = ship['eta'] if pd.notna(ship['eta']) else None
+            slip = (bands[1] - planned).total_seconds() / 86400 if bands[1] is not None and planned else None
+            col_e1, col_e2 = st.columns(2)
+            with col_e1:
+                st.markdown(f"<p style='font-size: 10px; color: #64748b;'>PLANNED ETA</p><p style='font-size: 12px; font-family: monospace;'>{f'{planned:%b %d}' if planned else '—'}</p>", unsafe_allow_html=True)
+            with col_e2:
+                slip_note = (f"<p style='font-size: 10px; color: {'#f59e0b' if slip > 0.5 else '#10b981'};'>{slip:+.1f} days vs plan</p>"
+                             if slip is not None else "")
+                st.markdown(f"<p style='font-size: 10px; color: #64748b;'>PREDICTED ETA</p><p style='font-size: 12px; font-family: monospace;'>{html.escape(format_band(bands))}</p>{slip_note}", unsafe_allow_html=True)
+
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown("<p style='font-size: 10px; color: #64748b; letter-spacing: 1px;'>CUSTODY TIMELINE</p>", unsafe_allow_html=True)
+
+            # Timeline, as one block
+            html_list(CUSTODY_STEP, [{'step': step['step'], 'location': step['location'], 'time': step['time'],
+                                      **STEP_STYLES.get(step['status'], STEP_STYLES['pending'])}
+                                     for step in ship['custody_chain']])
+    else:
+        st.info("Select a shipment to view details")
+
+# Bulk manifest import, streamed into the shared store chunk by chunk
+with st.expander("📥 Import Manifest"):
+    st.caption("CSV or Parquet with id, origin, destination and status columns; "
+               "other manifest columns and a JSON custody_chain are optional")
+    upload = st.file_uploader("Manifest", type=list(FORMATS), label_visibility="collapsed")
+    if upload is not None and st.button("⚡ Import"):
+        progress = st.empty()
+        try:
+            with span("shipments.import"):
+                report = import_manifest(STORE, upload, on_chunk=lambda r: progress.caption(
+                    f"{r.imported:,} imported, {r.rejected:,} rejected..."))
+        except ValueError as exc:
+            st.error(f"Could not import manifest: {exc}")
+        else:
+            progress.empty()
+            st.success(f"Imported {report.imported:,} shipments"
+                       + (f", rejected {report.rejected:,}" if report.rejected else ""))
+            if report.errors:
+                st.dataframe(report.frame(), use_container_width=True, hide_index=True)
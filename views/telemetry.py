@@ -0,0 +1,71 @@
+"""Telemetry (admin): span latencies across sessions and the Prometheus export."""
+
+import streamlit as st
+
+from aegis.data import get_alert_engine, get_ingestor, get_store, get_track_archive
+from aegis.telemetry import METRICS_PATH, TELEMETRY, WINDOW
+
+st.title("Telemetry")
+st.caption(f"Section latencies across all sessions, from the last {WINDOW:,} samples of each span")
+
+summary = TELEMETRY.summary()
+st.dataframe(summary, use_container_width=True, hide_index=True, column_config={
+    'span': "Span",
+    'count': st.column_config.NumberColumn("Calls", format="%d"),
+    'total_s': st.column_config.NumberColumn("Total (s)", format="%.2f"),
+    'p50_ms': st.column_config.NumberColumn("p50 (ms)", format="%.2f"),
+    'p95_ms': st.column_config.NumberColumn("p95 (ms)", format="%.2f"),
+    'max_ms': st.column_config.NumberColumn("Max (ms)", format="%.2f"),
+})
+
+col_t1, col_t2, col_t3 = st.columns(3)
+with col_t1:
+    if st.button("📤 Export Prometheus", use_container_width=True):
+        try:
+            st.success(f"Wrote {TELEMETRY.export(METRICS_PATH)}")
+        except OSError as exc:
+            st.error(f"Could not write {METRICS_PATH}: {exc}")
+with col_t2:
+    st.download_button("⬇️ Download Metrics", TELEMETRY.prometheus(), file_name="aegis_metrics.prom",
+                       mime="text/plain", use_container_width=True)
+with col_t3:
+    if st.button("🗑️ Reset", use_container_width=True):
+        TELEMETRY.reset()
+        st.rerun()
+
+# Alert rules run on their own thread; their spans above are alerts.*
+st.subheader("Alert Rules")
+ALERTS = get_alert_engine(get_store())
+col_a1, col_a2, col_a3 = st.columns(3)
+with col_a1:
+    st.metric("Evaluations/s", f"{ALERTS.rate():,.0f}")
+with col_a2:
+    st.metric("Last Batch", f"{ALERTS.last_batch_ms:,.1f} ms")
+with col_a3:
+    st.metric("Queued Updates", f"{ALERTS.backlog():,}")
+if ALERTS.failures:
+    st.warning(f"{ALERTS.failures:,} alert batches failed; last: {ALERTS.last_error}")
+st.dataframe(ALERTS.metrics(), use_container_width=True, hide_index=True, column_config={
+    'rule': "Rule",
+    'evaluated': st.column_config.NumberColumn("Rows Evaluated", format="%d"),
+    'raised': st.column_config.NumberColumn("Raised", format="%d"),
+    'cleared': st.column_config.NumberColumn("Cleared", format="%d"),
+    'open': st.column_config.NumberColumn("Open", format="%d"),
+    'scheduled': st.column_config.NumberColumn("Deadlines", format="%d"),
+})
+
+# Position history written by the feed, one partition per day
+st.subheader("Track Archive")
+TRACKS = get_track_archive(get_store())
+col_k1, col_k2, col_k3 = st.columns(3)
+with col_k1:
+    st.metric("Reports Archived", f"{TRACKS.points_written:,}")
+with col_k2:
+    st.metric("Days on Disk", f"{len(TRACKS.days()):,}")
+with col_k3:
+    st.metric("Last Flush", f"{TRACKS.last_flush_ms:,.1f} ms")
+FEED = get_ingestor(get_store())
+if FEED is not None and FEED.failures:
+    st.warning(f"{FEED.failures:,} position batches failed; last: {FEED.last_error}")
+
+st.caption("Add ?profile=1 (or ?profile=pyinstrument) to the URL to profile each rerun.")